@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
-import os, shutil, subprocess
+"""
+Run every language folder of the dataset through one pipeline (models load once) and write
+each result straight to <language>/jsons. Finished files are skipped via the batch manifest.
+
+    python batch_and_organize.py                      # all languages, up to MAX_FILES each
+    python batch_and_organize.py --languages hindi    # only these folders
+    python batch_and_organize.py --no-resume          # reprocess finished files too
+    python batch_and_organize.py --workers 16         # sharded: 16 worker processes share the loaded models
+"""
+import argparse, shutil
 from pathlib import Path
 
+from core.manifest import open_manifest
+
 ROOT = Path(__file__).parent
 DATASETS_DIR = ROOT / "layered_datasets(MAD)"
-OUTPUT_RESULTS_DIR = ROOT / "outputs/results"
-TMP_BATCH_DIR = ROOT / "tmp_batch"
-MAIN_PY = ROOT / "main.py"
-PYTHON_CMD = "python"
 MAX_FILES = 500
 AUDIO_EXTS = {".wav", ".mp3", ".flac", ".ogg", ".WAV", ".MP3", ".FLAC", ".OGG"}
 
@@ -28,56 +35,68 @@ def get_audio_files(lang_audio_dir: Path, n: int):
         print("    ", f)
     return files[:n]
 
-def prepare_batch(lang: str, audio_files):
-    tmp = TMP_BATCH_DIR / lang
-    if tmp.exists():
-        shutil.rmtree(tmp)
-    ensure_dir(tmp)
+def collect_languages(languages=None, max_files: int = MAX_FILES):
+    """[(language, jsons dir, [audio file paths])] for every language folder with audio"""
+    batches = []
+    for lang_folder in sorted(DATASETS_DIR.iterdir()):
+        if not lang_folder.is_dir() or (languages and lang_folder.name not in languages):
+            continue
+        audio_files = get_audio_files(lang_folder / "audio", max_files)
+        if not audio_files:
+            print(f" ⚠️ No audio files to process for {lang_folder.name}, skipping.")
+            continue
+        batches.append((lang_folder.name, lang_folder / "jsons", [str(f) for f in audio_files]))
+    return batches
+
+def adopt_results(jsons_dir: Path, audio_files, manifest):
+    """Copy finished results saved elsewhere (e.g. by main.py --batch) into the language's jsons dir"""
+    ensure_dir(jsons_dir)
+    copied = 0
     for f in audio_files:
-        # Use just file name (flatten) so symlink destination is not too nested
-        dst = tmp / f.name
-        try:
-            os.symlink(f, dst)
-        except Exception as e:
-            print(f" ⚠️ Failed to symlink {f} → {dst}: {e}")
-    return tmp
+        done = manifest.completed(f)
+        if done is not None and Path(done["output_file"]).parent.resolve() != jsons_dir.resolve():
+            shutil.copy2(done["output_file"], jsons_dir)
+            copied += 1
+    if copied:
+        print(f" 📁 Copied {copied} earlier results to {jsons_dir}")
 
-def run_language(lang: str, batch_dir: Path):
-    print(f"\n--- Processing language: {lang} ---")
-    print("CMD:", PYTHON_CMD, MAIN_PY, str(batch_dir), "--batch")
-    proc = subprocess.Popen(
-        [PYTHON_CMD, str(MAIN_PY), str(batch_dir), "--batch"],
-        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-        text=True, bufsize=1, universal_newlines=True
-    )
-    for line in proc.stdout:
-        print(line, end="")
-    return proc.wait() == 0
+def main():
+    parser = argparse.ArgumentParser(description="Process all dataset languages in one pipeline")
+    parser.add_argument("--languages", nargs="+", default=None, help="Language folders to process (default: all)")
+    parser.add_argument("--max-files", type=int, default=MAX_FILES, help="Files per language")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess files the manifest lists as done")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = one per threads_per_worker cores)")
+    args = parser.parse_args()
 
-def copy_results(lang: str):
-    dst_dir = DATASETS_DIR / lang / "jsons"
-    ensure_dir(dst_dir)
-    for js in OUTPUT_RESULTS_DIR.glob("*.json"):
-        shutil.copy2(js, dst_dir)
-    print(f" 📁 Copied JSONs to {dst_dir}")
+    batches = collect_languages(args.languages, args.max_files)
+    # same manifest (and config version) as main.py --batch without a prompt;
+    # closed while processing, sharded workers are forked and open their own
+    with open_manifest() as manifest:
+        pending = {lang: files if args.no_resume else manifest.pending(files) for lang, _, files in batches}
+        if not args.no_resume:
+            for lang, jsons_dir, audio_files in batches:
+                adopt_results(jsons_dir, audio_files, manifest)
+    total = sum(len(files) for files in pending.values())
+    print(f"\n{total} files to process across {len(batches)} languages")
 
-def main():
-    ensure_dir(TMP_BATCH_DIR)
-    for lang_folder in DATASETS_DIR.iterdir():
-        if not lang_folder.is_dir():
+    pipeline = None
+    for lang, jsons_dir, audio_files in batches:
+        print(f"\n--- Processing language: {lang} ({len(pending[lang])}/{len(audio_files)} files) ---")
+        if not pending[lang]:
             continue
-        lang = lang_folder.name
-        audio_dir = lang_folder / "audio"
-        audio_files = get_audio_files(audio_dir, MAX_FILES)
-        if not audio_files:
-            print(f" ⚠️ No audio files to process for {lang}, skipping.")
-            continue
-        batch_dir = prepare_batch(lang, audio_files)
-        success = run_language(lang, batch_dir)
-        if success:
-            copy_results(lang)
+        if pipeline is None:
+            # models load once, only if something is left to do
+            from core.pipeline import LTUASPipeline
+            pipeline = LTUASPipeline()
+        if args.workers != 1:
+            from core.sharded import process_batch_sharded
+            process_batch_sharded(pending[lang], workers=args.workers or None, resume=not args.no_resume,
+                                  output_dir=jsons_dir, pipeline=pipeline)
         else:
-            print(f" ❌ main.py failed for {lang}")
+            pipeline.process_batch(pending[lang], resume=not args.no_resume, output_dir=jsons_dir)
+
+    with open_manifest() as manifest:
+        print(f"\n 📒 Manifest {manifest.path}: {manifest.summary()}")
 
 if __name__ == "__main__":
     main()
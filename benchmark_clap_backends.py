@@ -0,0 +1,67 @@
+# benchmark_clap_backends.py - CPU throughput of CLAP audio embeddings, eager vs TorchScript
+#
+# Usage:
+#   python benchmark_clap_backends.py [--batch-sizes 1 8 32] [--repeats 3] [--threads N]
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+
+def throughput(embed, batch, repeats):
+    """Clips per second of embed(batch), after one warm-up call"""
+    with torch.no_grad():
+        embed(batch)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            embed(batch)
+    return batch.shape[0] * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLAP audio embedding throughput: eager vs TorchScript (CPU)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    from config.paths import add_model_paths
+    add_model_paths()
+    import laion_clap
+
+    print("Loading CLAP on CPU...")
+    clap = laion_clap.CLAP_Module(enable_fusion=False, device="cpu")
+    clap.load_ckpt()
+    clap.model.eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "clap_audio.ts"
+        start = time.perf_counter()
+        clap.export_audio_encoder(str(path))
+        print(f"Export: {time.perf_counter() - start:.1f}s, {path.stat().st_size / 2**20:.1f} MB")
+        clap.load_audio_encoder(str(path))
+        traced = clap.audio_encoder
+
+    def eager(waveform):
+        return clap.model.get_audio_embedding({"waveform": waveform, "longer": torch.zeros(waveform.shape[0], 1, dtype=torch.bool)})
+
+    print(f"\nthreads: {torch.get_num_threads()}")
+    print(f"{'batch':>6}{'eager clips/s':>16}{'torchscript clips/s':>22}{'speedup':>10}{'max |diff|':>12}")
+    rng = np.random.default_rng(0)
+    for batch_size in args.batch_sizes:
+        batch = torch.from_numpy(rng.standard_normal((batch_size, 480000), dtype=np.float32) * 0.1)
+        with torch.no_grad():
+            diff = (eager(batch) - traced(batch)).abs().max().item()
+        eager_tp = throughput(eager, batch, args.repeats)
+        traced_tp = throughput(traced, batch, args.repeats)
+        print(f"{batch_size:>6}{eager_tp:>16.2f}{traced_tp:>22.2f}{traced_tp / eager_tp:>9.2f}x{diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
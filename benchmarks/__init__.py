@@ -0,0 +1,10 @@
+"""
+LTUAS benchmark suite
+
+    python -m benchmarks.run --scenarios 1_short_speech 10_short_mixed --targets process_audio process_batch
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Audio is generated synthetically (benchmarks/audio.py) and the Groq API is replaced by a local
+HTTP stub with configurable latency (benchmarks/groq_stub.py), so runs are reproducible offline
+apart from the model downloads.
+"""
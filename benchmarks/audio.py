@@ -0,0 +1,77 @@
+import numpy as np
+from pathlib import Path
+from typing import List
+
+
+SAMPLE_RATE = 48000  # CLAP decode rate, so no resampling before CLAP/VAD
+
+
+def _formant_envelope(freqs: np.ndarray, formants) -> np.ndarray:
+    """Spectral envelope with a peak per (center Hz, bandwidth Hz) formant"""
+    envelope = np.zeros_like(freqs, dtype=np.float64)
+    for center, bandwidth in formants:
+        envelope += np.exp(-0.5 * ((freqs - center) / bandwidth) ** 2)
+    return envelope + 0.05
+
+
+def speech_like(seconds: float, rng: np.random.Generator, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Voiced syllables (harmonic source shaped by random vowel formants, with pitch drift)
+    grouped into words and separated by pauses, so VAD finds speech regions with gaps
+    """
+    out = np.zeros(int(seconds * sr), dtype=np.float32)
+    cursor = int(rng.uniform(0.1, 0.4) * sr)
+    while cursor < len(out):
+        for _ in range(rng.integers(1, 4)):  # syllables per word
+            length = int(rng.uniform(0.12, 0.3) * sr)
+            if cursor + length > len(out):
+                break
+            t = np.arange(length) / sr
+            f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(3, 6) * t))
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            formants = [(rng.uniform(300, 850), 80), (rng.uniform(900, 2300), 120), (rng.uniform(2400, 3200), 150)]
+            syllable = np.zeros(length)
+            for k in range(1, int(4000 / f0.max())):
+                syllable += _formant_envelope(k * f0, formants) * np.sin(k * phase) / k ** 0.5
+            syllable *= np.hanning(length)
+            out[cursor:cursor + length] += (0.3 * syllable / (np.abs(syllable).max() + 1e-8)).astype(np.float32)
+            cursor += length
+        cursor += int(rng.uniform(0.05, 0.5) * sr)  # pause between words
+    out += (0.002 * rng.standard_normal(len(out))).astype(np.float32)  # room noise floor
+    return out
+
+
+def ambience(seconds: float, rng: np.random.Generator, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Low-passed noise with slow gusts (wind/room tone), no voiced harmonics"""
+    n = int(seconds * sr)
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    freqs = np.fft.rfftfreq(n, 1 / sr)
+    spectrum /= np.maximum(freqs, 20.0) ** 0.8  # pinkish/brown tilt
+    noise = np.fft.irfft(spectrum, n)
+    t = np.arange(n) / sr
+    gusts = 0.85 + 0.15 * np.sin(2 * np.pi * rng.uniform(0.05, 0.3) * t + rng.uniform(0, 2 * np.pi))
+    noise *= gusts
+    return (0.2 * noise / (np.abs(noise).max() + 1e-8)).astype(np.float32)
+
+
+GENERATORS = {"speech": speech_like, "ambience": ambience}
+
+
+def write_clips(directory, count: int, seconds: float, content: str, seed: int = 0) -> List[str]:
+    """
+    Write `count` WAV clips of `seconds` each to directory, reproducible from seed.
+    content: "speech", "ambience" or "mixed" (alternating, starting with speech)
+    """
+    import soundfile as sf
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        kind = content if content != "mixed" else ("speech", "ambience")[i % 2]
+        rng = np.random.default_rng([seed, i])
+        path = directory / f"{kind}_{seconds:g}s_{i:03d}.wav"
+        if not path.exists():
+            sf.write(path, GENERATORS[kind](seconds, rng), SAMPLE_RATE, subtype="PCM_16")
+        paths.append(str(path))
+    return paths
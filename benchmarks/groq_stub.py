@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Groq API endpoints the pipeline calls (audio transcriptions, chat completions).
+
+    python -m benchmarks.groq_stub --port 8099 --whisper-latency 0.4 --llm-latency 0.8
+
+Point the Groq client at it with GROQ_BASE_URL=http://127.0.0.1:8099 (any GROQ_API_KEY works).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+TRANSCRIPT = "The quick brown fox jumps over the lazy dog near the river bank."
+COMPLETION = ("Audio contains spoken English over light background noise. "
+              "Summarize the speech content and describe the acoustic environment.")
+
+
+class GroqStub:
+    """
+    Threaded HTTP server answering like Groq, after `latency` seconds (+ uniform `jitter`).
+    error_rate is the share of requests answered with HTTP 500 (the Groq client retries those).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, whisper_latency: float = 0.3, llm_latency: float = 0.5,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.whisper_latency = whisper_latency
+        self.llm_latency = llm_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = Counter()
+        self.errors = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def settings(self) -> Dict:
+        return {"whisper_latency": self.whisper_latency, "llm_latency": self.llm_latency,
+                "jitter": self.jitter, "error_rate": self.error_rate}
+
+    def start(self) -> "GroqStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="groq-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay_and_fail(self, endpoint: str, latency: float) -> bool:
+        """Sleep like the real endpoint would; True if this request should fail"""
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors[endpoint] += 1
+        time.sleep(delay)
+        return fail
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if self.path.endswith("/audio/transcriptions"):
+                    if stub._delay_and_fail("transcriptions", stub.whisper_latency):
+                        return self._send_json(500, {"error": {"message": "stub failure", "type": "internal_server_error"}})
+                    return self._send_json(200, {
+                        "text": TRANSCRIPT,
+                        "language": "english",
+                        "duration": 4.0,
+                        "segments": [{"id": 0, "start": 0.0, "end": 4.0, "text": TRANSCRIPT}],
+                        "x_groq": {"id": f"req_{uuid.uuid4().hex}"},
+                    })
+
+                if self.path.endswith("/chat/completions"):
+                    request = json.loads(body or b"{}")
+                    if stub._delay_and_fail("chat", stub.llm_latency):
+                        return self._send_json(500, {"error": {"message": "stub failure", "type": "internal_server_error"}})
+                    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                    created = int(time.time())
+                    model = request.get("model", "stub")
+                    if request.get("stream"):
+                        return self._stream(completion_id, created, model)
+                    return self._send_json(200, {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": COMPLETION}}],
+                        "usage": {"prompt_tokens": 120, "completion_tokens": len(COMPLETION.split()),
+                                  "total_tokens": 120 + len(COMPLETION.split())},
+                    })
+
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            def _stream(self, completion_id: str, created: int, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in COMPLETION.split(" "):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                             "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--whisper-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = GroqStub(args.host, args.port, args.whisper_latency, args.llm_latency, args.jitter, args.error_rate)
+    print(f"✓ Groq stub listening on {stub.url} (set GROQ_BASE_URL to this)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
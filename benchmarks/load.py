@@ -0,0 +1,231 @@
+"""
+Load generator for the API server: uploads audio to /run, follows each run through /status,
+and reports end-to-end latency percentiles, throughput and error rates.
+
+    python -m benchmarks.load --concurrency 4 --rate 0.5 --requests 40      # open loop, Poisson arrivals
+    python -m benchmarks.load --concurrency 8 --duration 300                # closed loop, 8 clients back to back
+    python -m benchmarks.load --url http://127.0.0.1:4000 --requests 20     # existing server (no stub started)
+
+Without --url a local server is started, backed by the Groq stand-in (benchmarks/groq_stub.py).
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.groq_stub import GroqStub
+from benchmarks.report import environment, latency_stats
+from benchmarks.run import ROOT, api_server
+from benchmarks.scenarios import SCENARIOS
+
+OUTCOMES = ("success", "run_error", "http_error", "timeout")
+
+
+class LoadGenerator:
+    """
+    rate > 0: open loop, arrivals at `rate` runs/s (Poisson or constant) whatever the server does;
+              at most `concurrency` runs are followed at once, later arrivals wait client-side and
+              that wait counts in their latency.
+    rate = 0: closed loop, `concurrency` clients each submit their next run when the previous finishes.
+    """
+
+    def __init__(self, url: str, clips: List[str], concurrency: int, rate: float = 0.0, arrival: str = "poisson",
+                 poll_interval: float = 0.25, run_timeout: float = 600.0, seed: int = 0):
+        self.url = url
+        self.clips = clips
+        self.concurrency = concurrency
+        self.rate = rate
+        self.arrival = arrival
+        self.poll_interval = poll_interval
+        self.run_timeout = run_timeout
+        self._rng = random.Random(seed)
+        self._clip_cycle = itertools.cycle(clips)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.max_in_flight = 0
+        self.records = []
+
+    def _next_clip(self) -> str:
+        with self._lock:
+            return next(self._clip_cycle)
+
+    def _one_run(self, scheduled: float) -> Dict:
+        """Upload, follow to completion; latency is measured from the scheduled arrival"""
+        import requests
+
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        started = time.perf_counter()
+        record = {"queued_seconds": started - scheduled, "outcome": None}
+        try:
+            path = self._next_clip()
+            with open(path, "rb") as f:
+                response = requests.post(f"{self.url}/run", files={"file": (Path(path).name, f, "audio/wav")}, timeout=60)
+            record["submit_seconds"] = time.perf_counter() - started
+            if response.status_code != 200:
+                record["outcome"] = "http_error"
+                record["detail"] = f"/run returned {response.status_code}"
+                return record
+
+            run_id = response.json()["runId"]
+            deadline = started + self.run_timeout
+            while True:
+                status = requests.get(f"{self.url}/status/{run_id}", timeout=30)
+                if status.status_code != 200:
+                    record["outcome"] = "http_error"
+                    record["detail"] = f"/status returned {status.status_code}"
+                    return record
+                state = status.json()["status"]
+                if state != "running":
+                    record["outcome"] = "success" if state == "success" else "run_error"
+                    if state != "success":
+                        record["detail"] = status.json().get("error")
+                    return record
+                if time.perf_counter() > deadline:
+                    record["outcome"] = "timeout"
+                    return record
+                time.sleep(self.poll_interval)
+
+        except requests.RequestException as e:
+            record["outcome"] = "http_error"
+            record["detail"] = str(e)
+            return record
+
+        finally:
+            record["latency_seconds"] = time.perf_counter() - scheduled
+            with self._lock:
+                self._in_flight -= 1
+                self.records.append(record)
+
+    def _interarrival(self) -> float:
+        if self.arrival == "constant":
+            return 1.0 / self.rate
+        return self._rng.expovariate(self.rate)
+
+    def run(self, max_runs: Optional[int] = None, duration: Optional[float] = None) -> float:
+        """Generate load until `max_runs` runs were issued or `duration` seconds passed; returns the wall time"""
+        start = time.perf_counter()
+        issued = itertools.count()
+
+        def more() -> bool:
+            if duration is not None and time.perf_counter() - start >= duration:
+                return False
+            return max_runs is None or next(issued) < max_runs
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="load") as pool:
+            if self.rate > 0:
+                next_arrival = start
+                while more():
+                    delay = next_arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    pool.submit(self._one_run, next_arrival)
+                    next_arrival += self._interarrival()
+            else:
+                def client():
+                    while more():
+                        self._one_run(time.perf_counter())
+                for _ in range(self.concurrency):
+                    pool.submit(client)
+        return time.perf_counter() - start
+
+    def summary(self, wall: float) -> Dict:
+        records = list(self.records)
+        counts = {outcome: sum(r["outcome"] == outcome for r in records) for outcome in OUTCOMES}
+        ok = [r for r in records if r["outcome"] == "success"]
+        return {
+            "runs": len(records),
+            "wall_seconds": round(wall, 3),
+            "throughput_runs_per_second": round(counts["success"] / wall, 4) if wall > 0 else None,
+            "offered_runs_per_second": self.rate or None,
+            "max_in_flight": self.max_in_flight,
+            "outcomes": counts,
+            "error_rate": round(1 - counts["success"] / len(records), 4) if records else None,
+            "latency_seconds": latency_stats([r["latency_seconds"] for r in ok]),
+            "client_queue_seconds": latency_stats([r["queued_seconds"] for r in records]),
+            "submit_seconds": latency_stats([r["submit_seconds"] for r in records if "submit_seconds" in r]),
+            "errors": [r["detail"] for r in records if r.get("detail")][:20],
+        }
+
+
+def print_summary(summary: Dict):
+    latency = summary["latency_seconds"]
+    print("\n" + "=" * 60)
+    print(f"Runs: {summary['runs']} in {summary['wall_seconds']:.1f}s | max in flight: {summary['max_in_flight']}")
+    print(f"Throughput: {summary['throughput_runs_per_second'] or 0:.3f} successful runs/s"
+          + (f" (offered {summary['offered_runs_per_second']:.3f}/s)" if summary["offered_runs_per_second"] else ""))
+    print("Outcomes: " + ", ".join(f"{k} {v}" for k, v in summary["outcomes"].items())
+          + f" | error rate {summary['error_rate'] or 0:.1%}")
+    if latency:
+        print(f"End-to-end latency: p50 {latency['p50']:.2f}s | p95 {latency['p95']:.2f}s | "
+              f"p99 {latency['p99']:.2f}s | max {latency['max']:.2f}s")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LTUAS API server")
+    parser.add_argument("--url", default=None, help="Server to load (default: start one with the Groq stub)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Runs followed at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="Arrivals per second (0 = closed loop)")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many runs")
+    parser.add_argument("--duration", type=float, default=None, help="Stop issuing runs after this many seconds")
+    parser.add_argument("--scenario", default="10_short_mixed", choices=sorted(SCENARIOS), help="Audio uploaded (cycled)")
+    parser.add_argument("--audio-dir", default=str(ROOT / "outputs" / "benchmarks" / "audio"))
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--run-timeout", type=float, default=600.0, help="Seconds before a run counts as timed out")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-port", type=int, default=4100)
+    parser.add_argument("--whisper-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--report", default=None, help="Report path (default: outputs/benchmarks/load_<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 20
+
+    clips = SCENARIOS[args.scenario].clips(args.audio_dir)
+    settings = {k: getattr(args, k) for k in ("concurrency", "rate", "arrival", "requests", "duration", "scenario", "seed")}
+
+    def load(url: str, stub: Optional[GroqStub] = None) -> Dict:
+        generator = LoadGenerator(url, clips, args.concurrency, args.rate, args.arrival,
+                                  args.poll_interval, args.run_timeout, args.seed)
+        print(f"Loading {url}: {settings}")
+        summary = generator.summary(generator.run(args.requests, args.duration))
+        return {
+            "created": datetime.now().isoformat(),
+            "environment": environment(),
+            "settings": settings,
+            "groq_stub": {**stub.settings(), "requests": dict(stub.requests), "errors": dict(stub.errors)} if stub else None,
+            "summary": summary,
+        }
+
+    if args.url:
+        report = load(args.url.rstrip("/"))
+    else:
+        with GroqStub(whisper_latency=args.whisper_latency, llm_latency=args.llm_latency,
+                      jitter=args.jitter, error_rate=args.error_rate) as stub:
+            env = {**os.environ, "GROQ_BASE_URL": stub.url, "GROQ_API_KEY": "benchmark-stub"}
+            with api_server(args.server_port, env, not args.verbose) as url:
+                report = load(url, stub)
+
+    print_summary(report["summary"])
+    path = Path(args.report or ROOT / "outputs" / "benchmarks" / f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
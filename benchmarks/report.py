@@ -0,0 +1,118 @@
+import json
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def latency_stats(values: List[float]) -> Dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(pick(0.50), 4),
+        "p95": round(pick(0.95), 4),
+        "p99": round(pick(0.99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def stage_stats(results: List[Dict]) -> Dict:
+    """p50/p95 wall ms per pipeline stage over the results' "instrumentation" fields"""
+    per_stage = {}
+    for result in results:
+        for stage, entry in (result.get("instrumentation") or {}).items():
+            per_stage.setdefault(stage, []).append(entry["wall_ms"])
+    return {
+        stage: {k: v for k, v in latency_stats(values).items() if k in ("p50", "p95", "mean")}
+        for stage, values in per_stage.items()
+    }
+
+
+def environment() -> Dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+    try:
+        env["git_commit"] = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        env["git_commit"] = None
+    try:
+        import torch
+        env["torch"] = torch.__version__
+        env["torch_threads"] = torch.get_num_threads()
+        env["cuda"] = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+    except ImportError:
+        pass
+    return env
+
+
+def write_report(entries: List[Dict], stub_settings: Dict, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "created": datetime.now().isoformat(),
+        "environment": environment(),
+        "groq_stub": stub_settings,
+        "results": entries,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 0.10) -> List[Dict]:
+    """
+    Per (scenario, target) in both reports: p50 latency and throughput against the baseline.
+    A row regresses when p50 latency grows, or throughput drops, by more than `tolerance`.
+    """
+    base = {(e["scenario"], e["target"]): e for e in baseline.get("results", [])}
+    rows = []
+    for entry in report.get("results", []):
+        old = base.get((entry["scenario"], entry["target"]))
+        if old is None:
+            continue
+        new_p50 = entry["latency_seconds"].get("p50")
+        old_p50 = old["latency_seconds"].get("p50")
+        latency_ratio = new_p50 / old_p50 if new_p50 and old_p50 else None
+        throughput_ratio = (entry["files_per_second"] / old["files_per_second"]
+                            if entry.get("files_per_second") and old.get("files_per_second") else None)
+        rows.append({
+            "scenario": entry["scenario"],
+            "target": entry["target"],
+            "p50_seconds": new_p50,
+            "baseline_p50_seconds": old_p50,
+            "latency_ratio": round(latency_ratio, 3) if latency_ratio else None,
+            "throughput_ratio": round(throughput_ratio, 3) if throughput_ratio else None,
+            "regression": bool(
+                (latency_ratio and latency_ratio > 1 + tolerance)
+                or (throughput_ratio and throughput_ratio < 1 - tolerance)
+            ),
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict], baseline_path: Optional[str] = None):
+    print("\n" + "=" * 78)
+    print(f"Comparison with baseline {baseline_path or ''}".rstrip())
+    print("=" * 78)
+    if not rows:
+        print("No scenario/target in common with the baseline")
+        return
+    print(f"{'scenario':<20}{'target':<16}{'p50 s':>9}{'base s':>9}{'latency':>10}{'thrpt':>8}")
+    for r in rows:
+        flag = "  ❌ regression" if r["regression"] else ""
+        latency = f"{r['latency_ratio']:.2f}x" if r["latency_ratio"] else "-"
+        throughput = f"{r['throughput_ratio']:.2f}x" if r["throughput_ratio"] else "-"
+        print(f"{r['scenario']:<20}{r['target']:<16}{r['p50_seconds'] or 0:>9.2f}{r['baseline_p50_seconds'] or 0:>9.2f}"
+              f"{latency:>10}{throughput:>8}{flag}")
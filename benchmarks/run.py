@@ -0,0 +1,213 @@
+"""
+Run LTUAS benchmark scenarios against the pipeline and/or the API server, with Groq replaced by a local stub.
+
+    python -m benchmarks.run                                   # default scenarios, in-process targets
+    python -m benchmarks.run --scenarios 100_short_mixed --targets process_batch
+    python -m benchmarks.run --targets server --server-port 4100
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --fail-on-regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.groq_stub import GroqStub
+from benchmarks.report import compare, latency_stats, print_comparison, stage_stats, write_report
+from benchmarks.scenarios import DEFAULT_SCENARIOS, SCENARIOS
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGETS = ["process_audio", "process_batch", "server"]
+
+
+def _quiet(enabled: bool):
+    """Swallow the pipeline's console output while timing"""
+    return contextlib.redirect_stdout(io.StringIO()) if enabled else contextlib.nullcontext()
+
+
+def _entry(name: str, target: str, scenario, latencies: List[float], wall: float, results: List[Dict], errors: int) -> Dict:
+    return {
+        "scenario": name,
+        "target": target,
+        "files": scenario.files,
+        "clip_seconds": scenario.seconds,
+        "content": scenario.content,
+        "wall_seconds": round(wall, 3),
+        "files_per_second": round(scenario.files / wall, 4) if wall > 0 else None,
+        "audio_seconds_per_second": round(scenario.files * scenario.seconds / wall, 3) if wall > 0 else None,
+        "latency_seconds": latency_stats(latencies),
+        "stages": stage_stats(results),
+        "errors": errors,
+    }
+
+
+def _failed(result: Dict) -> bool:
+    return not (result.get("mellow_inf") or {}).get("success", False)
+
+
+def bench_process_audio(pipeline, name: str, scenario, clips: List[str], quiet: bool) -> Dict:
+    latencies, results = [], []
+    start = time.perf_counter()
+    for path in clips:
+        file_start = time.perf_counter()
+        with _quiet(quiet):
+            results.append(pipeline.process_audio(path))
+        latencies.append(time.perf_counter() - file_start)
+    wall = time.perf_counter() - start
+    return _entry(name, "process_audio", scenario, latencies, wall, results, sum(map(_failed, results)))
+
+
+def bench_process_batch(pipeline, name: str, scenario, clips: List[str], quiet: bool) -> Dict:
+    start = time.perf_counter()
+    with _quiet(quiet):
+        results = pipeline.process_batch(clips, resume=False)
+    wall = time.perf_counter() - start
+    # batch has no per-file timestamps, per-file latency is the mean
+    latencies = [wall / len(clips)] * len(clips)
+    return _entry(name, "process_batch", scenario, latencies, wall, results, sum(map(_failed, results)))
+
+
+@contextlib.contextmanager
+def api_server(port: int, env: Dict, quiet: bool):
+    """uvicorn server:app in a subprocess, ready when /runs answers"""
+    import requests
+
+    log = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=log, stderr=log,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                requests.get(f"{url}/runs", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("API server did not start")
+                time.sleep(0.25)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def bench_server(url: str, name: str, scenario, clips: List[str], poll_interval: float) -> Dict:
+    """POST /run per clip and poll /status until the run finishes (one run at a time)"""
+    import requests
+
+    latencies, results, errors = [], [], 0
+    start = time.perf_counter()
+    for path in clips:
+        run_start = time.perf_counter()
+        with open(path, "rb") as f:
+            response = requests.post(f"{url}/run", files={"file": (Path(path).name, f, "audio/wav")}, timeout=60)
+        response.raise_for_status()
+        run_id = response.json()["runId"]
+        while True:
+            status = requests.get(f"{url}/status/{run_id}", timeout=10).json()
+            if status["status"] != "running":
+                break
+            time.sleep(poll_interval)
+        latencies.append(time.perf_counter() - run_start)
+        if status["status"] != "success" or not status.get("result"):
+            errors += 1
+        else:
+            results.append(status["result"])
+    wall = time.perf_counter() - start
+    return _entry(name, "server", scenario, latencies, wall, results, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LTUAS benchmarks (synthetic audio, local Groq stub)")
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS, choices=sorted(SCENARIOS))
+    parser.add_argument("--targets", nargs="+", default=["process_audio", "process_batch"], choices=TARGETS)
+    parser.add_argument("--audio-dir", default=str(ROOT / "outputs" / "benchmarks" / "audio"),
+                        help="Where synthetic clips are generated (reused across runs)")
+    parser.add_argument("--report", default=None, help="Report path (default: outputs/benchmarks/benchmark_<time>.json)")
+    parser.add_argument("--baseline", default=None, help="Baseline report to compare against")
+    parser.add_argument("--save-baseline", default=None, help="Also write this run's report to this path")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before a row counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    parser.add_argument("--whisper-latency", type=float, default=0.3, help="Stub transcription latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub chat completion latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform extra stub latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests answered with HTTP 500")
+    parser.add_argument("--server-port", type=int, default=4100)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline/server output")
+    args = parser.parse_args()
+    quiet = not args.verbose
+
+    stub = GroqStub(whisper_latency=args.whisper_latency, llm_latency=args.llm_latency,
+                    jitter=args.jitter, error_rate=args.error_rate).start()
+    print(f"✓ Groq stub at {stub.url} ({stub.settings()})")
+    # before config is imported: Config reads the key at import, the Groq client reads the URL per client
+    os.environ["GROQ_BASE_URL"] = stub.url
+    os.environ["GROQ_API_KEY"] = "benchmark-stub"
+    # keep benchmark clips out of the user's batch manifest
+    os.environ.setdefault("LTUAS_MANIFEST", str(ROOT / "outputs" / "benchmarks" / "manifest.sqlite"))
+
+    clips = {}
+    for name in args.scenarios:
+        print(f"Generating audio for {name}...")
+        clips[name] = SCENARIOS[name].clips(args.audio_dir)
+
+    entries = []
+    in_process = [t for t in args.targets if t != "server"]
+    if in_process:
+        from core.pipeline import LTUASPipeline
+
+        start = time.perf_counter()
+        with _quiet(quiet):
+            pipeline = LTUASPipeline()
+        print(f"✓ Pipeline loaded in {time.perf_counter() - start:.1f}s")
+
+        for name in args.scenarios:
+            for target in in_process:
+                bench = bench_process_audio if target == "process_audio" else bench_process_batch
+                entry = bench(pipeline, name, SCENARIOS[name], clips[name], quiet)
+                entries.append(entry)
+                print(f"  {name:<20}{target:<16}p50 {entry['latency_seconds']['p50']:.2f}s  "
+                      f"{entry['files_per_second']:.3f} files/s  errors {entry['errors']}")
+
+    if "server" in args.targets:
+        with api_server(args.server_port, dict(os.environ), quiet) as url:
+            print(f"✓ API server at {url}")
+            for name in args.scenarios:
+                entry = bench_server(url, name, SCENARIOS[name], clips[name], args.poll_interval)
+                entries.append(entry)
+                print(f"  {name:<20}{'server':<16}p50 {entry['latency_seconds']['p50']:.2f}s  "
+                      f"{entry['files_per_second']:.3f} files/s  errors {entry['errors']}")
+
+    stub.stop()
+    settings = {**stub.settings(), "requests": dict(stub.requests), "errors": dict(stub.errors)}
+
+    report_path = args.report or ROOT / "outputs" / "benchmarks" / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path = write_report(entries, settings, report_path)
+    print(f"\n💾 Report saved: {report_path}")
+    if args.save_baseline:
+        print(f"💾 Baseline saved: {write_report(entries, settings, args.save_baseline)}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print_comparison(rows, args.baseline)
+        if args.fail_on_regression and any(r["regression"] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from benchmarks.audio import write_clips
+
+
+@dataclass(frozen=True)
+class Scenario:
+    files: int
+    seconds: float
+    content: str  # "speech", "ambience" or "mixed"
+    seed: int = 0
+
+    def clips(self, cache_dir) -> List[str]:
+        """Generate (or reuse) the scenario's audio under cache_dir"""
+        return write_clips(Path(cache_dir) / self.content, self.files, self.seconds, self.content, self.seed)
+
+
+SCENARIOS = {
+    "1_short_speech": Scenario(files=1, seconds=8, content="speech"),
+    "1_short_ambience": Scenario(files=1, seconds=8, content="ambience"),
+    "1_long_speech": Scenario(files=1, seconds=120, content="speech"),
+    "1_long_ambience": Scenario(files=1, seconds=120, content="ambience"),
+    "10_short_mixed": Scenario(files=10, seconds=8, content="mixed"),
+    "100_short_mixed": Scenario(files=100, seconds=8, content="mixed"),
+}
+
+DEFAULT_SCENARIOS = ["1_short_speech", "1_short_ambience", "1_long_speech", "10_short_mixed"]
@@ -0,0 +1,143 @@
+"""
+Thread-budget benchmark: K pipelines at once, each running two audio encoders in parallel and then a
+batch-1 decode, with torch's default thread counts versus the ThreadBudget split (core/thread_budget.py).
+As in the pipeline, the stages run on StageExecutor worker threads that take their budget when they start.
+The budget is off by default (Config.THREAD_BUDGET_CONFIG); turn it on where this shows a gain.
+
+    python -m benchmarks.threads                                  # concurrency 1, 2, 4, 8
+    python -m benchmarks.threads --concurrency 4 16 --runs 32
+
+The stages are synthetic torch workloads shaped like the real ones (HTSAT-tiny encoder blocks for
+mellow_encode / clap_embed, SmolLM2-sized decoder layers stepping one token at a time for
+mellow_decode), so no model download or Groq access is needed.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import torch
+import torch.nn.functional as F
+
+from benchmarks.report import environment, latency_stats
+from benchmarks.run import ROOT
+from config.settings import Config
+from core.executor import StageExecutor
+from core.thread_budget import ThreadBudget, available_cores
+
+MODES = ("default", "budget")
+STAGES = ("mellow_encode", "clap_embed", "mellow_decode")
+
+
+class SyntheticStages:
+    def __init__(self, encoder_tokens: int = 1024, encoder_width: int = 384, decoder_width: int = 576,
+                 decoder_mlp: int = 1536, decoder_layers: int = 6, decode_tokens: int = 24, seed: int = 0):
+        g = torch.Generator().manual_seed(seed)
+        self.encoder_tokens = encoder_tokens
+        self.encoder = torch.randn(encoder_width, encoder_width, generator=g) / encoder_width ** 0.5
+        self.decoder = [
+            (torch.randn(decoder_width, decoder_mlp, generator=g) / decoder_width ** 0.5,
+             torch.randn(decoder_mlp, decoder_width, generator=g) / decoder_mlp ** 0.5)
+            for _ in range(decoder_layers)
+        ]
+        self.decode_tokens = decode_tokens
+
+    @torch.inference_mode()
+    def encode(self, layers: int):
+        x = torch.randn(self.encoder_tokens, self.encoder.shape[0])
+        for _ in range(layers):
+            x = F.gelu(x @ self.encoder)
+        return x
+
+    @torch.inference_mode()
+    def decode(self):
+        h = torch.randn(1, self.decoder[0][0].shape[0])
+        for _ in range(self.decode_tokens):
+            for up, down in self.decoder:
+                h = h + F.gelu(h @ up) @ down
+        return h
+
+
+def one_run(stages: SyntheticStages, executor: StageExecutor) -> float:
+    """Stage 1: mellow_encode and clap_embed on their stage threads at once; stage 4: mellow_decode"""
+    start = time.perf_counter()
+    mellow = executor.submit("mellow_encode", stages.encode, 12)
+    clap = executor.submit("clap_embed", stages.encode, 8)
+    mellow.result(), clap.result()
+    executor.submit("mellow_decode", stages.decode).result()
+    return time.perf_counter() - start
+
+
+def bench(stages: SyntheticStages, mode: str, concurrency: int, runs: int, cores: int) -> Dict:
+    # "default": every pipeline thread uses torch's default (all cores) - what happens without the budget
+    budget = ThreadBudget(cores, concurrency, enabled=mode == "budget")
+    torch.set_num_threads(budget.pipeline_threads if mode == "budget" else cores)  # before the stage threads start
+
+    executor = StageExecutor({stage: {"workers": concurrency} for stage in STAGES},
+                             name=f"bench-{mode}", initializer=budget.enter)
+    try:
+        one_run(stages, executor)  # warm up allocator and thread pools
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(lambda _: one_run(stages, executor), range(runs)))
+        wall = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "runs": runs,
+        "wall_seconds": round(wall, 3),
+        "runs_per_second": round(runs / wall, 3),
+        "latency_seconds": latency_stats(latencies),
+        "threads": budget.plan()["stages"] if mode == "budget" else {"all": cores},
+    }
+
+
+def print_table(entries: List[Dict]):
+    print("\n" + "=" * 72)
+    print(f"{'concurrency':<13}{'mode':<10}{'runs/s':>9}{'p50 s':>9}{'p95 s':>9}{'speedup':>10}  threads")
+    print("=" * 72)
+    base = {e["concurrency"]: e for e in entries if e["mode"] == "default"}
+    for e in entries:
+        speedup = e["runs_per_second"] / base[e["concurrency"]]["runs_per_second"] if e["concurrency"] in base else 1.0
+        print(f"{e['concurrency']:<13}{e['mode']:<10}{e['runs_per_second']:>9.2f}{e['latency_seconds']['p50']:>9.2f}"
+              f"{e['latency_seconds']['p95']:>9.2f}{speedup:>9.2f}x  {e['threads']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Default torch threading vs the LTUAS thread budget")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="Pipelines at once")
+    parser.add_argument("--runs", type=int, default=None, help="Runs per measurement (default: 4 x concurrency)")
+    parser.add_argument("--cores", type=int, default=None, help="Cores to budget (default: all available)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--decode-tokens", type=int, default=24)
+    parser.add_argument("--report", default=None, help="Report path (default: outputs/benchmarks/threads_<time>.json)")
+    args = parser.parse_args()
+
+    cores = args.cores or available_cores()
+    stages = SyntheticStages(decode_tokens=args.decode_tokens)
+    print(f"Cores: {cores} | stage config: {Config.THREAD_BUDGET_CONFIG['stages']}")
+
+    entries = []
+    for concurrency in args.concurrency:
+        for mode in args.modes:
+            entry = bench(stages, mode, concurrency, args.runs or 4 * concurrency, cores)
+            entries.append(entry)
+            print(f"  concurrency {concurrency:<3} {mode:<8} {entry['runs_per_second']:.2f} runs/s  "
+                  f"p50 {entry['latency_seconds']['p50']:.2f}s")
+    print_table(entries)
+
+    path = Path(args.report or ROOT / "outputs" / "benchmarks" / f"threads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created": datetime.now().isoformat(), "environment": environment(), "cores": cores,
+                   "results": entries}, f, indent=2)
+    print(f"\n💾 Report saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
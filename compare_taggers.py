@@ -0,0 +1,100 @@
+# compare_taggers.py - CLAP vs MELLOW HTSAT sound tagging (accuracy / latency / memory)
+#
+# Usage:
+#   python compare_taggers.py resources/audio
+#   python compare_taggers.py resources/audio --labels labels.csv   # csv rows: file name,category
+#
+# Without labels, accuracy is reported as top-1 agreement with CLAP.
+import argparse
+import csv
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import Config
+from core.utils import find_audio_files
+
+
+def count_params(module) -> int:
+    return sum(p.numel() for p in module.parameters())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CLAP and MELLOW HTSAT sound tagging")
+    parser.add_argument("audio_dir", type=str, help="Directory of audio files")
+    parser.add_argument("--labels", type=str, default=None, help="Optional CSV of file name,category")
+    args = parser.parse_args()
+
+    from models.clap_processor import CLAPProcessor
+    from models.mellow_processor import MELLOWProcessor
+    from models.audioset_tagger import AudioSetTagger
+
+    audio_files = find_audio_files(args.audio_dir)
+    if not audio_files:
+        print(f"❌ No audio files found in {args.audio_dir}")
+        return
+
+    labels = {}
+    if args.labels:
+        with open(args.labels, newline="", encoding="utf-8") as f:
+            labels = {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+
+    clap = CLAPProcessor()
+    mellow = MELLOWProcessor()
+    tagger = AudioSetTagger()
+
+    clap_params = count_params(clap.model.model)
+    htsat_params = count_params(mellow.model.model.audio_encoder)
+
+    rows = []
+    for audio_path in audio_files:
+        name = Path(audio_path).name
+
+        start = time.perf_counter()
+        clap_result = clap.process(audio_path)
+        clap_ms = (time.perf_counter() - start) * 1000
+
+        # MELLOW encodes the audio in both profiles; tagging only adds the mapping
+        start = time.perf_counter()
+        mellow_audio = mellow.encode_audio(audio_path)
+        encode_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        tag_result = tagger.process(mellow_audio["clipwise"])
+        tag_ms = (time.perf_counter() - start) * 1000
+
+        clap_scores = np.array([clap_result.get("all_scores", {}).get(c, 0.0) for c in Config.CLAP_SOUND_CATEGORIES])
+        tag_scores = np.array([tag_result.get("all_scores", {}).get(c, 0.0) for c in Config.CLAP_SOUND_CATEGORIES])
+        rows.append({
+            "file": name,
+            "clap": clap_result["dominant_sound"],
+            "htsat": tag_result["dominant_sound"],
+            "label": labels.get(name),
+            "clap_ms": clap_ms,
+            "encode_ms": encode_ms,
+            "tag_ms": tag_ms,
+            "l1": float(np.abs(clap_scores - tag_scores).sum()),
+        })
+        print(f"{name:<30} CLAP: {clap_result['dominant_sound']:<15} HTSAT: {tag_result['dominant_sound']:<15} "
+              f"CLAP {clap_ms:7.1f} ms | HTSAT mapping {tag_ms:5.2f} ms")
+
+    print("\n" + "=" * 60)
+    print(f"Files: {len(rows)}")
+    print(f"Top-1 agreement (HTSAT vs CLAP): {np.mean([r['clap'] == r['htsat'] for r in rows]):.1%}")
+    print(f"Mean L1 distance of category distributions: {np.mean([r['l1'] for r in rows]):.3f}")
+    labelled = [r for r in rows if r["label"]]
+    if labelled:
+        print(f"Top-1 accuracy on {len(labelled)} labelled files: "
+              f"CLAP {np.mean([r['clap'] == r['label'] for r in labelled]):.1%} | "
+              f"HTSAT {np.mean([r['htsat'] == r['label'] for r in labelled]):.1%}")
+    print(f"Latency per file: CLAP {np.mean([r['clap_ms'] for r in rows]):.1f} ms | "
+          f"MELLOW encode {np.mean([r['encode_ms'] for r in rows]):.1f} ms (needed in both profiles) | "
+          f"HTSAT mapping {np.mean([r['tag_ms'] for r in rows]):.2f} ms")
+    print(f"Parameters: CLAP {clap_params / 1e6:.1f} M (not loaded in single_encoder) | "
+          f"MELLOW audio encoder {htsat_params / 1e6:.1f} M")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Import path configuration FIRST
-from config.paths import EXTERNAL_MODELS_DIR  # This adds models to sys.path
+from config.paths import EXTERNAL_MODELS_DIR
 
 load_dotenv()
 
@@ -24,8 +23,31 @@ class Config:
         "enable_fusion": False,  # False for <10sec audio
         "model_name": "630k-audioset-best.pt",
         "temperature": 0.2,  # Default checkpoint
+        "sample_rate": 48000,  # CLAP decodes at 48 kHz; waveform is shared with VAD
+        "backend": "eager",  # "eager" or "torchscript" (traced audio branch + projection, exported on first use)
+        "export_dir": BASE_DIR / "outputs" / "models",
     }
-    
+
+    VAD_CONFIG = {
+        "enabled": True,
+        "frame_ms": 30,
+        "block_frames": 4096,  # frames per FFT block (bounds memory on long files)
+        "speech_band_hz": (200, 4000),
+        "noise_percentile": 10,  # percentile of frame energy used as noise floor
+        "max_noise_floor_db": -40.0,  # cap on that estimate (continuous speech has no quiet frames)
+        "min_spread_db": 6.0,  # p90 - p10 below this on non-silent audio: no usable floor, frames judged by spectrum
+        "energy_margin_db": 10.0,
+        "min_energy_db": -50.0,
+        "max_flatness": 0.5,  # reject noise-like (flat) spectra
+        "min_band_ratio": 0.3,  # share of energy in the speech band
+        "min_voiced_run_ms": 120,  # shorter runs of voiced frames are noise blips, dropped before gaps are merged
+        "min_speech_ms": 250,
+        "min_silence_ms": 300,
+        "padding_ms": 200,
+        "whisper_sample_rate": 16000,  # voiced segments are sent to Whisper at this rate
+        "full_file_ratio": 0.9,  # above this speech ratio, upload the original file
+    }
+
     WHISPER_CONFIG = {
         "model": "whisper-large-v3",
         "temperature": 0,
@@ -45,8 +67,75 @@ class Config:
         "max_len": 400,
         "top_p": 0.7,
         "temperature": 0.6,
+        "seed": 0,  # makes the single-window crop reproducible per file
+        # None = one 10 s window, "mean"/"topk" = encode all windows and pool (up to max_segments x the encoder cost)
+        "segment_pooling": None,
+        "top_k_segments": 3,
+        "max_segments": 12,  # upper bound on 10 s windows encoded per file
+        "prompt_lookup": True,  # speculative decoding from prompt n-grams (same output, fewer LM passes)
     }
     
+    INSTRUMENTATION_CONFIG = {
+        "decode_steps": True,  # one span per MELLOW decode step (aggregated in the result JSON)
+        "histogram_window": 500,  # rolling latency histogram keeps the last N spans per stage
+        "histogram_buckets_ms": [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000],
+        "chrome_trace_dir": os.getenv("LTUAS_TRACE_DIR"),  # set to write one Chrome trace per processed file
+        "events_file": os.getenv("LTUAS_STAGE_EVENTS"),  # set to append stage events as JSON lines (server.py sets it per run)
+    }
+
+    MANIFEST_CONFIG = {
+        "enabled": True,  # batch runs record finished files and skip them on the next run
+        "path": Path(os.getenv("LTUAS_MANIFEST", BASE_DIR / "outputs" / "manifest.sqlite")),
+    }
+
+    THREAD_BUDGET_CONFIG = {
+        # off until `python -m benchmarks.threads` shows a gain on the deployment machine
+        "enabled": os.getenv("LTUAS_THREAD_BUDGET", "0") == "1",
+        "cores": None,  # None = the CPUs this process may run on
+        # pipelines running at once on this machine; server.py sets it per run from the runs in progress
+        "concurrency": int(os.getenv("LTUAS_CONCURRENCY", "1")),
+        "interop_threads": 1,  # stage parallelism comes from our own threads, not torch's inter-op pool
+        # stage -> (group, weight, max threads); stages of a group run at once and split the pipeline's cores by weight
+        "stages": {
+            "mellow_encode": ("encode", 2, 8),
+            "clap_embed": ("encode", 1, 4),
+            "whisper_request": ("encode", 0, 1),  # upload + resampling, waits on the network
+            "sound_tagging": ("tagging", 1, 2),
+            "mellow_decode": ("decode", 1, 8),  # batch-1 decode stops scaling past a few threads
+        },
+    }
+
+    SHARDED_CONFIG = {
+        # batch-1 HTSAT / SmolLM2 stop scaling past a few intra-op threads; more, smaller shards win
+        "threads_per_worker": 4,  # default worker count = cores // threads_per_worker
+        "start_method": None,  # None = "fork" after loading (weights shared copy-on-write) where possible, else "spawn"
+        "worker_logs": True,  # worker stdout goes to log_dir/shard_<pid>.log instead of interleaving on the console
+        "log_dir": BASE_DIR / "outputs" / "logs",
+    }
+
+    # Pipeline profile:
+    #   "full"           - CLAP tags sounds, MELLOW reasons
+    #   "single_encoder" - CLAP is not loaded, MELLOW's HTSAT AudioSet scores are mapped onto
+    #                      CLAP_SOUND_CATEGORIES (one audio encoder in memory instead of two)
+    PIPELINE_PROFILE = os.getenv("LTUAS_PROFILE", "full")
+
+    AUDIOSET_TAGGER_CONFIG = {
+        "labels_file": EXTERNAL_MODELS_DIR / "CLAP" / "class_labels" / "audioset_class_labels_indices.json",
+        # category -> AudioSet classes; a category scores the max of its classes.
+        # Categories missing here use every AudioSet class whose name contains the category.
+        "category_labels": {
+            "speech": [
+                "Speech", "Male speech, man speaking", "Female speech, woman speaking",
+                "Child speech, kid speaking", "Conversation", "Narration, monologue",
+            ],
+            "wind": ["Wind", "Wind noise (microphone)", "Rustling leaves"],
+            "female": ["Female speech, woman speaking", "Female singing"],
+            "weapon sounds": ["Gunshot, gunfire", "Machine gun", "Fusillade", "Artillery fire", "Cap gun", "Explosion"],
+            "footsteps": ["Walk, footsteps", "Run", "Shuffle"],
+            "beeps": ["Beep, bleep", "Reversing beeps", "Alarm clock", "Smoke detector, smoke alarm"],
+        },
+    }
+
     # CLAP sound categories (expand as needed)
     CLAP_SOUND_CATEGORIES = [
         # Human sounds
@@ -66,12 +155,33 @@ class Config:
     USE_CUDA = True
     NUM_WORKERS = 2  # For parallel processing
     ENABLE_CACHING = True
+
+    # Long-lived stage pools (core/executor.py): worker threads per stage, and how many tasks may wait
+    # before submit blocks (backpressure on callers instead of unbounded threads; 0 = unbounded)
+    EXECUTOR_CONFIG = {
+        "stages": {
+            "mellow_encode": {"workers": 1, "queue": 8},
+            "clap_embed": {"workers": 1, "queue": 8},
+            "whisper_request": {"workers": NUM_WORKERS, "queue": 8},  # network-bound
+            # used by process_audio_async only (process_audio runs these in the caller's thread)
+            "audio_decode": {"workers": 2, "queue": 8},  # decode + VAD
+            "sound_tagging": {"workers": 1, "queue": 8},
+            "mellow_decode": {"workers": 1, "queue": 8},
+            "json_write": {"workers": 1, "queue": 8},
+        },
+        # server.py: pipeline runs at once, and runs accepted beyond those before /run answers 503
+        "server_runs": {
+            "workers": int(os.getenv("LTUAS_SERVER_RUNS", "2")),
+            "queue": int(os.getenv("LTUAS_SERVER_QUEUE", "32")),
+            # "subprocess": one main.py per run; "inprocess": models loaded once in the server,
+            # runs are process_audio_async tasks on its event loop (at most max_in_flight)
+            "mode": os.getenv("LTUAS_SERVER_MODE", "subprocess"),
+            "max_in_flight": int(os.getenv("LTUAS_SERVER_MAX_IN_FLIGHT", "1000")),
+        },
+    }
     
     @classmethod
     def ensure_dirs(cls):
         """Create necessary directories"""
         cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         cls.RESOURCE_DIR.mkdir(parents=True, exist_ok=True)
-
-# Initialize
-Config.ensure_dirs()
@@ -0,0 +1,142 @@
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+class QueueFull(RuntimeError):
+    """A stage queue stayed full for the whole submit timeout"""
+
+
+class _Stage:
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(0, queue_size))
+        self.threads = []
+        self.running = 0
+        self.completed = 0
+
+
+class StageExecutor:
+    """
+    Long-lived named stage pools. Each stage has its own worker threads and a bounded queue, so a
+    slow stage can't starve the others and callers feel backpressure instead of piling up work:
+    submit() blocks while the stage queue is full (or raises QueueFull after `timeout`).
+
+    Threads start on a stage's first submit and are restarted after fork (a forked child inherits
+    the executor object, not its threads). Each new worker thread first calls initializer(stage),
+    e.g. to set its thread budget. shutdown() drains the queues, or cancels what hasn't started
+    with cancel_pending=True, and joins the workers; it also runs at interpreter exit.
+    """
+
+    def __init__(self, stages: Dict[str, Dict], name: str = "ltuas",
+                 initializer: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self._config = {stage: dict(cfg) for stage, cfg in stages.items()}
+        self._initializer = initializer
+        self._reset()
+        atexit.register(self.shutdown)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._stages = {
+            stage: _Stage(stage, cfg.get("workers", 1), cfg.get("queue", 0)) for stage, cfg in self._config.items()
+        }
+
+    def _start(self, stage: _Stage):
+        for i in range(stage.workers - len(stage.threads)):
+            thread = threading.Thread(target=self._work, args=(stage,), name=f"{self.name}-{stage.name}-{i}", daemon=True)
+            thread.start()
+            stage.threads.append(thread)
+
+    def _work(self, stage: _Stage):
+        if self._initializer is not None:
+            try:
+                self._initializer(stage.name)
+            except Exception as e:
+                print(f"⚠ {self.name} stage '{stage.name}' worker initializer failed: {e}")
+        while True:
+            item = stage.queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                stage.running += 1
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    stage.running -= 1
+                    stage.completed += 1
+            del item, future, fn, args, kwargs  # don't keep the last task's arguments alive while idle
+
+    def submit(self, stage: str, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) on `stage`; blocks while its queue is full (timeout=0: raise QueueFull at once)"""
+        if self._pid != os.getpid():
+            self._reset()
+        if self._shutdown:
+            raise RuntimeError(f"{self.name} executor is shut down")
+        target = self._stages[stage]
+        if len(target.threads) < target.workers:
+            with self._lock:
+                self._start(target)
+        future = Future()
+        try:
+            target.queue.put((future, fn, args, kwargs), block=timeout != 0, timeout=timeout or None)
+        except queue.Full:
+            raise QueueFull(f"{self.name} stage '{stage}' queue is full ({target.queue.maxsize} waiting)") from None
+        return future
+
+    async def submit_async(self, stage: str, fn: Callable, *args, **kwargs):
+        """
+        submit() for coroutines, awaiting the result. While the stage queue is full it waits with
+        backoff instead of blocking the event loop. Cancelling the awaiting task cancels the task
+        if it hasn't started; a running one finishes in its thread and the result is dropped.
+        """
+        delay = 0.005
+        while True:
+            try:
+                future = self.submit(stage, fn, *args, timeout=0, **kwargs)
+                break
+            except QueueFull:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.25)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict:
+        """Per stage: worker threads, tasks waiting, running and completed"""
+        with self._lock:
+            return {
+                name: {"workers": s.workers, "queued": s.queue.qsize(), "running": s.running, "completed": s.completed}
+                for name, s in self._stages.items()
+            }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        if self._shutdown or self._pid != os.getpid():
+            return
+        self._shutdown = True
+        for stage in self._stages.values():
+            if cancel_pending:
+                while True:
+                    try:
+                        item = stage.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            for _ in stage.threads:
+                stage.queue.put(None)  # after the queued tasks: workers drain, then exit
+        if wait:
+            for stage in self._stages.values():
+                for thread in stage.threads:
+                    thread.join()
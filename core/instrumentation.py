@@ -0,0 +1,222 @@
+import json
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource  # not available on Windows, peak RSS is then reported as None
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size (high-water mark) in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class StageHistogram:
+    """Rolling per-stage latency histogram over the last `window` spans of each stage (shared across requests)"""
+
+    def __init__(self, window: int = 500, buckets_ms: Optional[List[float]] = None):
+        self.window = window
+        self.buckets_ms = list(buckets_ms or [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000])
+        self._values = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, wall_ms: float):
+        with self._lock:
+            self._values[stage].append(wall_ms)
+
+    def snapshot(self) -> Dict:
+        """Per stage: count, mean, p50/p95/p99 and bucket counts (`le` upper edges in ms, last bucket is +inf)"""
+        with self._lock:
+            values = {stage: sorted(v) for stage, v in self._values.items() if v}
+
+        snapshot = {}
+        for stage, v in values.items():
+            counts = [0] * (len(self.buckets_ms) + 1)
+            for x in v:
+                counts[next((i for i, edge in enumerate(self.buckets_ms) if x <= edge), len(self.buckets_ms))] += 1
+            snapshot[stage] = {
+                "count": len(v),
+                "mean_ms": round(sum(v) / len(v), 3),
+                "p50_ms": round(_percentile(v, 0.50), 3),
+                "p95_ms": round(_percentile(v, 0.95), 3),
+                "p99_ms": round(_percentile(v, 0.99), 3),
+                "buckets": [{"le": edge, "count": c} for edge, c in zip(self.buckets_ms + ["+inf"], counts)],
+            }
+        return snapshot
+
+
+class StageRecorder:
+    """
+    Collects timed spans for one pipeline run.
+
+    Each span records wall time, CPU time of the thread it ran in, growth of the
+    process peak RSS and, when the caller sets record["tokens"], tokens/sec. Thread
+    CPU time keeps overlapping spans (stage 1 threads, concurrent runs) apart; spans
+    that only await work done elsewhere (cpu=False) record cpu_ms as None. RSS is
+    process-wide, so overlapping spans share it.
+
+    Listeners get every finished span as an event ({"event": "span", ...record}) and
+    whatever else the pipeline emits (e.g. {"event": "run"} once the result is saved);
+    the API server builds its metrics from these.
+    """
+
+    def __init__(self, histogram: Optional[StageHistogram] = None, listeners: Optional[List[Callable]] = None):
+        self.histogram = histogram
+        self.listeners = list(listeners or [])
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict):
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠ Stage event listener failed: {e}")
+
+    @contextmanager
+    def span(self, stage: str, cpu: bool = True, **args):
+        """
+        Time the enclosed block; yields the span record so callers can add fields (e.g. tokens).
+        cpu=False: the block awaits other threads or the network (event-loop spans), so the
+        calling thread's CPU time says nothing about the stage and cpu_ms is None.
+        """
+        record = dict(args)
+        rss_start = peak_rss_mb()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu_ms = (time.thread_time() - cpu_start) * 1000 if cpu else None
+            rss_end = peak_rss_mb()
+            record.update({
+                "stage": stage,
+                "start_ms": (wall_start - self._origin) * 1000,
+                "wall_ms": wall * 1000,
+                "cpu_ms": cpu_ms,
+                "peak_rss_delta_mb": rss_end - rss_start if rss_start is not None else None,
+                "thread": threading.current_thread().name,
+            })
+            if record.get("tokens") and wall > 0:
+                record["tokens_per_sec"] = record["tokens"] / wall
+            with self._lock:
+                self.spans.append(record)
+            if self.histogram is not None:
+                self.histogram.add(stage, record["wall_ms"])
+            if self.listeners:
+                self.emit({"event": "span", **record})
+
+    def wrap(self, stage: str, fn, fields: Optional[Callable[[object], Dict]] = None):
+        """fn wrapped in a span, for executor.submit; fields(result) adds to the span record"""
+        def run(*args, **kwargs):
+            with self.span(stage) as record:
+                result = fn(*args, **kwargs)
+                if fields is not None:
+                    record.update(fields(result))
+                return result
+        return run
+
+    def summary(self) -> Dict:
+        """Per-stage totals for the result JSON (repeated stages such as decode steps are aggregated)"""
+        with self._lock:
+            spans = list(self.spans)
+
+        grouped = defaultdict(list)
+        for s in spans:
+            grouped[s["stage"]].append(s)
+
+        summary = {}
+        for stage, group in grouped.items():
+            wall = [s["wall_ms"] for s in group]
+            rss = [s["peak_rss_delta_mb"] for s in group if s["peak_rss_delta_mb"] is not None]
+            cpu = [s["cpu_ms"] for s in group if s["cpu_ms"] is not None]
+            entry = {
+                "count": len(group),
+                "wall_ms": round(sum(wall), 3),
+                "cpu_ms": round(sum(cpu), 3) if cpu else None,
+                "peak_rss_delta_mb": round(sum(rss), 3) if rss else None,
+            }
+            tokens = sum(s.get("tokens") or 0 for s in group)
+            if tokens:
+                entry["tokens"] = tokens
+                entry["tokens_per_sec"] = round(tokens / (sum(wall) / 1000), 2) if sum(wall) > 0 else None
+            if len(group) > 1:
+                ordered = sorted(wall)
+                entry["p50_ms"] = round(_percentile(ordered, 0.50), 3)
+                entry["p95_ms"] = round(_percentile(ordered, 0.95), 3)
+            summary[stage] = entry
+        return summary
+
+    def chrome_trace(self) -> Dict:
+        """Spans as Chrome trace events (open in chrome://tracing or ui.perfetto.dev)"""
+        with self._lock:
+            spans = list(self.spans)
+
+        threads = {name: i for i, name in enumerate(dict.fromkeys(s["thread"] for s in spans))}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": name}}
+            for name, tid in threads.items()
+        ]
+        for s in spans:
+            events.append({
+                "name": s["stage"],
+                "ph": "X",
+                "pid": 0,
+                "tid": threads[s["thread"]],
+                "ts": s["start_ms"] * 1000,
+                "dur": s["wall_ms"] * 1000,
+                "args": {k: v for k, v in s.items() if k not in ("stage", "start_ms", "wall_ms", "thread")},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+
+class EventLog:
+    """StageRecorder listener appending every event as one JSON line (how a main.py run reports to the API server)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict):
+        line = json.dumps(event, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    @staticmethod
+    def read(path) -> List[Dict]:
+        path = Path(path)
+        if not path.exists():
+            return []
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    pass  # blank, or cut short by a killed process
+        return events
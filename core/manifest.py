@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import Config
+
+STATUSES = ("running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    config_version TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    output_file TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    processing_time_seconds REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (path, content_hash, config_version)
+)
+"""
+
+
+def config_version(user_prompt: Optional[str] = None) -> str:
+    """Short hash of every setting that changes a result; a new version reprocesses everything"""
+    settings = {
+        "profile": Config.PIPELINE_PROFILE,
+        "clap": {k: v for k, v in Config.CLAP_CONFIG.items() if k != "export_dir"},
+        "vad": Config.VAD_CONFIG,
+        "whisper": Config.WHISPER_CONFIG,
+        "llm": Config.LLM_CONFIG,
+        "mellow": Config.MELLOW_CONFIG,
+        "categories": Config.CLAP_SOUND_CATEGORIES,
+        "category_labels": Config.AUDIOSET_TAGGER_CONFIG["category_labels"],
+        "user_prompt": user_prompt,
+    }
+    blob = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchManifest:
+    """
+    SQLite record of batch work, keyed by (resolved path, content hash, config version).
+
+    Every state change is its own committed transaction, so after a crash the manifest holds
+    exactly the files whose output JSON was written ("done"); files left "running" or "failed"
+    are picked up again by the next run. Editing a file or changing the config gives a new key.
+    """
+
+    def __init__(self, path, version: str):
+        self.path = Path(path)
+        self.version = version
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")  # readers and other shards don't block the writer
+        self._db.execute(_SCHEMA)
+        self._hashes = {}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _key(self, audio_path: str):
+        """(resolved path, content hash, size, mtime_ns); the hash is reused while size and mtime match"""
+        path = str(Path(audio_path).resolve())
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[1:] == (stat.st_size, stat.st_mtime_ns):
+            return path, cached[0], stat.st_size, stat.st_mtime_ns
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash FROM runs WHERE path = ? AND size = ? AND mtime_ns = ? LIMIT 1",
+                (path, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        content_hash = row["content_hash"] if row else file_hash(path)
+        self._hashes[path] = (content_hash, stat.st_size, stat.st_mtime_ns)
+        return path, content_hash, stat.st_size, stat.st_mtime_ns
+
+    def lookup(self, audio_path: str) -> Optional[Dict]:
+        path, content_hash, _, _ = self._key(audio_path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM runs WHERE path = ? AND content_hash = ? AND config_version = ?",
+                (path, content_hash, self.version),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def completed(self, audio_path: str) -> Optional[Dict]:
+        """The "done" row of this file, if its output JSON still exists"""
+        row = self.lookup(audio_path)
+        if row and row["status"] == "done" and row["output_file"] and Path(row["output_file"]).is_file():
+            return row
+        return None
+
+    def pending(self, audio_files: List[str]) -> List[str]:
+        """Files without a completed result: never seen, failed, or interrupted while running"""
+        return [f for f in audio_files if self.completed(f) is None]
+
+    def _upsert(self, audio_path: str, status: str, **fields):
+        path, content_hash, size, mtime_ns = self._key(audio_path)
+        attempts = 1 if status == "running" else 0
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO runs (path, content_hash, config_version, size, mtime_ns, status, output_file, error,
+                                  attempts, processing_time_seconds, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path, content_hash, config_version) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, status = excluded.status,
+                    output_file = excluded.output_file, error = excluded.error,
+                    attempts = runs.attempts + excluded.attempts,
+                    processing_time_seconds = excluded.processing_time_seconds, updated_at = excluded.updated_at
+                """,
+                (path, content_hash, self.version, size, mtime_ns, status, fields.get("output_file"),
+                 fields.get("error"), attempts, fields.get("processing_time_seconds"), time.time()),
+            )
+
+    def mark_running(self, audio_path: str):
+        self._upsert(audio_path, "running")
+
+    def mark_done(self, audio_path: str, output_file: str, processing_time_seconds: Optional[float] = None):
+        self._upsert(audio_path, "done", output_file=str(output_file), processing_time_seconds=processing_time_seconds)
+
+    def mark_failed(self, audio_path: str, error: str):
+        self._upsert(audio_path, "failed", error=error)
+
+    def summary(self) -> Dict:
+        """Row count per status for this config version"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) AS n FROM runs WHERE config_version = ? GROUP BY status", (self.version,)
+            ).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def failures(self) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, error, attempts FROM runs WHERE config_version = ? AND status = 'failed' ORDER BY path",
+                (self.version,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def open_manifest(user_prompt: Optional[str] = None) -> BatchManifest:
+    """The configured manifest (Config.MANIFEST_CONFIG["path"]) at the current config version"""
+    return BatchManifest(Config.MANIFEST_CONFIG["path"], config_version(user_prompt))
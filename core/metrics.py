@@ -0,0 +1,207 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class _Shards:
+    """
+    Per-thread value slots: a thread only ever writes its own slot, so updates take no lock.
+    Readers sum all slots; they may miss an update that is in flight, never corrupt one.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._slots = []
+
+    def local(self) -> List[float]:
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            slot = [0.0] * self._size
+            self._local.slot = slot
+            self._slots.append(slot)  # list.append is atomic; slots outlive their thread
+        return slot
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self._size
+        for slot in list(self._slots):
+            for i, value in enumerate(slot):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._shards.local()[0] += amount
+
+    def samples(self, name: str) -> List[Tuple[str, Dict, float]]:
+        return [(name, {}, self._shards.totals()[0])]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value: float):
+        self._value = float(value)  # a single assignment, atomic
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the value at scrape time instead (e.g. queue depth)"""
+        self._function = function
+
+    def samples(self, name: str) -> List[Tuple[str, Dict, float]]:
+        value = self._function() if self._function is not None else self._value
+        return [(name, {}, float(value))]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = list(buckets)
+        # one count per bucket, one for +Inf, then the sum
+        self._shards = _Shards(len(self._buckets) + 2)
+
+    def observe(self, value: float):
+        slot = self._shards.local()
+        slot[bisect.bisect_left(self._buckets, value)] += 1
+        slot[-1] += value
+
+    def samples(self, name: str) -> List[Tuple[str, Dict, float]]:
+        totals = self._shards.totals()
+        samples = []
+        cumulative = 0.0
+        for edge, count in zip(self._buckets + [math.inf], totals[:-1]):
+            cumulative += count
+            samples.append((f"{name}_bucket", {"le": _format_value(edge)}, cumulative))
+        samples.append((f"{name}_count", {}, cumulative))
+        samples.append((f"{name}_sum", {}, totals[-1]))
+        return samples
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            # dict.setdefault is atomic: two threads creating the same child get the same one
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> List[Tuple[str, Dict, float]]:
+        samples = []
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            for name, extra, value in child.samples(self.name):
+                samples.append((name, {**labels, **extra}, value))
+        return samples
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets or self.DEFAULT_BUCKETS)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format (version 0.0.4)"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Metric {metric.name} already registered")
+        if not metric.labelnames:
+            metric.labels()  # unlabelled metrics are exported from the start
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -1,9 +1,8 @@
-import config  # Import FIRST to add Mellow to path
-
+import asyncio
 import json
+import os
 import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Optional, List
 from datetime import datetime
 
@@ -11,21 +10,59 @@ from models.clap_processor import CLAPProcessor
 from models.whisper_processor import WhisperProcessor
 from models.llm_layer import LLMLayer
 from models.mellow_processor import MELLOWProcessor
+from models.vad_processor import VADProcessor
+from models.audioset_tagger import AudioSetTagger
+from core.instrumentation import EventLog, StageHistogram, StageRecorder, peak_rss_mb
+from core.executor import StageExecutor
+from core.manifest import open_manifest
+from core.thread_budget import ThreadBudget
 from config.settings import Config
 
 class LTUASPipeline:
     """Main orchestration pipeline for LTUAS system"""
     
-    def __init__(self):
+    def __init__(self, listeners: Optional[List] = None):
         print("=" * 60)
         print("Initializing LTUAS Pipeline...")
         print("=" * 60)
+
+        Config.ensure_dirs()
+
+        # stage events (spans, cache lookups, finished runs) go to these, e.g. the API server's metrics
+        self.listeners = list(listeners or [])
+        if Config.INSTRUMENTATION_CONFIG["events_file"]:
+            self.listeners.append(EventLog(Config.INSTRUMENTATION_CONFIG["events_file"]))
+        
+        # single_encoder profile: MELLOW's HTSAT tags sounds, CLAP is never loaded
+        self.profile = Config.PIPELINE_PROFILE
+
+        # intra-op threads per stage, set before any model runs so parallel stages don't oversubscribe
+        stages = dict(Config.THREAD_BUDGET_CONFIG["stages"])
+        if self.profile == "single_encoder":
+            stages.pop("clap_embed", None)
+        self.thread_budget = ThreadBudget.from_config(stages)
+        self.thread_budget.apply()
+        if self.thread_budget.enabled:
+            print(f"✓ Thread budget: {self.thread_budget.plan()}")
         
         # Initialize all processors
-        self.clap = CLAPProcessor()
+        self.clap = CLAPProcessor() if self.profile != "single_encoder" else None
+        self.sound_tagger = self.clap if self.clap is not None else AudioSetTagger()
         self.whisper = WhisperProcessor()
         self.llm = LLMLayer()
         self.mellow = MELLOWProcessor()
+        self.vad = VADProcessor() if Config.VAD_CONFIG["enabled"] else None
+
+        # stage 1 fan-out runs on these long-lived pools (threads start on first use and take their stage's thread budget)
+        self.executor = StageExecutor(Config.EXECUTOR_CONFIG["stages"], initializer=self._enter_stage)
+
+        # stage latencies of recent runs (StageRecorder spans feed it)
+        self.stage_histogram = StageHistogram(
+            window=Config.INSTRUMENTATION_CONFIG["histogram_window"],
+            buckets_ms=Config.INSTRUMENTATION_CONFIG["histogram_buckets_ms"],
+        )
+        if self.clap is not None and self.clap.torchscript_cache is not None:
+            self._recorder().emit({"event": "cache", "cache": "clap_torchscript", "result": self.clap.torchscript_cache})
         
         print("=" * 60)
         print("✓ All models loaded successfully")
@@ -35,7 +72,8 @@ class LTUASPipeline:
         self, 
         audio_path: str,
         user_prompt: Optional[str] = None,
-        reference_audio: Optional[str] = None
+        reference_audio: Optional[str] = None,
+        output_dir: Optional[str] = None
     ) -> Dict:
         """
         Process audio through full LTUAS pipeline
@@ -44,32 +82,72 @@ class LTUASPipeline:
             audio_path: Path to audio file
             user_prompt: Optional user guidance
             reference_audio: Optional second audio for comparison
+            output_dir: Where the JSON is saved (default Config.OUTPUT_DIR)
             
         Returns:
             Complete JSON inference
         """
         start_time = time.time()
         audio_path = str(Path(audio_path).resolve())
+        recorder = self._recorder()
         
         print(f"\n{'='*60}")
         print(f"Processing: {Path(audio_path).name}")
         print(f"{'='*60}\n")
         
-        # STAGE 1: Parallel CLAP and Whisper processing
+        # STAGE 0: Decode once, mark speech regions
+        waveform, vad_result = None, None
+        if self.vad is not None:
+            print("Stage 0: Voice activity detection...")
+            try:
+                with recorder.span("audio_decode"):
+                    waveform = self._load_waveform(audio_path)
+                with recorder.span("vad"):
+                    vad_result = self.vad.process(waveform, Config.CLAP_CONFIG["sample_rate"])
+                print(f"  ✓ VAD: {len(vad_result['segments'])} speech segments ({vad_result['speech_ratio']:.0%} voiced)")
+            except Exception as e:
+                print(f"❌ Audio decode error, skipping VAD: {e}")
+                waveform, vad_result = None, None
+
+        # STAGE 1: Parallel CLAP and Whisper processing; MELLOW audio encoding
+        # starts here too and keeps running through stages 2-3 (it needs no prompt)
         print("Stage 1: Parallel feature extraction...")
-        with ThreadPoolExecutor(max_workers=Config.NUM_WORKERS) as executor:
-            future_clap = executor.submit(self.clap.process, audio_path)
-            future_whisper = executor.submit(self.whisper.process, audio_path)
-            
+        executor = self.executor
+        future_mellow_audio = executor.submit(
+            "mellow_encode",
+            recorder.wrap("mellow_encode", self.mellow.encode_audio),
+            audio_path, reference_audio)
+        future_clap = executor.submit(
+            "clap_embed",
+            recorder.wrap("clap_embed", self.clap.process),
+            audio_path, None, waveform) if self.clap is not None else None
+        future_whisper = executor.submit(
+            "whisper_request",
+            recorder.wrap("whisper_request", self.whisper.process, self._whisper_span),
+            audio_path,
+            vad_result,
+            waveform,
+            Config.CLAP_CONFIG["sample_rate"]
+        )
+        
+        if future_clap is not None:
             clap_result = future_clap.result()
-            whisper_result = future_whisper.result()
+        else:
+            mellow_audio = future_mellow_audio.result()
+            with recorder.span("sound_tagging"):
+                clap_result = self.sound_tagger.process(mellow_audio["clipwise"]) if mellow_audio else {
+                    "error": "MELLOW audio encoding failed",
+                    "dominant_sound": "unknown",
+                    "top_sounds": []
+                }
+        whisper_result = future_whisper.result()
         
         print(f"  ✓ CLAP: {clap_result['dominant_sound']} ({clap_result.get('dominant_confidence', 0):.1%})")
         print(f"  ✓ Whisper: {'Speech detected' if whisper_result['has_speech'] else 'No speech'}")
         
         # STAGE 2: Generate soft prompts
         print("\nStage 2: Generating soft prompts...")
-        clap_soft_prompt = self.clap.generate_soft_prompt(clap_result)
+        clap_soft_prompt = self.sound_tagger.generate_soft_prompt(clap_result)
         whisper_soft_prompt = self.whisper.generate_soft_prompt(whisper_result)
         
         print(f"  CLAP prompt: {clap_soft_prompt}")
@@ -77,11 +155,14 @@ class LTUASPipeline:
         
         # STAGE 3: LLM layer synthesis
         print("\nStage 3: LLM layer synthesis...")
-        unified_soft_prompt = self.llm.convert_to_soft_prompt(
-            clap_soft_prompt,
-            whisper_soft_prompt,
-            user_prompt
-        )
+        with recorder.span("llm_request", api="llm") as span:
+            unified_soft_prompt = self.llm.convert_to_soft_prompt(
+                clap_soft_prompt,
+                whisper_soft_prompt,
+                user_prompt
+            )
+            span["tokens"] = (self.llm.last_usage or {}).get("completion_tokens")
+            span["error"] = self.llm.last_error
 
         system_prompt = f" produce a concise analysis covering: high-level summary: {unified_soft_prompt}"
 
@@ -89,33 +170,189 @@ class LTUASPipeline:
         
         # STAGE 4: MELLOW reasoning
         print("\nStage 4: MELLOW reasoning...")
-        mellow_result = self.mellow.process(
-            audio_path,
-            system_prompt,
-            reference_audio
-        )
+        audio_embeds = future_mellow_audio.result()
+        step_span = None
+        if Config.INSTRUMENTATION_CONFIG["decode_steps"]:
+            step_span = lambda step: recorder.span("mellow_decode_step", step=step)
+        with recorder.span("mellow_decode") as span:
+            mellow_result = self.mellow.process(
+                audio_path,
+                system_prompt,
+                reference_audio,
+                audio_embeds=audio_embeds,
+                step_span=step_span
+            )
+            span["tokens"] = (mellow_result.get("decode_stats") or {}).get("tokens")
         print(f"  ✓ Generated {len(mellow_result.get('inference', ''))} chars")
         
-        # Build final JSON output
+        output = self._build_output(
+            audio_path, start_time, user_prompt, recorder,
+            clap_result, whisper_result, vad_result, mellow_result,
+            {"clap": clap_soft_prompt, "whisper": whisper_soft_prompt, "unified": unified_soft_prompt},
+        )
+        
+        # Save to file
+        with recorder.span("json_write"):
+            output_file = self._save_output(output, audio_path, output_dir)
+        return self._finish(output, recorder, output_file)
+    
+    async def process_audio_async(
+        self,
+        audio_path: str,
+        user_prompt: Optional[str] = None,
+        reference_audio: Optional[str] = None,
+        output_dir: Optional[str] = None
+    ) -> Dict:
+        """
+        process_audio for asyncio callers (same stages, same result)
+        
+        The Groq requests are awaited on AsyncGroq; decoding, VAD, model inference and the JSON
+        write run on the pipeline's stage executor, so the event loop never blocks and many runs
+        can be in flight at once. Cancelling the task stops the run at the next stage boundary:
+        stage work that hasn't started is dropped, a stage already running finishes in its thread
+        and its result is discarded.
+        """
+        start_time = time.time()
+        audio_path = str(Path(audio_path).resolve())
+        recorder = self._recorder()
+        run = self.executor.submit_async
+        sample_rate = Config.CLAP_CONFIG["sample_rate"]
+        
+        print(f"\n{'='*60}")
+        print(f"Processing (async): {Path(audio_path).name}")
+        print(f"{'='*60}\n")
+        
+        async def whisper():
+            with recorder.span("whisper_request", cpu=False) as span:
+                prepared = await run("whisper_request", self.whisper.prepare_upload,
+                                     audio_path, vad_result, waveform, sample_rate)
+                result = await self.whisper.transcribe_async(prepared)
+                span.update(self._whisper_span(result))
+                return result
+        
+        tasks = []
+        try:
+            # STAGE 0: Decode once, mark speech regions
+            waveform, vad_result = None, None
+            if self.vad is not None:
+                print("Stage 0: Voice activity detection...")
+                try:
+                    waveform = await run("audio_decode", recorder.wrap("audio_decode", self._load_waveform), audio_path)
+                    vad_result = await run("audio_decode", recorder.wrap("vad", self.vad.process), waveform, sample_rate)
+                    print(f"  ✓ VAD: {len(vad_result['segments'])} speech segments ({vad_result['speech_ratio']:.0%} voiced)")
+                except Exception as e:
+                    print(f"❌ Audio decode error, skipping VAD: {e}")
+                    waveform, vad_result = None, None
+            
+            # STAGE 1: CLAP, Whisper and MELLOW audio encoding at once (MELLOW keeps going through stages 2-3)
+            print("Stage 1: Parallel feature extraction...")
+            mellow_audio_task = asyncio.ensure_future(run(
+                "mellow_encode", recorder.wrap("mellow_encode", self.mellow.encode_audio),
+                audio_path, reference_audio))
+            clap_task = asyncio.ensure_future(run(
+                "clap_embed", recorder.wrap("clap_embed", self.clap.process),
+                audio_path, None, waveform)) if self.clap is not None else None
+            whisper_task = asyncio.ensure_future(whisper())
+            tasks = [t for t in (mellow_audio_task, clap_task, whisper_task) if t is not None]
+            
+            if clap_task is not None:
+                clap_result = await clap_task
+            else:
+                mellow_audio = await mellow_audio_task
+                clap_result = await run(
+                    "sound_tagging", recorder.wrap("sound_tagging", self.sound_tagger.process),
+                    mellow_audio["clipwise"]) if mellow_audio else {
+                        "error": "MELLOW audio encoding failed",
+                        "dominant_sound": "unknown",
+                        "top_sounds": []
+                    }
+            whisper_result = await whisper_task
+            
+            print(f"  ✓ CLAP: {clap_result['dominant_sound']} ({clap_result.get('dominant_confidence', 0):.1%})")
+            print(f"  ✓ Whisper: {'Speech detected' if whisper_result['has_speech'] else 'No speech'}")
+            
+            # STAGE 2: Generate soft prompts
+            clap_soft_prompt = self.sound_tagger.generate_soft_prompt(clap_result)
+            whisper_soft_prompt = self.whisper.generate_soft_prompt(whisper_result)
+            
+            # STAGE 3: LLM layer synthesis
+            print("\nStage 3: LLM layer synthesis...")
+            with recorder.span("llm_request", cpu=False, api="llm") as span:
+                unified_soft_prompt, usage, error = await self.llm.convert_to_soft_prompt_async(
+                    clap_soft_prompt,
+                    whisper_soft_prompt,
+                    user_prompt
+                )
+                span["tokens"] = (usage or {}).get("completion_tokens")
+                span["error"] = error
+            system_prompt = f" produce a concise analysis covering: high-level summary: {unified_soft_prompt}"
+            print(f"  Unified prompt: {unified_soft_prompt}")
+            
+            # STAGE 4: MELLOW reasoning
+            print("\nStage 4: MELLOW reasoning...")
+            audio_embeds = await mellow_audio_task
+            step_span = None
+            if Config.INSTRUMENTATION_CONFIG["decode_steps"]:
+                step_span = lambda step: recorder.span("mellow_decode_step", step=step)
+            mellow_result = await run(
+                "mellow_decode", recorder.wrap("mellow_decode", self.mellow.process, self._decode_span),
+                audio_path, system_prompt, reference_audio, audio_embeds=audio_embeds, step_span=step_span)
+            print(f"  ✓ Generated {len(mellow_result.get('inference', ''))} chars")
+        finally:
+            # cancelled or failed: don't leave stage 1 work queued or in flight behind us
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        output = self._build_output(
+            audio_path, start_time, user_prompt, recorder,
+            clap_result, whisper_result, vad_result, mellow_result,
+            {"clap": clap_soft_prompt, "whisper": whisper_soft_prompt, "unified": unified_soft_prompt},
+        )
+        output_file = await run("json_write", recorder.wrap("json_write", self._save_output), output, audio_path, output_dir)
+        return self._finish(output, recorder, output_file)
+    
+    def _build_output(self, audio_path: str, start_time: float, user_prompt: Optional[str], recorder: StageRecorder,
+                      clap_result: Dict, whisper_result: Dict, vad_result: Optional[Dict], mellow_result: Dict,
+                      soft_prompts: Dict) -> Dict:
+        """Final JSON output (before it is saved)"""
         output = {
             "metadata": {
                 "audio_file": str(Path(audio_path).name),
                 "timestamp": datetime.now().isoformat(),
                 "processing_time_seconds": round(time.time() - start_time, 2),
                 "user_prompt": user_prompt,
+                "profile": self.profile,
+                "peak_rss_mb": peak_rss_mb(),  # process high-water mark, models included
             },
             "clap_inf": clap_result,
             "speech_inf": whisper_result,
+            "vad_inf": vad_result,
             "mellow_inf": mellow_result,
-            "soft_prompts": {
-                "clap": clap_soft_prompt,
-                "whisper": whisper_soft_prompt,
-                "unified": unified_soft_prompt,
-            }
+            "soft_prompts": soft_prompts,
+            "instrumentation": recorder.summary(),
         }
-        
-        # Save to file
-        self._save_output(output, audio_path)
+
+        trace_dir = Config.INSTRUMENTATION_CONFIG["chrome_trace_dir"]
+        if trace_dir:
+            trace_file = Path(trace_dir) / f"{Path(audio_path).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.trace.json"
+            output["metadata"]["trace_file"] = str(trace_file)
+        return output
+    
+    def _finish(self, output: Dict, recorder: StageRecorder, output_file: Path) -> Dict:
+        """After the JSON is saved: the returned result (not the saved file) also carries the json_write span and its path"""
+        output["instrumentation"] = recorder.summary()
+        output["metadata"]["output_file"] = str(output_file)
+        trace_file = output["metadata"].get("trace_file")
+        if trace_file is not None:
+            recorder.write_chrome_trace(trace_file)
+            print(f"📈 Chrome trace saved: {trace_file}")
+        recorder.emit({
+            "event": "run",
+            "output_file": str(output_file),
+            "processing_time_seconds": output["metadata"]["processing_time_seconds"],
+            "peak_rss_mb": output["metadata"]["peak_rss_mb"],
+        })
         
         print(f"\n{'='*60}")
         print(f"✓ Complete! Total time: {output['metadata']['processing_time_seconds']}s")
@@ -123,32 +360,126 @@ class LTUASPipeline:
         
         return output
     
-    def _save_output(self, output: Dict, audio_path: str):
-        """Save JSON output to file"""
+    def _recorder(self) -> StageRecorder:
+        return StageRecorder(self.stage_histogram, self.listeners)
+
+    def _enter_stage(self, stage: str):
+        # looked up per thread start: shard workers resize the budget after fork
+        self.thread_budget.enter(stage)
+
+    @staticmethod
+    def _decode_span(mellow_result: Dict) -> Dict:
+        """mellow_decode span fields: tokens generated"""
+        return {"tokens": (mellow_result.get("decode_stats") or {}).get("tokens")}
+
+    @staticmethod
+    def _whisper_span(whisper_result: Dict) -> Dict:
+        """whisper_request span fields: the Groq API it called (none when VAD found no speech) and its error"""
+        return {
+            "api": None if whisper_result.get("skipped") else "whisper",
+            "error": whisper_result.get("error"),
+        }
+
+    def close(self):
+        """Finish queued stage work and stop the stage threads (also runs at interpreter exit)"""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _load_waveform(self, audio_path: str):
+        """Decode audio for VAD/Whisper as CLAP does, without needing CLAP loaded"""
+        if self.clap is not None:
+            return self.clap.load_waveform(audio_path)
+        import librosa
+        waveform, _ = librosa.load(audio_path, sr=Config.CLAP_CONFIG["sample_rate"])
+        return waveform
+
+    def _save_output(self, output: Dict, audio_path: str, output_dir: Optional[str] = None) -> Path:
+        """Save JSON output to file (written to a temp file and renamed, so a crash leaves no partial JSON)"""
         audio_name = Path(audio_path).stem
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = Config.OUTPUT_DIR / f"{audio_name}_{timestamp}.json"
+        output_dir = Path(output_dir) if output_dir is not None else Config.OUTPUT_DIR
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = output_dir / f"{audio_name}_{timestamp}.json"
+        tmp_file = output_file.with_suffix(".json.tmp")
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(output, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, output_file)
         
         print(f"\n💾 Output saved: {output_file}")
+        return output_file
     
-    def process_batch(self, audio_files: List[str], user_prompt: Optional[str] = None):
-        """Process multiple audio files sequentially"""
+    def process_batch(
+        self,
+        audio_files: List[str],
+        user_prompt: Optional[str] = None,
+        resume: bool = True,
+        output_dir: Optional[str] = None
+    ):
+        """
+        Process multiple audio files sequentially (JSONs go to output_dir, default Config.OUTPUT_DIR)
+        
+        With Config.MANIFEST_CONFIG["enabled"], every file is recorded in the batch manifest
+        (core/manifest.py). resume=True skips files that already have a result for the same
+        content and config (their saved JSON is returned instead), so a rerun only processes
+        new, failed and interrupted files. resume=False reprocesses everything.
+        """
         results = []
+        manifest = open_manifest(user_prompt) if Config.MANIFEST_CONFIG["enabled"] else None
         
         print(f"\n{'='*60}")
         print(f"Batch Processing: {len(audio_files)} files")
         print(f"{'='*60}\n")
         
-        for i, audio_path in enumerate(audio_files, 1):
-            print(f"\n[{i}/{len(audio_files)}] Processing {Path(audio_path).name}...")
-            result = self.process_audio(audio_path, user_prompt)
-            results.append(result)
+        skipped, failed = 0, 0
+        try:
+            for i, audio_path in enumerate(audio_files, 1):
+                done = manifest.completed(audio_path) if manifest is not None and resume else None
+                if done is not None:
+                    with open(done["output_file"], 'r', encoding='utf-8') as f:
+                        results.append(json.load(f))
+                    skipped += 1
+                    print(f"[{i}/{len(audio_files)}] ⏭  {Path(audio_path).name} already done ({done['output_file']})")
+                    continue
+                
+                print(f"\n[{i}/{len(audio_files)}] Processing {Path(audio_path).name}...")
+                if manifest is None:
+                    results.append(self.process_audio(audio_path, user_prompt, output_dir=output_dir))
+                    continue
+                
+                result = self._process_tracked(audio_path, user_prompt, manifest, output_dir)
+                if result is not None:
+                    results.append(result)
+                failed += result is None or not result["mellow_inf"].get("success")
+        finally:
+            if manifest is not None:
+                manifest.close()
         
         print(f"\n{'='*60}")
-        print(f"✓ Batch complete: {len(results)} files processed")
+        print(f"✓ Batch complete: {len(results) - skipped} files processed"
+              + (f", {skipped} skipped (already done)" if skipped else "")
+              + (f", {failed} failed (retried on the next run)" if failed else ""))
         print(f"{'='*60}\n")
         
         return results
+    
+    def _process_tracked(self, audio_path: str, user_prompt: Optional[str], manifest, output_dir: Optional[str] = None):
+        """process_audio with manifest bookkeeping; None if it raised (recorded as failed, the batch goes on)"""
+        manifest.mark_running(audio_path)
+        try:
+            result = self.process_audio(audio_path, user_prompt, output_dir=output_dir)
+        except Exception as e:
+            # recorded and retried by the next run
+            print(f"❌ {Path(audio_path).name} failed: {e}")
+            manifest.mark_failed(audio_path, f"{type(e).__name__}: {e}")
+            return None
+        if result["mellow_inf"].get("success"):
+            manifest.mark_done(audio_path, result["metadata"]["output_file"], result["metadata"]["processing_time_seconds"])
+        else:
+            manifest.mark_failed(audio_path, result["mellow_inf"].get("error", "MELLOW failed"))
+        return result
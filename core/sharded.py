@@ -0,0 +1,177 @@
+"""
+Sharded batch processing: N worker processes, each running whole files through its own pipeline replica.
+
+With the "fork" start method (Linux/macOS, CPU) the models are loaded once in the coordinator and
+the workers are forked after the load, so every replica shares the weights copy-on-write (tensor
+storage is never written during inference). With "spawn" (Windows, or CUDA already initialized)
+each worker loads its own pipeline.
+"""
+import contextlib
+import gc
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import Config
+from core.manifest import open_manifest
+
+# set in the coordinator before forking, or by _init_worker under spawn
+_PIPELINE = None
+_MANIFEST = None
+_INIT_ERROR = None
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) // Config.SHARDED_CONFIG["threads_per_worker"])
+
+
+def _start_method() -> str:
+    method = Config.SHARDED_CONFIG["start_method"]
+    if method:
+        return method
+    if "fork" not in mp.get_all_start_methods():
+        return "spawn"
+    import torch
+    # a forked child cannot use a CUDA context created by its parent
+    return "spawn" if torch.cuda.is_initialized() else "fork"
+
+
+def _init_worker(*args):
+    global _INIT_ERROR
+    try:
+        _setup_worker(*args)
+    except Exception as e:
+        # Pool respawns a worker whose initializer raises, forever; fail its first task instead
+        _INIT_ERROR = f"{type(e).__name__}: {e}"
+
+
+def _setup_worker(threads: int, log_dir: Optional[str], user_prompt: Optional[str], load_pipeline: bool):
+    global _PIPELINE, _MANIFEST
+    import torch
+
+    torch.set_num_threads(threads)
+    with contextlib.suppress(RuntimeError):
+        torch.set_num_interop_threads(1)  # fails if the parent already used inter-op parallelism
+    # the pipeline's stage budget splits this worker's share, not the machine
+    Config.THREAD_BUDGET_CONFIG.update(cores=threads, concurrency=1)
+
+    if log_dir:
+        log = open(Path(log_dir) / f"shard_{os.getpid()}.log", "a", encoding="utf-8", buffering=1)
+        sys.stdout = sys.stderr = log
+
+    if load_pipeline:
+        from core.pipeline import LTUASPipeline
+        _PIPELINE = LTUASPipeline()
+    else:
+        _PIPELINE.thread_budget = _PIPELINE.thread_budget.resized(threads)
+        _PIPELINE.thread_budget.apply()
+        # fresh HTTP connection pools; the forked ones belong to the coordinator
+        from groq import Groq
+        for layer in (_PIPELINE.whisper, _PIPELINE.llm):
+            if layer.client is not None:
+                layer.client = Groq(api_key=layer.client.api_key)
+
+    # each worker writes the manifest through its own connection (never share one across fork)
+    _MANIFEST = open_manifest(user_prompt) if Config.MANIFEST_CONFIG["enabled"] else None
+
+
+def _run_file(task):
+    index, audio_path, user_prompt, output_dir = task
+    if _INIT_ERROR is not None:
+        raise RuntimeError(f"worker {os.getpid()} failed to start: {_INIT_ERROR}")
+    start = time.perf_counter()
+    if _MANIFEST is not None:
+        result = _PIPELINE._process_tracked(audio_path, user_prompt, _MANIFEST, output_dir)
+    else:
+        try:
+            result = _PIPELINE.process_audio(audio_path, user_prompt, output_dir=output_dir)
+        except Exception as e:
+            print(f"❌ {Path(audio_path).name} failed: {e}")
+            result = None
+    return index, os.getpid(), time.perf_counter() - start, result
+
+
+def process_batch_sharded(
+    audio_files: List[str],
+    user_prompt: Optional[str] = None,
+    workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+    resume: bool = True,
+    output_dir: Optional[str] = None,
+    pipeline=None,
+) -> List[Dict]:
+    """
+    Like LTUASPipeline.process_batch, with files spread over `workers` processes (default: one per
+    `threads_per_worker` cores). Files are handed out one at a time, so long files don't stall a shard.
+    `pipeline` is reused as the fork source if given; otherwise one is loaded here (fork) or per worker (spawn).
+    Results come back in input order; files that raised are left out, as in process_batch.
+    """
+    global _PIPELINE
+    threads = threads_per_worker or Config.SHARDED_CONFIG["threads_per_worker"]
+    workers = workers or default_workers()
+    method = _start_method()
+
+    results = [None] * len(audio_files)
+    pending = list(range(len(audio_files)))
+    if Config.MANIFEST_CONFIG["enabled"] and resume:
+        # closed before forking: an SQLite connection must not cross fork
+        with open_manifest(user_prompt) as manifest:
+            for i, audio_path in enumerate(audio_files):
+                done = manifest.completed(audio_path)
+                if done is not None:
+                    with open(done["output_file"], 'r', encoding='utf-8') as f:
+                        results[i] = json.load(f)
+            pending = [i for i, r in enumerate(results) if r is None]
+    skipped = len(audio_files) - len(pending)
+    workers = max(1, min(workers, len(pending)))
+
+    print(f"\n{'='*60}")
+    print(f"Sharded Batch Processing: {len(pending)} files on {workers} workers x {threads} threads ({method})"
+          + (f", {skipped} already done" if skipped else ""))
+    print(f"{'='*60}\n")
+
+    if pending:
+        log_dir = None
+        if Config.SHARDED_CONFIG["worker_logs"]:
+            log_dir = Config.SHARDED_CONFIG["log_dir"]
+            Path(log_dir).mkdir(parents=True, exist_ok=True)
+            print(f"Worker output: {log_dir}/shard_<pid>.log")
+
+        if method == "fork":
+            _PIPELINE = pipeline
+            if _PIPELINE is None:
+                from core.pipeline import LTUASPipeline
+                _PIPELINE = LTUASPipeline()
+            # keep the collector from touching (and so copying) every inherited object page in the workers
+            gc.collect()
+            gc.freeze()
+
+        tasks = [(i, audio_files[i], user_prompt, output_dir) for i in pending]
+        start = time.perf_counter()
+        ctx = mp.get_context(method)
+        try:
+            with ctx.Pool(workers, initializer=_init_worker,
+                          initargs=(threads, log_dir, user_prompt, method != "fork")) as pool:
+                for n, (index, pid, seconds, result) in enumerate(pool.imap_unordered(_run_file, tasks), 1):
+                    results[index] = result
+                    ok = result is not None and result["mellow_inf"].get("success")
+                    print(f"[{n}/{len(tasks)}] {'✓' if ok else '❌'} {Path(audio_files[index]).name} "
+                          f"({seconds:.1f}s, worker {pid})")
+        finally:
+            if method == "fork":
+                gc.unfreeze()
+        wall = time.perf_counter() - start
+        print(f"\n{len(tasks)} files in {wall:.1f}s ({len(tasks) / wall:.2f} files/s)")
+
+    failed = sum(results[i] is None or not results[i]["mellow_inf"].get("success") for i in pending)
+    print(f"\n{'='*60}")
+    print(f"✓ Batch complete: {len(pending)} files processed"
+          + (f", {skipped} skipped (already done)" if skipped else "")
+          + (f", {failed} failed" if failed else ""))
+    print(f"{'='*60}\n")
+
+    return [r for r in results if r is not None]
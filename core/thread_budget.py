@@ -0,0 +1,94 @@
+import os
+from typing import Dict, Optional, Tuple
+
+from config.settings import Config
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (affinity / cgroup cpuset aware where the OS reports it)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ThreadBudget:
+    """
+    Splits this process's share of the machine among the pipeline stages, so parallel stages and
+    concurrent pipelines don't each start a full-size intra-op pool.
+
+    cores // concurrency cores go to one pipeline. Stages in the same group run at the same time and
+    split those cores by weight (weight 0 = 1 thread, e.g. network-bound stages); every stage is capped
+    at its max.
+
+    torch.set_num_threads is not a per-call knob: it is process-wide state that threads created
+    afterwards inherit, so changing and restoring it around each call races with concurrent stages.
+    A stage's count is set once instead, by enter() when its long-lived StageExecutor worker thread
+    starts; work run in the caller's thread uses the process default from apply().
+    """
+
+    def __init__(self, cores: Optional[int] = None, concurrency: int = 1,
+                 stages: Optional[Dict[str, Tuple[str, float, int]]] = None, interop_threads: int = 1,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.cores = cores or available_cores()
+        self.concurrency = max(1, concurrency)
+        self.stages = dict(stages if stages is not None else Config.THREAD_BUDGET_CONFIG["stages"])
+        self.interop_threads = interop_threads
+        self.pipeline_threads = max(1, self.cores // self.concurrency)
+
+        group_weight = {}
+        for group, weight, _ in self.stages.values():
+            group_weight[group] = group_weight.get(group, 0) + weight
+        self._threads = {}
+        for stage, (group, weight, cap) in self.stages.items():
+            share = int(self.pipeline_threads * weight / group_weight[group]) if weight else 1
+            self._threads[stage] = max(1, min(cap, share))
+
+    @classmethod
+    def from_config(cls, stages: Optional[Dict] = None, cores: Optional[int] = None,
+                    concurrency: Optional[int] = None) -> "ThreadBudget":
+        cfg = Config.THREAD_BUDGET_CONFIG
+        return cls(
+            cores=cores or cfg["cores"],
+            concurrency=concurrency or cfg["concurrency"],
+            stages=stages,
+            interop_threads=cfg["interop_threads"],
+            enabled=cfg["enabled"],
+        )
+
+    def resized(self, cores: int, concurrency: int = 1) -> "ThreadBudget":
+        """Same stages over a different share (e.g. one shard worker's cores)"""
+        return ThreadBudget(cores, concurrency, self.stages, self.interop_threads, self.enabled)
+
+    def threads(self, stage: str) -> int:
+        return self._threads.get(stage, self.pipeline_threads)
+
+    def plan(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "cores": self.cores,
+            "concurrency": self.concurrency,
+            "pipeline_threads": self.pipeline_threads,
+            "stages": dict(self._threads),
+        }
+
+    def apply(self):
+        """Process defaults: intra-op threads of the calling (and later-created) threads, inter-op pool size"""
+        if not self.enabled:
+            return
+        import torch
+
+        torch.set_num_threads(self.pipeline_threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError:
+                pass  # only settable before the first inter-op task; keep whatever is in place
+
+    def enter(self, stage: str):
+        """Give the calling thread `stage`'s count (StageExecutor initializer: once per worker thread, never restored)"""
+        if not self.enabled:
+            return
+        import torch
+
+        torch.set_num_threads(self.threads(stage))
@@ -26,7 +26,7 @@ base = Path.cwd()
 folders_to_check = [
     "external_models",
     "external_models/CLAP",
-    "external_models/mellow",
+    "external_models/Mellow",
     "config",
     "models",
     "core",
@@ -43,7 +43,7 @@ print(f"   {sys.executable}")
 
 # Check if we can find the model folders
 print(f"\n4. Looking for model files:")
-mellow_path = base / "external_models" / "mellow"
+mellow_path = base / "external_models" / "Mellow"
 clap_path = base / "external_models" / "CLAP"
 
 if mellow_path.exists():
@@ -86,8 +86,13 @@ try:
 except ImportError as e:
     print(f"   {FAIL} Groq failed: {e}")
 
-# Try CLAP import
+# Try CLAP import (vendored sources first, as the pipeline does)
 print(f"\n6. Testing CLAP import:")
+try:
+    from config.paths import add_model_paths
+    add_model_paths()
+except ImportError as e:
+    print(f"   {FAIL} config.paths import failed: {e}")
 try:
     import laion_clap
     print(f"   {OK} laion_clap imported successfully")
@@ -96,26 +101,8 @@ except ImportError as e:
     print(f"   {FAIL} laion_clap import failed: {e}")
     print(f"     Try: pip install laion-clap")
 
-# IMPORTANT: Import config to add Mellow to path
+# Mellow is on sys.path since step 6 (add_model_paths)
 print(f"\n7. Testing Mellow import:")
-print(f"   (Importing config to add Mellow to sys.path...)")
-try:
-    import config  # This adds Mellow to sys.path (if configured)
-    print(f"   Config module loaded")
-except ImportError as e:
-    print(f"   {FAIL} Config import failed: {e}")
-
-# Ensure external_models/mellow is on sys.path so 'mellow' package can be resolved
-mellow_dir = base / "external_models" / "mellow"
-mellow_pkg_dir = mellow_dir / "mellow"
-if mellow_pkg_dir.exists():
-    p = str(mellow_dir)
-    if p not in sys.path:
-        sys.path.insert(0, p)
-        print(f"   Added {p} to sys.path")
-else:
-    print(f"   {FAIL} mellow package not found at {mellow_pkg_dir}")
-
 try:
     from mellow import MellowWrapper
     import mellow
@@ -123,7 +110,7 @@ try:
     print(f"     Location: {mellow.__file__}")
 except ImportError as e:
     print(f"   {FAIL} mellow import failed: {e}")
-    print(f"     Make sure external_models/mellow/mellow exists or config/__init__.py adds Mellow to sys.path")
+    print(f"     Make sure external_models/Mellow/mellow exists (config.paths.add_model_paths() adds it to sys.path)")
 
 # Check environment variables
 print(f"\n8. Environment variables:")
@@ -270,9 +270,10 @@ def window_reverse(windows, window_size, H, W):
     Returns:
         x: (B, H, W, C)
     """
-    B = int(windows.shape[0] / (H * W / window_size / window_size))
-    x = windows.view(B, H // window_size, W // window_size, window_size, window_size, -1)
-    x = x.permute(0, 1, 3, 2, 4, 5).contiguous().view(B, H, W, -1)
+    # batch size inferred by view (-1) so a traced graph keeps it dynamic
+    C = windows.shape[-1]
+    x = windows.view(-1, H // window_size, W // window_size, window_size, window_size, C)
+    x = x.permute(0, 1, 3, 2, 4, 5).contiguous().view(-1, H, W, C)
     return x
 
 
@@ -323,22 +324,45 @@ class WindowAttention(nn.Module):
         trunc_normal_(self.relative_position_bias_table, std=.02)
         self.softmax = nn.Softmax(dim=-1)
 
-    def forward(self, x, mask=None):
+    def forward(self, x, mask=None, need_weights=True):
         """
         Args:
             x: input features with shape of (num_windows*B, N, C)
             mask: (0/-inf) mask with shape of (num_windows, Wh*Ww, Wh*Ww) or None
+            need_weights: return the attention map; if False, use the fused SDPA kernel and return None for it
         """
         B_, N, C = x.shape
         qkv = self.qkv(x).reshape(B_, N, 3, self.num_heads, C // self.num_heads).permute(2, 0, 3, 1, 4)
         q, k, v = qkv[0], qkv[1], qkv[2]  # make torchscript happy (cannot use tensor as tuple)
 
-        q = q * self.scale
-        attn = (q @ k.transpose(-2, -1))
-
         relative_position_bias = self.relative_position_bias_table[self.relative_position_index.view(-1)].view(
             self.window_size[0] * self.window_size[1], self.window_size[0] * self.window_size[1], -1)  # Wh*Ww,Wh*Ww,nH
         relative_position_bias = relative_position_bias.permute(2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+
+        if not need_weights:
+            # SDPA scales by 1/sqrt(head_dim) itself; fold in any other qk_scale here, since its
+            # scale= argument needs torch >= 2.1 (MELLOW pins 2.0)
+            q = q * (self.scale * q.shape[-1] ** 0.5)
+            # bias and shift mask become one additive mask, broadcast over the batch by viewing
+            # the windows as (B, nW, nH, N, head_dim) instead of expanding the mask to nW*B
+            if mask is not None:
+                nW = mask.shape[0]
+                attn_mask = relative_position_bias.unsqueeze(0) + mask.unsqueeze(1)  # nW, nH, N, N
+                q = q.view(B_ // nW, nW, self.num_heads, N, -1)
+                k = k.view(B_ // nW, nW, self.num_heads, N, -1)
+                v = v.view(B_ // nW, nW, self.num_heads, N, -1)
+            else:
+                attn_mask = relative_position_bias.unsqueeze(0)
+            x = F.scaled_dot_product_attention(
+                q, k, v, attn_mask=attn_mask.to(q.dtype),
+                dropout_p=self.attn_drop.p if self.training else 0.)
+            x = x.reshape(B_, self.num_heads, N, -1).transpose(1, 2).reshape(B_, N, C)
+            x = self.proj(x)
+            x = self.proj_drop(x)
+            return x, None
+
+        q = q * self.scale
+        attn = (q @ k.transpose(-2, -1))
         attn = attn + relative_position_bias.unsqueeze(0)
 
         if mask is not None:
@@ -436,7 +460,7 @@ class SwinTransformerBlock(nn.Module):
 
         self.register_buffer("attn_mask", attn_mask)
 
-    def forward(self, x):
+    def forward(self, x, need_weights=True):
         # pdb.set_trace()
         H, W = self.input_resolution
         # print("H: ", H)
@@ -460,7 +484,7 @@ class SwinTransformerBlock(nn.Module):
         x_windows = x_windows.view(-1, self.window_size * self.window_size, C)  # nW*B, window_size*window_size, C
 
         # W-MSA/SW-MSA
-        attn_windows, attn = self.attn(x_windows, mask=self.attn_mask)  # nW*B, window_size*window_size, C
+        attn_windows, attn = self.attn(x_windows, mask=self.attn_mask, need_weights=need_weights)  # nW*B, window_size*window_size, C
 
         # merge windows
         attn_windows = attn_windows.view(-1, self.window_size, self.window_size, C)
@@ -575,18 +599,20 @@ class BasicLayer(nn.Module):
         else:
             self.downsample = None
 
-    def forward(self, x):
+    def forward(self, x, need_weights=False):
+        # attention maps are only materialized (and averaged over blocks) when need_weights is set
         attns = []
+        attn = None
         for blk in self.blocks:
             if self.use_checkpoint:
                 x = checkpoint.checkpoint(blk, x)
             else:
-                x, attn = blk(x)
-                if not self.training:
+                x, attn = blk(x, need_weights=need_weights)
+                if need_weights and not self.training:
                     attns.append(attn.unsqueeze(0))
         if self.downsample is not None:
             x = self.downsample(x)
-        if not self.training:
+        if attns:
             attn = torch.cat(attns, dim = 0)
             attn = torch.mean(attn, dim = 0)
         return x, attn
@@ -5,6 +5,8 @@ Adapted to the Audio Task.
 """
 
 from collections import OrderedDict
+import hashlib
+import inspect
 from dataclasses import dataclass
 from email.mime import audio
 from typing import Tuple, Union, Callable, Optional
@@ -722,8 +724,9 @@ class CLAP(nn.Module):
 
         Parameters
         ----------
-        data: a list of dict
-            the audio input dict list from 'get_audio_feature' method
+        data: a list of dict | dict
+            the audio input dict list from 'get_audio_feature' method,
+            or an already batched dict from 'get_audio_features_batch'
 
         Returns
         ----------
@@ -732,10 +735,13 @@ class CLAP(nn.Module):
 
         """
         device = next(self.parameters()).device
-        input_dict = {}
-        keys = data[0].keys()
-        for k in keys:
-            input_dict[k] = torch.cat([d[k].unsqueeze(0) for d in data], dim=0).to(device)
+        if isinstance(data, dict):
+            input_dict = {k: v.to(device) for k, v in data.items()}
+        else:
+            input_dict = {}
+            keys = data[0].keys()
+            for k in keys:
+                input_dict[k] = torch.cat([d[k].unsqueeze(0) for d in data], dim=0).to(device)
         audio_embeds = self.encode_audio(input_dict, device=device)["embedding"]
         audio_embeds = self.audio_projection(audio_embeds)
         audio_embeds = F.normalize(audio_embeds, dim=-1)
@@ -890,3 +896,59 @@ def trace_model(model, batch_size=256, device=torch.device("cpu")):
     )
     model.audio_cfg.audio_length = audio_length  # Question: what does this do?
     return model
+
+
+class AudioEncoderForExport(nn.Module):
+    """Audio branch + audio_projection + L2 norm of a non-fusion CLAP model as a waveform -> embedding module"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.audio_branch = model.audio_branch
+        self.audio_projection = model.audio_projection
+
+    def forward(self, waveform):
+        audio_embeds = self.audio_branch({"waveform": waveform}, mixup_lambda=None, device=waveform.device)["embedding"]
+        return F.normalize(self.audio_projection(audio_embeds), dim=-1)
+
+
+def audio_encoder_fingerprint(model):
+    """What a trace of the audio side bakes in besides the weights: the torch version and the source of every
+    non-torch module class in it (HTSAT, front-end, projection). A saved trace with another fingerprint is stale."""
+    encoder = AudioEncoderForExport(model)
+    sources = sorted({inspect.getsourcefile(type(m)) for m in encoder.modules() if not type(m).__module__.startswith("torch.")})
+    digest = hashlib.sha256()
+    for source in sources:
+        with open(source, "rb") as f:
+            digest.update(f.read())
+    return f"torch-{torch.__version__}-{digest.hexdigest()[:16]}"
+
+
+def trace_audio_encoder(model, batch_size=2, audio_length=480000, device=torch.device("cpu")):
+    """Trace the audio side of CLAP into a TorchScript module taking (B, audio_length) waveforms,
+    i.e. the "waveform" entry of get_audio_features_batch. The batch size stays dynamic.
+    Fusion models pick mel inputs per clip at runtime and are not supported."""
+    if getattr(model.audio_branch, "enable_fusion", False):
+        raise ValueError("trace_audio_encoder only supports non-fusion CLAP models")
+    encoder = AudioEncoderForExport(model).eval()
+    example_audio = torch.randn((batch_size, audio_length), device=device) * 0.1
+    with torch.no_grad():
+        traced = torch.jit.trace(encoder, example_audio)
+    return traced
+
+
+def save_audio_encoder(traced, path, model):
+    """torch.jit.save a trace_audio_encoder module, stamped with the audio_encoder_fingerprint of `model`"""
+    torch.jit.save(traced, path, _extra_files={"fingerprint": audio_encoder_fingerprint(model)})
+
+
+def load_audio_encoder(path, model, map_location=None):
+    """Load a save_audio_encoder file. Raises ValueError if it was traced from other encoder code or
+    another torch version than `model` runs now (stale: export it again)."""
+    extra_files = {"fingerprint": ""}
+    traced = torch.jit.load(path, map_location=map_location, _extra_files=extra_files)
+    saved = extra_files["fingerprint"]
+    saved = saved.decode() if isinstance(saved, bytes) else saved
+    current = audio_encoder_fingerprint(model)
+    if saved != current:
+        raise ValueError(f"stale audio encoder export {path} (traced as {saved or 'unknown'}, now {current})")
+    return traced.eval()
@@ -10,12 +10,12 @@ import logging
 import torch
 import librosa
 from clap_module import create_model
-from .training.data import get_audio_features
-from .training.data import int16_to_float32, float32_to_int16
+from .training.data import get_audio_features_batch
 
 from transformers import RobertaTokenizer
 import wget
 from clap_module.factory import load_state_dict
+from clap_module.model import trace_audio_encoder, save_audio_encoder, load_audio_encoder
 
 
 class CLAP_Module(torch.nn.Module):
@@ -61,6 +61,7 @@ class CLAP_Module(torch.nn.Module):
         self.model = model
         self.model_cfg = model_cfg
         self.tokenize = RobertaTokenizer.from_pretrained('roberta-base')
+        self.audio_encoder = None  # TorchScript audio encoder, see load_audio_encoder
 
     def tokenizer(self, text):
         result = self.tokenize(
@@ -133,23 +134,17 @@ class CLAP_Module(torch.nn.Module):
             audio embeddings that extracted from audio files
         """ 
         self.model.eval()
-        audio_input = []
-        for f in x:
-            # load the waveform of the shape (T,), should resample to 48000
-            audio_waveform, _ = librosa.load(f, sr=48000)           
-            # quantize
-            audio_waveform = int16_to_float32(float32_to_int16(audio_waveform))
-            audio_waveform = torch.from_numpy(audio_waveform).float()
-            temp_dict = {}
-            temp_dict = get_audio_features(
-                temp_dict, audio_waveform, 480000, 
-                data_truncating='fusion' if self.enable_fusion else 'rand_trunc', 
-                data_filling='repeatpad',
-                audio_cfg=self.model_cfg['audio_cfg'],
-                require_grad=audio_waveform.requires_grad
-            )
-            audio_input.append(temp_dict)
-        audio_embed = self.model.get_audio_embedding(audio_input)
+        # load the waveforms of the shape (T,), should resample to 48000
+        audio_waveforms = [torch.from_numpy(librosa.load(f, sr=48000)[0]) for f in x]
+        # quantize, pad/repeat and truncate as one batch
+        audio_input = get_audio_features_batch(
+            audio_waveforms, 480000,
+            data_truncating='fusion' if self.enable_fusion else 'rand_trunc',
+            data_filling='repeatpad',
+            audio_cfg=self.model_cfg['audio_cfg'],
+            quantize=True
+        )
+        audio_embed = self._embed_audio_input(audio_input)
         if not use_tensor:
             audio_embed = audio_embed.detach().cpu().numpy()
         return audio_embed
@@ -171,26 +166,59 @@ class CLAP_Module(torch.nn.Module):
             audio embeddings that extracted from audio files
         """ 
         self.model.eval()
-        audio_input = []
-        for audio_waveform in x:          
-            # quantize
-            if not use_tensor:
-                audio_waveform = int16_to_float32(float32_to_int16(audio_waveform))
-                audio_waveform = torch.from_numpy(audio_waveform).float()
-            temp_dict = {}
-            temp_dict = get_audio_features(
-                temp_dict, audio_waveform, 480000, 
-                data_truncating='fusion' if self.enable_fusion else 'rand_trunc', 
-                data_filling='repeatpad',
-                audio_cfg=self.model_cfg['audio_cfg'],
-                require_grad=audio_waveform.requires_grad
-            )
-            audio_input.append(temp_dict)
-        audio_embed = self.model.get_audio_embedding(audio_input)
+        if not use_tensor:
+            x = [torch.from_numpy(audio_waveform) for audio_waveform in x]
+        require_grad = x.requires_grad if torch.is_tensor(x) else any(w.requires_grad for w in x)
+        # quantize (numpy input only), pad/repeat and truncate as one batch
+        audio_input = get_audio_features_batch(
+            x, 480000,
+            data_truncating='fusion' if self.enable_fusion else 'rand_trunc',
+            data_filling='repeatpad',
+            audio_cfg=self.model_cfg['audio_cfg'],
+            require_grad=require_grad,
+            quantize=not use_tensor
+        )
+        audio_embed = self._embed_audio_input(audio_input, require_grad)
         if not use_tensor:
             audio_embed = audio_embed.detach().cpu().numpy()
         return audio_embed
 
+    def _embed_audio_input(self, audio_input, require_grad=False):
+        """Embed a batched audio input dict, through the TorchScript audio encoder when one is loaded"""
+        if self.audio_encoder is None or require_grad:
+            return self.model.get_audio_embedding(audio_input)
+        device = next(self.model.parameters()).device
+        with torch.no_grad():
+            return self.audio_encoder(audio_input["waveform"].to(device))
+
+    def export_audio_encoder(self, path, batch_size=2):
+        """Trace the audio branch and audio_projection (with the loaded weights) into a TorchScript file
+
+        Parameters
+        ----------
+        path: str
+            file to save the traced module to
+        batch_size: int
+            batch size of the example input used for tracing; the saved module accepts any batch size
+        Returns
+        ----------
+        path: str
+        """
+        if self.enable_fusion:
+            raise ValueError("export_audio_encoder only supports the non-fusion CLAP model")
+        self.model.eval()
+        device = next(self.model.parameters()).device
+        traced = trace_audio_encoder(self.model, batch_size=batch_size, audio_length=480000, device=device)
+        save_audio_encoder(traced, path, self.model)
+        return path
+
+    def load_audio_encoder(self, path):
+        """Use a TorchScript audio encoder saved by export_audio_encoder for audio embeddings.
+        Gradient-preserving calls (use_tensor with requires_grad) still run the eager model.
+        Raises ValueError if the file was exported from other encoder code or another torch version."""
+        device = next(self.model.parameters()).device
+        self.audio_encoder = load_audio_encoder(path, self.model, map_location=device)
+
     def get_text_embedding(self, x, tokenizer = None, use_tensor = False):
         """get text embeddings from texts
 
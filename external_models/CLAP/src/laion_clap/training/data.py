@@ -360,24 +360,48 @@ def sample_prop(sizefile, inputs, proportion, is_local=True):
     )
 
 
+# cached mel front-ends, keyed by the audio_cfg fields they depend on and the device
+_MEL_FRONTENDS = {}
+
+
+def get_mel_frontend(audio_cfg, device):
+    """
+    Return the (MelSpectrogram, AmplitudeToDB) module for audio_cfg on device.
+    It is built once, so the STFT window and mel filterbank are reused across calls.
+    """
+    key = (
+        audio_cfg['sample_rate'],
+        audio_cfg['window_size'],
+        audio_cfg['hop_size'],
+        audio_cfg['mel_bins'],
+        audio_cfg['fmin'],
+        audio_cfg['fmax'],
+        str(device),
+    )
+    frontend = _MEL_FRONTENDS.get(key)
+    if frontend is None:
+        mel_tf = torchaudio.transforms.MelSpectrogram(
+            sample_rate=audio_cfg['sample_rate'],
+            n_fft=audio_cfg['window_size'],
+            win_length=audio_cfg['window_size'],
+            hop_length=audio_cfg['hop_size'],
+            center=True,
+            pad_mode="reflect",
+            power=2.0,
+            norm=None,
+            onesided=True,
+            n_mels=audio_cfg['mel_bins'],
+            f_min=audio_cfg['fmin'],
+            f_max=audio_cfg['fmax']
+        )
+        frontend = torch.nn.Sequential(mel_tf, torchaudio.transforms.AmplitudeToDB(top_db=None)).to(device)
+        _MEL_FRONTENDS[key] = frontend
+    return frontend
+
+
 def get_mel(audio_data, audio_cfg):
-    # mel shape: (n_mels, T)
-    mel_tf = torchaudio.transforms.MelSpectrogram(
-        sample_rate=audio_cfg['sample_rate'],
-        n_fft=audio_cfg['window_size'],
-        win_length=audio_cfg['window_size'],
-        hop_length=audio_cfg['hop_size'],
-        center=True,
-        pad_mode="reflect",
-        power=2.0,
-        norm=None,
-        onesided=True,
-        n_mels=audio_cfg['mel_bins'],
-        f_min=audio_cfg['fmin'],
-        f_max=audio_cfg['fmax']
-    ).to(audio_data.device)
-    
-    mel = mel_tf(audio_data)
+    # audio_data: (T,) or batched (B, T); mel shape: (T, n_mels) or (B, T, n_mels)
+    mel = get_mel_frontend(audio_cfg, audio_data.device)(audio_data)
     # Align to librosa:
     # librosa_melspec = librosa.feature.melspectrogram(
     #     waveform,
@@ -394,9 +418,8 @@ def get_mel(audio_data, audio_cfg):
     #     f_min=audio_cfg['fmin'],
     #     f_max=audio_cfg['fmax']
     # )
-    # we use log mel spectrogram as input
-    mel = torchaudio.transforms.AmplitudeToDB(top_db=None)(mel)
-    return mel.T  # (T, n_mels)
+    # we use log mel spectrogram as input (AmplitudeToDB is the second stage of the front-end)
+    return mel.transpose(-1, -2)  # (..., T, n_mels)
 
 
 def get_audio_features(sample, audio_data, max_len, data_truncating, data_filling, audio_cfg, require_grad=False):
@@ -464,7 +487,7 @@ def get_audio_features(sample, audio_data, max_len, data_truncating, data_fillin
                 )
             # random crop to max_len (for compatibility)
             overflow = len(audio_data) - max_len
-            idx = np.random.integers(0, overflow + 1)
+            idx = np.random.randint(0, overflow + 1)
             audio_data = audio_data[idx: idx + max_len]
 
         else:  # padding if too short
@@ -506,6 +529,76 @@ def get_audio_features(sample, audio_data, max_len, data_truncating, data_fillin
     return sample
 
 
+def get_audio_features_batch(audio_data, max_len, data_truncating, data_filling, audio_cfg, require_grad=False, quantize=False):
+    """
+    Batched version of get_audio_features: build the model input for a whole batch at once.
+    audio_data: a list of 1D tensors of any length, or a tensor of shape (B, T).
+    quantize: round-trip the waveforms through int16 (on the tensor) before padding/cropping.
+    Other arguments are as in get_audio_features.
+    Returns a dict of batched tensors: "waveform" (B, max_len), "longer" (B, 1) and,
+    for fusion, "mel_fusion" (B, 4, T, n_mels). It can be passed to CLAP.get_audio_embedding directly.
+    """
+    grad_fn = suppress if require_grad else torch.no_grad
+    with grad_fn():
+        if isinstance(audio_data, torch.Tensor) and audio_data.dim() == 2:
+            padded = audio_data
+            lengths = torch.full((padded.shape[0],), padded.shape[1], dtype=torch.long)
+        else:
+            audio_data = [torch.as_tensor(x) for x in audio_data]
+            lengths = torch.tensor([len(x) for x in audio_data], dtype=torch.long)
+            padded = torch.nn.utils.rnn.pad_sequence(audio_data, batch_first=True)
+        if quantize:
+            padded = int16_to_float32_torch(float32_to_int16_torch(padded))
+        else:
+            padded = padded.float()
+        lengths = lengths.to(padded.device)
+
+        # one gather builds every output row: crop long clips, repeat/pad short ones
+        pos = torch.arange(max_len, device=padded.device).unsqueeze(0)
+        length = lengths.unsqueeze(1)
+        longer = lengths > max_len
+        if data_filling == "repeatpad":
+            idx = pos % length
+            valid = pos < (max_len // length) * length
+        elif data_filling == "pad":
+            idx = pos
+            valid = pos < length
+        elif data_filling == "repeat":
+            idx = pos % length
+            valid = torch.ones_like(pos, dtype=torch.bool).expand(len(lengths), -1)
+        else:
+            raise NotImplementedError(
+                f"data_filling {data_filling} not implemented"
+            )
+        # random crop to max_len for clips that are too long
+        start = (torch.rand(len(lengths), device=padded.device) * (lengths - max_len + 1).clamp(min=1)).long()
+        idx = torch.where(longer.unsqueeze(1), start.unsqueeze(1) + pos, idx)
+        valid = valid | longer.unsqueeze(1)
+        waveform = torch.gather(padded, 1, torch.where(valid, idx, 0)) * valid
+
+        sample = {"waveform": waveform}
+        if data_truncating == "rand_trunc":
+            sample["longer"] = longer.unsqueeze(1).cpu()
+        elif data_truncating == "fusion":
+            # short clips share one batched mel; long clips need their own full-length mel
+            mel = get_mel(waveform, audio_cfg)
+            mel_fusion = mel.unsqueeze(1).repeat(1, 4, 1, 1)
+            longer_fusion = torch.zeros(len(lengths), 1, dtype=torch.bool)
+            for i in torch.where(longer)[0].tolist():
+                long_sample = get_audio_features(
+                    {}, padded[i, :lengths[i]], max_len, data_truncating, data_filling, audio_cfg, require_grad)
+                mel_fusion[i] = long_sample["mel_fusion"]
+                longer_fusion[i] = long_sample["longer"]
+            sample["mel_fusion"] = mel_fusion
+            sample["longer"] = longer_fusion
+        else:
+            raise NotImplementedError(
+                f"data_truncating {data_truncating} not implemented"
+            )
+
+    return sample
+
+
 def select_text(json_dict_raw, text_augment_selection):
     # For selecting augmented text from dataset
     if text_augment_selection is None or text_augment_selection == "none":
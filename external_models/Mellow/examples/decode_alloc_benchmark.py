@@ -0,0 +1,113 @@
+import argparse
+import time
+from types import SimpleNamespace
+import torch
+import transformers
+from torch.profiler import profile, ProfilerActivity
+from tqdm import tqdm
+from mellow import MellowWrapper
+from mellow.model.decoder import DecoderModel
+
+# Micro-benchmark of the bookkeeping in MellowWrapper._generate_batch, which writes the tokens, embeddings and
+# attention mask into preallocated buffers. --baseline also runs the previous loop (torch.cat growth every step)
+# on the same wrapper and checks that both pick the same tokens.
+# The wrapper holds a random-weight Llama with SmolLM2-135M widths (d=576, 49152 tokens) but only a few layers,
+# so the per-step allocations and copies are a visible share of the time. Left-padded 129-token prompts after
+# the audio prefix, as with text_padding="longest".
+BATCH, PREFIX, DIM, VOCAB = 4, 197, 576, 49152
+PADS = [0, 8, 16, 32]
+
+
+def random_mellow(layers, device):
+    # no checkpoint, tokenizer or audio encoder: only what _generate_batch touches
+    torch.manual_seed(0)
+    cfg = transformers.LlamaConfig(vocab_size=VOCAB, hidden_size=DIM, intermediate_size=1536, num_hidden_layers=layers,
+                                   num_attention_heads=9, num_key_value_heads=3, max_position_embeddings=2048)
+    decoder = DecoderModel.__new__(DecoderModel)
+    torch.nn.Module.__init__(decoder)
+    decoder.text_decoder = "smollm2"
+    decoder.prefix_length = 0
+    decoder.lm = transformers.LlamaForCausalLM(cfg).to(device).eval()
+
+    mellow = MellowWrapper.__new__(MellowWrapper)
+    mellow.model = SimpleNamespace(caption_decoder=decoder, eval=lambda: None)
+    # the stop token is an id the LM can't produce, so every loop runs all steps
+    mellow.tokenizer = SimpleNamespace(encode=lambda text: [VOCAB])
+    mellow._decode_tokens = lambda tokens: tokens.tolist()
+    return mellow
+
+
+def cat_generate_batch(self, embed=None, entry_length=300, top_p=0.8, temperature=1., stop_token='<|endoftext|>',
+                       attention_mask=None):
+    # MellowWrapper._generate_batch before the preallocated buffers (previous behaviour, for --baseline)
+    self.model.eval()
+    tokens = None
+    stop_token_index = self.tokenizer.encode(stop_token)[0]
+
+    with torch.no_grad():
+        generated = embed
+        position_ids = self._position_ids(attention_mask) if attention_mask is not None else None
+
+        for i in tqdm(range(entry_length)):
+            outputs = self.model.caption_decoder.lm(inputs_embeds=generated, attention_mask=attention_mask, position_ids=position_ids)
+            next_token = self._select_next_token(outputs.logits[:, -1, :], top_p, temperature)
+            next_token_embed = self.model.caption_decoder.embed_tokens(next_token)
+
+            if tokens is None:
+                tokens = next_token
+            else:
+                tokens = torch.cat((tokens, next_token), dim=1)
+            generated = torch.cat((generated, next_token_embed), dim=1)
+            if attention_mask is not None:
+                attention_mask = torch.cat((attention_mask, attention_mask.new_ones((attention_mask.shape[0], 1))), dim=1)
+                position_ids = torch.cat((position_ids, position_ids[:, -1:] + 1), dim=1)
+
+            condition = (tokens == stop_token_index).sum(dim=-1)
+            if (condition > 0).all():
+                break
+
+    return self._decode_tokens(tokens)
+
+
+def measure(decode, device):
+    activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if device.type == "cuda" else [])
+    with profile(activities=activities, profile_memory=True) as prof:
+        decode()
+    # allocations are attributed to the op that made them, frees show up as negative "[memory]" events
+    allocs = [e for e in prof.events() if e.name != "[memory]"
+              and (e.self_cpu_memory_usage > 0 or e.self_device_memory_usage > 0)]
+    n_bytes = sum(max(e.self_cpu_memory_usage, 0) + max(e.self_device_memory_usage, 0) for e in allocs)
+
+    start = time.perf_counter()
+    decode()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    elapsed = (time.perf_counter() - start) * 1000
+    return len(allocs), n_bytes, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allocations and time of MellowWrapper._generate_batch")
+    parser.add_argument("--baseline", action="store_true", help="also run the previous torch.cat loop and compare")
+    parser.add_argument("--steps", type=int, default=50, help="decode steps (the LM never stops early)")
+    parser.add_argument("--layers", type=int, default=2, help="decoder layers (SmolLM2-135M has 30)")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    mellow = random_mellow(args.layers, device)
+    embed = torch.randn(BATCH, PREFIX, DIM, device=device)
+    attention_mask = (torch.arange(PREFIX) >= torch.tensor(PADS)[:, None]).long().to(device)
+    kwargs = dict(embed=embed, entry_length=args.steps, top_p=0.8, temperature=1.0, attention_mask=attention_mask)
+
+    loops = {}
+    if args.baseline:
+        loops["torch.cat"] = lambda: cat_generate_batch(mellow, **kwargs)
+    loops["preallocated"] = lambda: mellow._generate_batch(**kwargs)
+    if args.baseline:
+        assert loops["torch.cat"]() == loops["preallocated"](), "the loops picked different tokens"
+
+    print(f"batch {BATCH}, prefix {PREFIX}, d {DIM}, {args.layers} layers, {args.steps} steps on {device}")
+    results = {name: measure(decode, device) for name, decode in loops.items()}
+    print(f"{'loop':<14}{'allocations':>12}{'MB allocated':>14}{'ms':>10}")
+    for name, (n_allocs, n_bytes, elapsed) in results.items():
+        print(f"{name:<14}{n_allocs:>12}{n_bytes / 2**20:>14.1f}{elapsed:>10.1f}")
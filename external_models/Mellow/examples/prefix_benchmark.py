@@ -0,0 +1,64 @@
+import time
+import torch
+from pathlib import Path
+import os
+from mellow import MellowWrapper
+
+
+def timed(fn, repeats):
+    # warm-up, then mean wall time in ms
+    fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == "__main__":
+    # setup cuda and device
+    cuda = torch.cuda.is_available()
+    device = 0 if cuda else "cpu"
+
+    # setup mellow
+    mellow = MellowWrapper(
+                        config="v0",
+                        model = "v0",
+                        device=device,
+                        use_cuda=cuda,
+                        seed=0,
+                    )
+
+    # pick up audio file paths
+    parent_path = Path(os.path.realpath(__file__)).parent.parent
+    path1 = os.path.join(parent_path, "resource", "1.wav")
+    audio_embed = mellow.encode_audio([path1])
+
+    # prompts of increasing length, decoded with a fixed number of steps
+    base = "describe the sounds in the audio and what they say about the surroundings"
+    prompts = [" ".join([base] * n) for n in (1, 2, 4, 8)]
+    max_len = 30
+    repeats = 3
+
+    print(f"{'padding':<12}{'text tokens':>12}{'prefix len':>12}{'prefill ms':>12}{'generate ms':>13}")
+    for prompt in prompts:
+        for padding in ("max_length", "longest"):
+            mellow.text_padding = padding
+            text_embed = mellow.preprocess_text([prompt])
+            with torch.no_grad():
+                prefix, attention_mask = mellow.model.generate_prefix_from_embeddings(
+                    audio_embed, audio_embed, text_embed, return_mask=True)
+
+            def prefill():
+                with torch.no_grad():
+                    mellow.model.caption_decoder.lm(inputs_embeds=prefix, attention_mask=attention_mask,
+                                                    position_ids=mellow._position_ids(attention_mask))
+
+            def generate():
+                mellow.generate_from_audio_embeddings(audio_embed, audio_embed, [prompt], max_len=max_len, top_p=0.8, temperature=1.0)
+
+            n_text = int(text_embed['attention_mask'].sum()) if padding == "longest" else text_embed['input_ids'].shape[1]
+            print(f"{padding:<12}{n_text:>12}{prefix.shape[1]:>12}{timed(prefill, repeats):>12.1f}{timed(generate, repeats):>13.1f}")
@@ -7,4 +7,5 @@ hop_size = 320 # 160 for scv2, 320 for audioset and esc-50
 mel_bins = 64
 fmin = 50
 fmax = 14000
-htsat_attn_heatmap = False
\ No newline at end of file
+htsat_attn_heatmap = False
+crop_batch_size = 8 # max crops per batched HTSAT pass for long clips (None = all crops at once)
\ No newline at end of file
@@ -33,26 +33,34 @@ class DecoderModel(nn.Module):
     def get_dummy_token(self, batch_size: int, device: torch.device) -> torch.Tensor:
         return torch.zeros(batch_size, self.prefix_length, dtype=torch.int64, device=device)
     
-    def generate_prefix_inference(self, daudio1, daudio2, texts_enc):
-        audio_projections1 = downsample(daudio1).contiguous()
-        audio_projections2 = downsample(daudio2).contiguous()
-
-        # separate token between two audios'
+    def embed_tokens(self, input_ids):
         if "gpt" in self.text_decoder:
-            dtext = self.lm.transformer.wte(texts_enc['input_ids'])
-            dtext = dtext.contiguous()
-            sep_token = torch.tensor([50256]).to(dtext.device)
-            sep_embed = self.lm.transformer.wte(sep_token).unsqueeze(0).repeat(dtext.shape[0],1,1)
+            return self.lm.transformer.wte(input_ids)
         elif "smollm2" in self.text_decoder:
-            dtext = self.lm.model.embed_tokens(texts_enc['input_ids'])
-            dtext = dtext.contiguous()
-            sep_token = torch.tensor([0]).to(dtext.device)
-            sep_embed = self.lm.model.embed_tokens(sep_token).unsqueeze(0).repeat(dtext.shape[0],1,1)
+            return self.lm.model.embed_tokens(input_ids)
         else:
             raise ValueError(f"text decoder {self.text_decoder} not supported")
-        
-        prefix = torch.cat((audio_projections1, sep_embed, audio_projections2, sep_embed, dtext), dim=1)
-        return prefix
+
+    def generate_audio_prefix(self, daudio1, daudio2):
+        # [audio1, sep, audio2, sep]: the part of the prefix shared by every prompt on the same audios
+        audio_projections1 = downsample(daudio1).contiguous()
+        audio_projections2 = downsample(daudio2).contiguous()
+
+        # separate token between two audios'
+        sep_token = torch.tensor([50256 if "gpt" in self.text_decoder else 0]).to(audio_projections1.device)
+        sep_embed = self.embed_tokens(sep_token).unsqueeze(0).repeat(audio_projections1.shape[0],1,1)
+        return torch.cat((audio_projections1, sep_embed, audio_projections2, sep_embed), dim=1)
+
+    def generate_prefix_inference(self, daudio1, daudio2, texts_enc, return_mask=False):
+        dtext = self.embed_tokens(texts_enc['input_ids']).contiguous()
+        audio_prefix = self.generate_audio_prefix(daudio1, daudio2)
+        prefix = torch.cat((audio_prefix, dtext), dim=1)
+        if not return_mask:
+            return prefix
+        # audio part is never padded, the text part carries the tokenizer's attention mask
+        text_mask = texts_enc['attention_mask'].to(prefix.device)
+        audio_mask = torch.ones(audio_prefix.shape[:2], dtype=text_mask.dtype, device=prefix.device)
+        return prefix, torch.cat((audio_mask, text_mask), dim=1)
 
     def forward(self, daudio1: torch.Tensor, daudio2: torch.Tensor, texts_enc: torch.Tensor, tokens: torch.Tensor, mask: Optional[torch.Tensor] = None,
                 labels: Optional[torch.Tensor] = None):
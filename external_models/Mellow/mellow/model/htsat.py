@@ -2,6 +2,7 @@ import math
 import random
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.utils.checkpoint as checkpoint
 
 from torchlibrosa.stft import Spectrogram, LogmelFilterBank
@@ -298,22 +299,45 @@ class WindowAttention(nn.Module):
         trunc_normal_(self.relative_position_bias_table, std=.02)
         self.softmax = nn.Softmax(dim=-1)
 
-    def forward(self, x, mask=None):
+    def forward(self, x, mask=None, need_weights=True):
         """
         Args:
             x: input features with shape of (num_windows*B, N, C)
             mask: (0/-inf) mask with shape of (num_windows, Wh*Ww, Wh*Ww) or None
+            need_weights: return the attention map; if False, use the fused SDPA kernel and return None for it
         """
         B_, N, C = x.shape
         qkv = self.qkv(x).reshape(B_, N, 3, self.num_heads, C // self.num_heads).permute(2, 0, 3, 1, 4)
         q, k, v = qkv[0], qkv[1], qkv[2]  # make torchscript happy (cannot use tensor as tuple)
 
-        q = q * self.scale
-        attn = (q @ k.transpose(-2, -1))
-
         relative_position_bias = self.relative_position_bias_table[self.relative_position_index.view(-1)].view(
             self.window_size[0] * self.window_size[1], self.window_size[0] * self.window_size[1], -1)  # Wh*Ww,Wh*Ww,nH
         relative_position_bias = relative_position_bias.permute(2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+
+        if not need_weights:
+            # SDPA scales by 1/sqrt(head_dim) itself; fold in any other qk_scale here, since its
+            # scale= argument needs torch >= 2.1 (MELLOW pins 2.0)
+            q = q * (self.scale * q.shape[-1] ** 0.5)
+            # bias and shift mask become one additive mask, broadcast over the batch by viewing
+            # the windows as (B, nW, nH, N, head_dim) instead of expanding the mask to nW*B
+            if mask is not None:
+                nW = mask.shape[0]
+                attn_mask = relative_position_bias.unsqueeze(0) + mask.unsqueeze(1)  # nW, nH, N, N
+                q = q.view(B_ // nW, nW, self.num_heads, N, -1)
+                k = k.view(B_ // nW, nW, self.num_heads, N, -1)
+                v = v.view(B_ // nW, nW, self.num_heads, N, -1)
+            else:
+                attn_mask = relative_position_bias.unsqueeze(0)
+            x = F.scaled_dot_product_attention(
+                q, k, v, attn_mask=attn_mask.to(q.dtype),
+                dropout_p=self.attn_drop.p if self.training else 0.)
+            x = x.reshape(B_, self.num_heads, N, -1).transpose(1, 2).reshape(B_, N, C)
+            x = self.proj(x)
+            x = self.proj_drop(x)
+            return x, None
+
+        q = q * self.scale
+        attn = (q @ k.transpose(-2, -1))
         attn = attn + relative_position_bias.unsqueeze(0)
 
         if mask is not None:
@@ -411,7 +435,7 @@ class SwinTransformerBlock(nn.Module):
 
         self.register_buffer("attn_mask", attn_mask)
 
-    def forward(self, x):
+    def forward(self, x, need_weights=True):
         # pdb.set_trace()
         H, W = self.input_resolution
         # print("H: ", H)
@@ -435,7 +459,7 @@ class SwinTransformerBlock(nn.Module):
         x_windows = x_windows.view(-1, self.window_size * self.window_size, C)  # nW*B, window_size*window_size, C
 
         # W-MSA/SW-MSA
-        attn_windows, attn = self.attn(x_windows, mask=self.attn_mask)  # nW*B, window_size*window_size, C
+        attn_windows, attn = self.attn(x_windows, mask=self.attn_mask, need_weights=need_weights)  # nW*B, window_size*window_size, C
 
         # merge windows
         attn_windows = attn_windows.view(-1, self.window_size, self.window_size, C)
@@ -550,18 +574,20 @@ class BasicLayer(nn.Module):
         else:
             self.downsample = None
 
-    def forward(self, x):
+    def forward(self, x, need_weights=False):
+        # attention maps are only materialized (and averaged over blocks) when need_weights is set
         attns = []
+        attn = None
         for blk in self.blocks:
             if self.use_checkpoint:
                 x = checkpoint.checkpoint(blk, x)
             else:
-                x, attn = blk(x)
-                if not self.training:
+                x, attn = blk(x, need_weights=need_weights)
+                if need_weights and not self.training:
                     attns.append(attn.unsqueeze(0))
         if self.downsample is not None:
             x = self.downsample(x)
-        if not self.training:
+        if attns:
             attn = torch.cat(attns, dim = 0)
             attn = torch.mean(attn, dim = 0)
         return x, attn
@@ -594,6 +620,7 @@ class HTSAT_Swin_Transformer(nn.Module):
         patch_norm (bool): If True, add normalization after patch embedding. Default: True
         use_checkpoint (bool): Whether to use checkpointing to save memory. Default: False
         config (module): The configuration Module from config.py
+        crop_batch_size (int | None): Max crops per batched forward pass for long eval inputs. Default: None (all)
     """
 
     def __init__(self, spec_size=256, patch_size=4, patch_stride=(4,4), 
@@ -603,7 +630,7 @@ class HTSAT_Swin_Transformer(nn.Module):
                  drop_rate=0., attn_drop_rate=0., drop_path_rate=0.1,
                  norm_layer=nn.LayerNorm, 
                  ape=False, patch_norm=True,
-                 use_checkpoint=False, norm_before_mlp='ln', config = None, **kwargs):
+                 use_checkpoint=False, norm_before_mlp='ln', config = None, crop_batch_size = None, **kwargs):
         super(HTSAT_Swin_Transformer, self).__init__()
 
         self.config = config
@@ -633,6 +660,7 @@ class HTSAT_Swin_Transformer(nn.Module):
         self.mlp_ratio = mlp_ratio
 
         self.use_checkpoint = use_checkpoint
+        self.crop_batch_size = crop_batch_size
 
         #  process mel-spec ; used only once
         self.freq_ratio = self.spec_size // self.config.mel_bins
@@ -737,7 +765,7 @@ class HTSAT_Swin_Transformer(nn.Module):
             x = x + self.absolute_pos_embed
         x = self.pos_drop(x)
         for i, layer in enumerate(self.layers):
-            x, attn = layer(x)
+            x, attn = layer(x, need_weights=self.config.htsat_attn_heatmap)
 
         if self.config.enable_tscam:
             # for x
@@ -826,6 +854,26 @@ class HTSAT_Swin_Transformer(nn.Module):
             tx[i][0] = x[i, 0, crop_pos:crop_pos + crop_size,:]
         return tx
 
+    def forward_crops(self, x, crop_size, overlap_size):
+        """Evaluate all overlapping crops of a long input in batched forward passes and mean the outputs.
+        Crops start at range(0, T - crop_size - 1, overlap_size); at most self.crop_batch_size crops
+        (times batch size) go through forward_features at once, or all of them if it is None.
+        """
+        B = x.shape[0]
+        n_crops = len(range(0, x.shape[2] - crop_size - 1, overlap_size))
+        # (B, C, n, F, crop) -> (n * B, C, crop, F), crop-major so chunks split cleanly on crops
+        crops = x.unfold(2, crop_size, overlap_size)[:, :, :n_crops]
+        crops = crops.permute(2, 0, 1, 4, 3).reshape(n_crops * B, x.shape[1], crop_size, x.shape[3])
+        crops = self.reshape_wav2img(crops)
+
+        chunk = n_crops if self.crop_batch_size is None else max(1, self.crop_batch_size)
+        chunk_dicts = [self.forward_features(crops[i * B:(i + chunk) * B]) for i in range(0, n_crops, chunk)]
+        output_dict = {}
+        for key in chunk_dicts[0]:
+            out = torch.cat([d[key] for d in chunk_dicts], dim = 0)
+            output_dict[key] = out.reshape(n_crops, B, *out.shape[1:]).float().mean(dim = 0)
+        return output_dict
+
     # Reshape the wavform to a img size, if you want to use the pretrained swin transformer model
     def reshape_wav2img(self, x):
         B, C, T, F = x.shape
@@ -913,27 +961,8 @@ class HTSAT_Swin_Transformer(nn.Module):
                 else:
                     # Change: Hard code here
                     overlap_size = 344 #(x.shape[2] - 1) // 4
-                    output_dicts = []
                     crop_size = 689 #(x.shape[2] - 1) // 2
-                    for cur_pos in range(0, x.shape[2] - crop_size - 1, overlap_size):
-                        tx = self.crop_wav(x, crop_size = crop_size, spe_pos = cur_pos)
-                        tx = self.reshape_wav2img(tx)
-                        output_dicts.append(self.forward_features(tx))
-                    clipwise_output = torch.zeros_like(output_dicts[0]["clipwise_output"]).float().to(x.device)
-                    framewise_output = torch.zeros_like(output_dicts[0]["framewise_output"]).float().to(x.device)
-                    latent_output = torch.zeros_like(output_dicts[0]["latent_output"]).float().to(x.device)
-                    for d in output_dicts:
-                        clipwise_output += d["clipwise_output"]
-                        framewise_output += d["framewise_output"]
-                        latent_output += d["latent_output"]
-                    clipwise_output  = clipwise_output / len(output_dicts)
-                    framewise_output = framewise_output / len(output_dicts)
-                    latent_output = latent_output / len(output_dicts)
-                    output_dict = {
-                        'framewise_output': framewise_output, 
-                        'clipwise_output': clipwise_output,
-                        'latent_output': latent_output,
-                    }
+                    output_dict = self.forward_crops(x, crop_size, overlap_size)
             else: # this part is typically used, and most easy one
                 x = self.reshape_wav2img(x)
                 output_dict = self.forward_features(x)
@@ -943,7 +972,7 @@ class HTSAT_Swin_Transformer(nn.Module):
 class HTSATWrapper(nn.Module):
     def __init__(self):
         super().__init__()
-        self.htsat = HTSAT_Swin_Transformer(config=config)
+        self.htsat = HTSAT_Swin_Transformer(config=config, crop_batch_size=config.crop_batch_size)
         # change classes dimension 527 to 768 (latent shape)
         self.c2l = nn.Linear(527,768)
 
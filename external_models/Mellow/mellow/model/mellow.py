@@ -105,4 +105,13 @@ class Mellow(nn.Module):
         audio_embed1, _, od1 = self.audio_encoder(audio1)
         audio_embed2, _, od2 = self.audio_encoder(audio2)
         prefix = self.caption_decoder.generate_prefix_inference(audio_embed1, audio_embed2, texts_enc)
-        return prefix, od1, od2
\ No newline at end of file
+        return prefix, od1, od2
+
+    def encode_audio(self, audio):
+        r"""Projected audio embedding and clipwise (AudioSet) scores for a batch of waveforms"""
+        audio_embed, clipwise_output, _ = self.audio_encoder(audio)
+        return audio_embed, clipwise_output
+
+    def generate_prefix_from_embeddings(self, audio_embed1, audio_embed2, texts_enc, return_mask=False):
+        r"""Same as generate_prefix_inference, for audio already encoded with encode_audio"""
+        return self.caption_decoder.generate_prefix_inference(audio_embed1, audio_embed2, texts_enc, return_mask)
\ No newline at end of file
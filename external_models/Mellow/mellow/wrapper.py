@@ -15,11 +15,13 @@ import torchaudio
 import torchaudio.transforms as T
 import collections
 import random
+import zlib
 from .model.model import get_model_class
 from tqdm import tqdm
 import torch.nn.functional as F
 from pathlib import Path
 import math
+from contextlib import nullcontext
 from huggingface_hub.file_download import hf_hub_download
 
 
@@ -34,7 +36,7 @@ class MellowWrapper():
     }
 
 
-    def __init__(self, config, model, device, use_cuda=True):
+    def __init__(self, config, model, device, use_cuda=True, seed=None, text_padding="max_length"):
         # Check if version is supported
         self.supported_versions = self.model_name.keys()
         if model not in self.supported_versions:
@@ -46,6 +48,16 @@ class MellowWrapper():
         self.config_path = os.path.join(self.parent_path, "config", config + ".yaml")
         self.use_cuda = use_cuda
         self.device = device
+        # Seeded audio cropping: each file's crop comes from the seed and a hash of its samples,
+        # so it doesn't depend on which files were processed before it (or in which worker)
+        self.seed = seed
+        self.rng = random.Random(seed)  # shared, unseeded crops when seed is None
+        # "max_length": pad to text_tokenization_len with attended '!' tokens (layout used in training, default)
+        # "longest": pad prompts to the longest one in the batch and mask the pads (opt-in: shorter prefix,
+        # but the model never saw this layout in training, so captions differ)
+        if text_padding not in ("longest", "max_length"):
+            raise ValueError(f"text_padding must be 'longest' or 'max_length', got {text_padding}")
+        self.text_padding = text_padding
 
 
         self.model, self.tokenizer, self.args = self.get_model_and_tokenizer(config_path=self.config_path)
@@ -151,16 +163,28 @@ class MellowWrapper():
         raise TypeError(self.default_collate_err_msg_format.format(elem_type))
 
 
-    def load_audio_into_tensor(self, audio_path, audio_duration, resample=True):
-        r"""Loads audio file and returns raw audio."""
-        # Randomly sample a segment of audio_duration from the clip or pad to match duration
+    def load_waveform(self, audio_path, resample=True):
+        r"""Loads audio file and returns the full raw audio at the model sampling rate."""
         audio_time_series, sample_rate = torchaudio.load(audio_path)
         resample_rate = self.args.data["sampling_rate"]
         if resample and resample_rate != sample_rate:
             resampler = T.Resample(sample_rate, resample_rate)
             audio_time_series = resampler(audio_time_series)
-        audio_time_series = audio_time_series.reshape(-1)
-        sample_rate = resample_rate
+        return audio_time_series.reshape(-1)
+
+
+    def crop_rng(self, audio_time_series):
+        r"""RNG for one file's crop: derived from the seed and the file's samples when seeded."""
+        if self.seed is None:
+            return self.rng
+        return random.Random(f"{self.seed}:{zlib.crc32(audio_time_series.numpy().tobytes())}")
+
+
+    def load_audio_into_tensor(self, audio_path, audio_duration, resample=True):
+        r"""Loads audio file and returns raw audio."""
+        # Randomly sample a segment of audio_duration from the clip or pad to match duration
+        audio_time_series = self.load_waveform(audio_path, resample)
+        sample_rate = self.args.data["sampling_rate"]
 
 
         # audio_time_series is shorter than predefined audio duration,
@@ -175,13 +199,67 @@ class MellowWrapper():
         else:
             # audio_time_series is longer than predefined audio duration,
             # so audio_time_series is trimmed
-            start_index = random.randrange(
+            start_index = self.crop_rng(audio_time_series).randrange(
                 audio_time_series.shape[0] - audio_duration*sample_rate)
             audio_time_series = audio_time_series[start_index:start_index +
                                                   audio_duration*sample_rate]
         return torch.FloatTensor(audio_time_series)
 
 
+    def load_audio_segments(self, audio_path, audio_duration, resample=True, max_segments=None):
+        r"""Loads audio file and returns every audio_duration window of it as a (n_segments, samples) tensor.
+        The last window is completed by wrapping around to the start, short clips are repeated to one window.
+        With max_segments, evenly spaced windows are kept so encoding cost stays bounded."""
+        audio_time_series = self.load_waveform(audio_path, resample)
+        segment_len = audio_duration*self.args.data["sampling_rate"]
+        n_segments = max(1, int(np.ceil(audio_time_series.shape[0] / segment_len)))
+        repeat_factor = int(np.ceil(n_segments*segment_len / audio_time_series.shape[0]))
+        audio_time_series = audio_time_series.repeat(repeat_factor)[0:n_segments*segment_len]
+        segments = audio_time_series.reshape(n_segments, segment_len)
+        if max_segments is not None and n_segments > max_segments:
+            keep = torch.linspace(0, n_segments - 1, max_segments).round().long()
+            segments = segments[keep]
+        return torch.FloatTensor(segments)
+
+
+    def encode_audio_segments(self, audio_path, resample=True, pooling="topk", top_k=3, max_segments=None, batch_size=8):
+        r"""Encodes all windows of an audio file in batches and pools them into one audio embedding.
+        pooling: (str) "mean" averages every window, "topk" averages the top_k windows ranked by
+        salience (max AudioSet clipwise score of the HTSAT encoder).
+        Returns the pooled (1, L, d) embedding and a dict describing the selection
+        (its "clipwise" entry holds the per-class max over all windows, shape (1, 527))."""
+        segments = self.load_audio_segments(
+            audio_path, self.args.data["segment_seconds"], resample, max_segments)
+        if self.use_cuda and torch.cuda.is_available():
+            segments = segments.to(f"cuda:{self.device}")
+
+        embeds = []
+        clipwise = []
+        with torch.no_grad():
+            for chunk in segments.split(batch_size):
+                embed, clip_out = self.model.encode_audio(chunk)
+                embeds.append(embed)
+                clipwise.append(clip_out)
+        embeds = torch.cat(embeds, dim=0)
+        clipwise = torch.cat(clipwise, dim=0)
+        salience = clipwise.max(dim=-1).values
+
+        if pooling == "mean":
+            selected = torch.arange(embeds.shape[0], device=embeds.device)
+        elif pooling == "topk":
+            selected = salience.topk(min(top_k, embeds.shape[0])).indices.sort().values
+        else:
+            raise ValueError(f"Segment pooling {pooling} is not supported. The supported options are 'mean' and 'topk'")
+
+        info = {
+            "n_segments": embeds.shape[0],
+            "selected": selected.tolist(),
+            "salience": [round(float(v), 4) for v in salience],
+            "clipwise": clipwise.max(dim=0, keepdim=True).values,
+        }
+        return embeds[selected].mean(dim=0, keepdim=True), info
+
+
     def preprocess_audio(self, audio_files, resample):
         r"""Load list of audio files and return raw audio"""
         audio_tensors = []
@@ -194,8 +272,12 @@ class MellowWrapper():
         return self.default_collate(audio_tensors)
 
 
-    def preprocess_text(self, prompts):
-        r"""Load list of prompts and return tokenized text"""
+    def preprocess_text(self, prompts, padding=None):
+        r"""Load list of prompts and return tokenized text
+        padding: (str | None) "longest" left-pads to the longest prompt, so the last position of every row is a real token,
+            and masks the pads. "max_length" pads to text_tokenization_len with attended pads. None uses self.text_padding
+        """
+        padding = padding or self.text_padding
         tokenized_texts = []
         for ttext in prompts:
             ttext = ttext + ' <|endoftext|>' if 'gpt' in self.args.model["decoder"]["text_decoder"] else ttext
@@ -203,13 +285,27 @@ class MellowWrapper():
                         text=ttext, add_special_tokens=True,\
                         truncation=True,
                         max_length=self.args.data["text_tokenization_len"], 
-                        padding='max_length', return_tensors="pt")  # FIXED: Changed pad_to_max_length=True to padding='max_length'
+                        padding='max_length' if padding == 'max_length' else False, return_tensors="pt")  # FIXED: Changed pad_to_max_length=True to padding='max_length'
                 
             for key in tok.keys():
                 tok[key] = tok[key].reshape(-1).to(f"cuda:{self.device}") if self.use_cuda and torch.cuda.is_available() else tok[key].reshape(-1)
+            if padding == 'max_length':
+                # the model was trained attending to the '!' pads
+                tok['attention_mask'] = torch.ones_like(tok['input_ids'])
             tokenized_texts.append(tok)
+
+        if padding == 'longest':
+            longest = max(tok['input_ids'].shape[0] for tok in tokenized_texts)
+            for tok in tokenized_texts:
+                n_pad = longest - tok['input_ids'].shape[0]
+                for key in tok.keys():
+                    tok[key] = F.pad(tok[key], (n_pad, 0), value=self.tokenizer.pad_token_id if key == 'input_ids' else 0)
         return self.default_collate(tokenized_texts)
 
+    def _position_ids(self, attention_mask):
+        r"""Positions that skip masked (padding) slots, so a padded row sees the same positions as the unpadded prompt"""
+        return (attention_mask.long().cumsum(-1) - 1).clamp(min=0)
+
 
     def _generate_batch(
             self,
@@ -218,70 +314,232 @@ class MellowWrapper():
             top_p=0.8,
             temperature=1.,
             stop_token: str = '<|endoftext|>',
+            attention_mask=None,
+            step_span=None,
+            stats=None,
         ):
+        r"""stats: (dict | None) gets the decode's forward_passes and tokens (stop tokens included) added to it"""
         self.model.eval()
-        tokens = None
-        generated_num = 0
         stop_token_index = self.tokenizer.encode(stop_token)[0]
-        filter_value = -float("Inf")
-        device = next(self.model.parameters()).device
+        decoder = self.model.caption_decoder
+        step_span = step_span or (lambda step: nullcontext())
 
 
         with torch.no_grad():
-            if embed is not None:
-                generated = embed
+            # fixed-capacity buffers written in place, each step feeds the filled part of them to the LM
+            batch_size, prefix_len, embed_dim = embed.shape
+            generated = embed.new_empty((batch_size, prefix_len + entry_length, embed_dim))
+            generated[:, :prefix_len] = embed
+            tokens = torch.empty((batch_size, entry_length), dtype=torch.long, device=embed.device)
+            stopped = torch.zeros(batch_size, dtype=torch.bool, device=embed.device)
+            full_mask = position_ids = None
+            if attention_mask is not None:
+                full_mask = attention_mask.new_ones((batch_size, prefix_len + entry_length))
+                full_mask[:, :prefix_len] = attention_mask
+                position_ids = self._position_ids(full_mask)
+            generated_num = 0
 
 
             for i in tqdm(range(entry_length)):
-                outputs = self.model.caption_decoder.lm(inputs_embeds=generated)
-                logits = outputs.logits
-                logits = logits[:, -1, :] / (temperature if temperature > 0 else 1.0)
-                sorted_logits, sorted_indices = torch.sort(logits, descending=True)
-                cumulative_probs = torch.cumsum(F.softmax(sorted_logits, dim=-1), dim=-1)
-                sorted_indices_to_remove = cumulative_probs > top_p
-                sorted_indices_to_remove[..., 1:] = sorted_indices_to_remove[
-                                                    ..., :-1
-                                                    ].clone()
-                sorted_indices_to_remove[..., 0] = 0
-
-
-                for k in range(len(sorted_indices_to_remove)):
-                    indices_to_remove = sorted_indices[k][sorted_indices_to_remove[k]]
-                    logits[k, indices_to_remove] = filter_value
-
-
-                next_token = torch.argmax(logits, -1).unsqueeze(1)
-
+                with step_span(i):
+                    length = prefix_len + i
+                    outputs = decoder.lm(
+                        inputs_embeds=generated[:, :length],
+                        attention_mask=full_mask[:, :length] if full_mask is not None else None,
+                        position_ids=position_ids[:, :length] if position_ids is not None else None,
+                    )
+                    next_token = self._select_next_token(outputs.logits[:, -1, :], top_p, temperature)
+                    tokens[:, i] = next_token[:, 0]
+                    generated[:, length] = decoder.embed_tokens(next_token)[:, 0]
+                    generated_num = i + 1
+
+
+                    # rows stay stopped once they produced the stop token, no rescan of the tokens so far
+                    stopped |= next_token[:, 0] == stop_token_index
+                    # inside the span: this is where the step syncs with the device
+                    if stopped.all():
+                        break
+
+            if stats is not None:
+                # tokens per row up to and including its stop token
+                is_stop = tokens[:, :generated_num] == stop_token_index
+                lengths = torch.where(is_stop.any(dim=1), is_stop.int().argmax(dim=1) + 1, generated_num)
+                stats["forward_passes"] = stats.get("forward_passes", 0) + generated_num
+                stats["tokens"] = stats.get("tokens", 0) + int(lengths.sum())
+
+
+        return self._decode_tokens(tokens[:, :generated_num])
+
+    def _select_next_token(self, logits, top_p, temperature):
+        r"""Top-p filtering of the last-position logits (B, vocab) followed by argmax"""
+        filter_value = -float("Inf")
+        logits = logits / (temperature if temperature > 0 else 1.0)
+        sorted_logits, sorted_indices = torch.sort(logits, descending=True)
+        cumulative_probs = torch.cumsum(F.softmax(sorted_logits, dim=-1), dim=-1)
+        sorted_indices_to_remove = cumulative_probs > top_p
+        sorted_indices_to_remove[..., 1:] = sorted_indices_to_remove[
+                                            ..., :-1
+                                            ].clone()
+        sorted_indices_to_remove[..., 0] = 0
+
+
+        for k in range(len(sorted_indices_to_remove)):
+            indices_to_remove = sorted_indices[k][sorted_indices_to_remove[k]]
+            logits[k, indices_to_remove] = filter_value
+
+
+        return torch.argmax(logits, -1).unsqueeze(1)
+
+    def _decode_tokens(self, tokens):
+        r"""Decode generated token ids (B, T) or a list of id lists into strings cut at the end-of-text token"""
+        if torch.is_tensor(tokens):
+            tokens = tokens.cpu().tolist()
+        return [self.tokenizer.decode(x).split("<|endoftext|>")[0] for x in tokens]
+
+    def _repeat_cache(self, past_key_values, repeats):
+        r"""Repeat a batch-1 KV cache along the batch dimension"""
+        if hasattr(past_key_values, "batch_repeat_interleave"):
+            past_key_values.batch_repeat_interleave(repeats)
+            return past_key_values
+        # legacy tuple-of-tuples cache
+        return tuple(tuple(t.repeat_interleave(repeats, dim=0) for t in layer) for layer in past_key_values)
+
+    def _generate_batch_cached(
+            self,
+            outputs,
+            entry_length=300,
+            top_p=0.8,
+            temperature=1.,
+            stop_token: str = '<|endoftext|>',
+            attention_mask=None,
+        ):
+        r"""Same decoding as _generate_batch, but continuing from LM outputs that carry past_key_values,
+        so each step only runs the newest token through the LM
+        attention_mask: (tensor | None) mask over every position already in the cache, extended as tokens are generated"""
+        self.model.eval()
+        stop_token_index = self.tokenizer.encode(stop_token)[0]
+        decoder = self.model.caption_decoder
+        batch_size = outputs.logits.shape[0]
+        device = outputs.logits.device
 
-                if "gpt2" in self.model.caption_decoder.text_decoder:
-                    next_token_embed = self.model.caption_decoder.lm.transformer.wte(next_token)
-                elif "smollm2" in self.model.caption_decoder.text_decoder:
-                    next_token_embed = self.model.caption_decoder.lm.model.embed_tokens(next_token)
-                else:
-                    raise ValueError(f"text decoder { self.model.caption_decoder.text_decoder} not supported")
+        with torch.no_grad():
+            tokens = torch.empty((batch_size, entry_length), dtype=torch.long, device=device)
+            stopped = torch.zeros(batch_size, dtype=torch.bool, device=device)
+            full_mask = position_ids = None
+            if attention_mask is not None:
+                past_len = attention_mask.shape[1]
+                full_mask = attention_mask.new_ones((batch_size, past_len + entry_length))
+                full_mask[:, :past_len] = attention_mask
+                position_ids = self._position_ids(full_mask)
+            generated_num = 0
 
+            for i in tqdm(range(entry_length)):
+                next_token = self._select_next_token(outputs.logits[:, -1, :], top_p, temperature)
+                tokens[:, i] = next_token[:, 0]
+                generated_num = i + 1
 
-                if tokens is None:
-                    tokens = next_token
-                else:
-                    tokens = torch.cat((tokens, next_token), dim=1)
-                generated = torch.cat((generated, next_token_embed), dim=1)
+                stopped |= next_token[:, 0] == stop_token_index
+                if stopped.all():
+                    break
 
+                next_token_embed = decoder.embed_tokens(next_token)
+                step_mask = step_positions = None
+                if full_mask is not None:
+                    step_mask = full_mask[:, :past_len + i + 1]
+                    step_positions = position_ids[:, past_len + i:past_len + i + 1]
+                outputs = decoder.lm(inputs_embeds=next_token_embed, past_key_values=outputs.past_key_values, use_cache=True,
+                                     attention_mask=step_mask, position_ids=step_positions)
+
+        return self._decode_tokens(tokens[:, :generated_num])
+
+    def _lookup_draft(self, sequence, ngram_size, num_draft):
+        r"""Draft tokens copied from the prompt/output: find the latest earlier occurrence of the last n-gram
+        (longest n first) and propose the tokens that followed it"""
+        for n in range(min(ngram_size, len(sequence) - 1), 0, -1):
+            pattern = sequence[-n:]
+            for start in range(len(sequence) - n - 1, -1, -1):
+                if sequence[start:start + n] == pattern:
+                    draft = sequence[start + n:start + n + num_draft]
+                    if draft:
+                        return draft
+        return []
+
+    def _crop_cache(self, past_key_values, length):
+        r"""Drop cached positions from `length` on (rejected draft tokens)"""
+        if hasattr(past_key_values, "crop"):
+            excess = past_key_values.get_seq_length() - length
+            if excess > 0:
+                past_key_values.crop(-excess)
+            return past_key_values
+        # legacy tuple-of-tuples cache
+        return tuple(tuple(t[:, :, :length] for t in layer) for layer in past_key_values)
+
+    def _generate_lookup(
+            self,
+            embed,
+            prompt_ids,
+            entry_length=300,
+            top_p=0.8,
+            temperature=1.,
+            stop_token: str = '<|endoftext|>',
+            ngram_size=3,
+            num_draft=8,
+            step_span=None,
+        ):
+        r"""Prompt-lookup speculative decoding of a single unpadded prefix (1, L, d)
+        Each step feeds the last token plus a draft copied from prompt_ids/output (see _lookup_draft) through the LM,
+        keeps the draft tokens that match the model's own choice and the model's token after them.
+        Tokens are chosen with _select_next_token, so the output is the same as _generate_batch with fewer forward passes.
+        Returns the generated token ids and the number of LM forward passes.
+        step_span: (callable | None) step index -> context manager entered around each LM forward pass
+        """
+        self.model.eval()
+        stop_token_index = self.tokenizer.encode(stop_token)[0]
+        decoder = self.model.caption_decoder
+        step_span = step_span or (lambda step: nullcontext())
+        tokens = []
 
-                condition = (tokens == stop_token_index).sum(dim=-1)
-                if (condition> 0).all():
+        with torch.no_grad():
+            with step_span(0):
+                outputs = decoder.lm(inputs_embeds=embed, use_cache=True)
+                past_key_values = outputs.past_key_values
+                cache_len = embed.shape[1]
+                next_token = int(self._select_next_token(outputs.logits[:, -1, :], top_p, temperature)[0, 0])
+            forward_passes = 1
+
+            while True:
+                tokens.append(next_token)
+                if next_token == stop_token_index or len(tokens) >= entry_length:
                     break
 
+                draft = self._lookup_draft(prompt_ids + tokens, ngram_size, min(num_draft, entry_length - len(tokens)))
+                step_ids = torch.tensor([[next_token] + draft], dtype=torch.long, device=embed.device)
+                with step_span(forward_passes):
+                    outputs = decoder.lm(inputs_embeds=decoder.embed_tokens(step_ids), past_key_values=past_key_values, use_cache=True)
+                    # position j holds the model's choice after step_ids[j]; verify the draft against it
+                    choices = self._select_next_token(outputs.logits[0], top_p, temperature)[:, 0].tolist()
+                forward_passes += 1
+                accepted = 0
+                while accepted < len(draft) and draft[accepted] == choices[accepted]:
+                    accepted += 1
+
+                stopped = False
+                for token in draft[:accepted]:
+                    tokens.append(token)
+                    if token == stop_token_index or len(tokens) >= entry_length:
+                        stopped = True
+                        break
+                if stopped:
+                    break
 
-            output_list = list(tokens.squeeze().cpu().numpy())
-            if output_list[0].ndim == 0:
-                output_list = [output_list]
-            generated_list = [self.tokenizer.decode(x).split("<|endoftext|>")[0] for x in output_list]
-
+                cache_len += 1 + accepted
+                past_key_values = self._crop_cache(outputs.past_key_values, cache_len)
+                next_token = choices[accepted]
 
-        return generated_list
+        return tokens, forward_passes
     
-    def generate(self, examples, max_len, top_p, temperature, stop_token='<|endoftext|>', audio_resample=True):
+    def generate(self, examples, max_len, top_p, temperature, stop_token='<|endoftext|>', audio_resample=True,
+                 segment_pooling=None, top_k=3, max_segments=None, prompt_lookup=False, step_span=None, return_stats=False):
         r"""Produces text response for the given audio file and text prompts
         examples: (list<list>) List of examples. Each example is a list containing three entries [audio path 1, audio path 2, text prompt]
         max_len: (int) maximum length for text generation. Necessary to stop generation if LM gets "stuck" producing same token
@@ -289,6 +547,13 @@ class MellowWrapper():
         temperature: (float) temperature parameter for LM sampling
         stop_token: (str) token used to stop text generation 
         audio_resample (bool) True for resampling audio. The model support only 32 kHz
+        segment_pooling (str | None) None crops one segment_seconds window per file (seeded). "mean" or "topk"
+            encodes every window of the file and pools them (see encode_audio_segments)
+        top_k (int) number of most salient windows pooled with segment_pooling="topk"
+        max_segments (int | None) upper bound on windows encoded per file
+        prompt_lookup (bool) speculative decoding with drafts copied from the prompt, same output with fewer LM passes
+        step_span (callable | None) step index -> context manager entered around each decode step, e.g. a profiling span
+        return_stats (bool) return (preds, stats): LM forward passes and generated tokens (stop tokens included) of this call
         """
         preds = []
         audio_paths1 = []
@@ -300,14 +565,181 @@ class MellowWrapper():
             audio_paths2.append(ap2)
             text_prompts.append(tp)
         
-        audio1_embed = self.preprocess_audio(audio_paths1, resample=audio_resample).squeeze(1)
-        audio2_embed = self.preprocess_audio(audio_paths2, resample=audio_resample).squeeze(1)
-        text_embed = self.preprocess_text(text_prompts)
-        d = {
-                "audio1": audio1_embed,
-                "audio2": audio2_embed,
-                "input": text_embed,
-            }
-        prefix, _, _ = self.model.generate_prefix_inference(d)
-        preds = self._generate_batch(embed=prefix, top_p=top_p, temperature=temperature, stop_token=stop_token, entry_length=max_len)
-        return preds
+        audio1_embed = self.encode_audio(audio_paths1, audio_resample, segment_pooling, top_k, max_segments)
+        if segment_pooling is not None and audio_paths2 == audio_paths1:
+            # pooled encodings are deterministic, no need to encode the same files twice
+            audio2_embed = audio1_embed
+        else:
+            audio2_embed = self.encode_audio(audio_paths2, audio_resample, segment_pooling, top_k, max_segments)
+        return self.generate_from_audio_embeddings(audio1_embed, audio2_embed, text_prompts, max_len, top_p, temperature, stop_token,
+                                                   prompt_lookup, step_span, return_stats)
+
+    def encode_audio(self, audio_paths, audio_resample=True, segment_pooling=None, top_k=3, max_segments=None, return_clipwise=False):
+        r"""Encodes audio files into projected audio embeddings of shape (N, L, d)
+        This step does not depend on the text prompt, so it can run before or while the prompt is built.
+        Pass the result to generate_from_audio_embeddings.
+        audio_paths: (list<str>) audio file paths
+        audio_resample, segment_pooling, top_k, max_segments: same as in generate
+        return_clipwise: (bool) also return the HTSAT AudioSet scores (N, 527), usable as sound tags.
+            With segment_pooling each class takes its max over all windows of the file
+        """
+        if segment_pooling is None:
+            audio = self.preprocess_audio(audio_paths, resample=audio_resample).squeeze(1)
+            with torch.no_grad():
+                audio_embed, clipwise = self.model.encode_audio(audio)
+            return (audio_embed, clipwise) if return_clipwise else audio_embed
+
+        encoded = {}
+        for path in audio_paths:
+            if path not in encoded:
+                encoded[path] = self.encode_audio_segments(
+                    path, audio_resample, segment_pooling, top_k, max_segments)
+        audio_embed = torch.cat([encoded[path][0] for path in audio_paths], dim=0)
+        if return_clipwise:
+            return audio_embed, torch.cat([encoded[path][1]["clipwise"] for path in audio_paths], dim=0)
+        return audio_embed
+
+    def generate_from_audio_embeddings(self, audio1_embed, audio2_embed, prompts, max_len, top_p, temperature, stop_token='<|endoftext|>',
+                                       prompt_lookup=False, step_span=None, return_stats=False):
+        r"""Produces text response for audio already encoded with encode_audio (prompt + decode step of generate)
+        audio1_embed: (tensor) encode_audio output for the first audios, one row per prompt
+        audio2_embed: (tensor) encode_audio output for the second audios, one row per prompt
+        prompts: (list<str>) text prompts
+        max_len, top_p, temperature, stop_token, prompt_lookup, step_span, return_stats: same as in generate
+        """
+        text_embed = self.preprocess_text(prompts)
+        with torch.no_grad():
+            prefix, attention_mask = self.model.generate_prefix_from_embeddings(audio1_embed, audio2_embed, text_embed, return_mask=True)
+        stats = {"forward_passes": 0, "tokens": 0}
+        if prompt_lookup:
+            # rows are decoded one at a time (accepted draft lengths differ per row), pads removed
+            preds = []
+            for i in range(prefix.shape[0]):
+                keep = attention_mask[i].bool()
+                text_keep = text_embed['attention_mask'][i].bool()
+                prompt_ids = text_embed['input_ids'][i][text_keep.to(text_embed['input_ids'].device)].tolist()
+                tokens, forward_passes = self._generate_lookup(
+                    prefix[i:i + 1, keep], prompt_ids, entry_length=max_len, top_p=top_p, temperature=temperature, stop_token=stop_token,
+                    step_span=step_span)
+                stats["forward_passes"] += forward_passes
+                stats["tokens"] += len(tokens)
+                preds.extend(self._decode_tokens([tokens]))
+        else:
+            preds = self._generate_batch(embed=prefix, top_p=top_p, temperature=temperature, stop_token=stop_token, entry_length=max_len,
+                                         attention_mask=attention_mask, step_span=step_span, stats=stats)
+        return (preds, stats) if return_stats else preds
+
+    def _silence_embedding(self):
+        r"""Audio embedding of a silent clip, used as the content-free input for calibration"""
+        if getattr(self, "_silence_embed", None) is None:
+            silence = torch.zeros(1, self.args.data["segment_seconds"]*self.args.data["sampling_rate"])
+            if self.use_cuda and torch.cuda.is_available():
+                silence = silence.to(f"cuda:{self.device}")
+            with torch.no_grad():
+                self._silence_embed, _ = self.model.encode_audio(silence)
+        return self._silence_embed
+
+    def score_options(self, audio, prompt, options, audio2=None, normalize=True, calibrate=True, temperature=1.0,
+                      stop_token='<|endoftext|>', audio_resample=True, segment_pooling=None, top_k=3, max_segments=None):
+        r"""Scores candidate answers to a prompt instead of generating free text (for yes/no and multiple-choice questions)
+        Every option (followed by the stop token) is teacher-forced after the prefix in one batched forward pass
+        through DecoderModel.forward, and its log-likelihood is read off the logits.
+        audio: (str) audio file path
+        prompt: (str) text prompt (question)
+        options: (list<str>) candidate answers
+        audio2: (str) second audio file path, defaults to audio
+        normalize: (bool) use the mean per-token log-likelihood so long options are not penalised
+        calibrate: (bool) subtract each option's score given silent audio and the same prompt (removes the prompt's prior)
+        temperature: (float) softmax temperature applied to the scores
+        stop_token, audio_resample, segment_pooling, top_k, max_segments: same as in generate
+        Returns a dict with the per-option log-likelihoods, probabilities and the best option.
+        """
+        decoder = self.model.caption_decoder
+        audio1_embed = self.encode_audio([audio], audio_resample, segment_pooling, top_k, max_segments)
+        if audio2 is None or (audio2 == audio and segment_pooling is not None):
+            audio2_embed = audio1_embed
+        else:
+            audio2_embed = self.encode_audio([audio2], audio_resample, segment_pooling, top_k, max_segments)
+
+        audio1_batch = [audio1_embed]
+        audio2_batch = [audio2_embed]
+        if calibrate:
+            audio1_batch.append(self._silence_embedding())
+            audio2_batch.append(self._silence_embedding())
+        n_options = len(options)
+        audio1_batch = torch.cat([a.expand(n_options, -1, -1) for a in audio1_batch], dim=0)
+        audio2_batch = torch.cat([a.expand(n_options, -1, -1) for a in audio2_batch], dim=0)
+        batch_size = audio1_batch.shape[0]
+
+        # right-padded option tokens, each ending with the stop token
+        stop_token_index = self.tokenizer.encode(stop_token)[0]
+        option_ids = [self.tokenizer.encode(option) + [stop_token_index] for option in options]
+        max_option_len = max(len(ids) for ids in option_ids)
+        input_ids = torch.full((n_options, max_option_len), self.tokenizer.pad_token_id, dtype=torch.long)
+        option_mask = torch.zeros((n_options, max_option_len), dtype=torch.long)
+        for i, ids in enumerate(option_ids):
+            input_ids[i, :len(ids)] = torch.tensor(ids)
+            option_mask[i, :len(ids)] = 1
+        device = audio1_batch.device
+        input_ids = input_ids.repeat(batch_size // n_options, 1).to(device)
+        option_mask = option_mask.repeat(batch_size // n_options, 1).to(device)
+
+        texts_enc = self.preprocess_text([prompt] * batch_size)
+        audio_len = decoder.generate_audio_prefix(audio1_embed, audio2_embed).shape[1]
+        prefix_len = audio_len + texts_enc['input_ids'].shape[1]
+        mask = torch.cat((torch.ones(batch_size, audio_len, dtype=torch.long, device=device),
+                          texts_enc['attention_mask'].to(device).long(), option_mask), dim=1)
+
+        with torch.no_grad():
+            out = decoder(audio1_batch, audio2_batch, texts_enc, {'input_ids': input_ids}, mask=mask)
+            # logits at position t predict token t + 1
+            logits = out.logits[:, prefix_len - 1:-1, :].float()
+            token_logprobs = F.log_softmax(logits, dim=-1).gather(-1, input_ids.unsqueeze(-1)).squeeze(-1)
+            token_logprobs = token_logprobs * option_mask
+            log_likelihood = token_logprobs.sum(dim=-1)
+            scores = log_likelihood / option_mask.sum(dim=-1) if normalize else log_likelihood
+            if calibrate:
+                scores = scores[:n_options] - scores[n_options:]
+            probs = F.softmax(scores / temperature, dim=-1)
+
+        best = int(torch.argmax(probs))
+        return {
+            "options": list(options),
+            "log_likelihood": log_likelihood[:n_options].tolist(),
+            "probabilities": probs.tolist(),
+            "best": options[best],
+        }
+
+    def generate_multi(self, audio_path1, audio_path2, prompts, max_len, top_p, temperature, stop_token='<|endoftext|>',
+                       audio_resample=True, segment_pooling=None, top_k=3, max_segments=None):
+        r"""Produces text responses for several prompts about the same pair of audio files
+        The audios are encoded once and the shared [audio1, sep, audio2, sep] prefix is run through the LM once.
+        Its KV cache is repeated for every prompt and all answers are decoded together as one batch.
+        audio_path1: (str) first audio file path
+        audio_path2: (str) second audio file path
+        prompts: (list<str>) text prompts (questions) about the audios
+        other arguments: same as in generate
+        """
+        audio1_embed = self.encode_audio([audio_path1], audio_resample, segment_pooling, top_k, max_segments)
+        if segment_pooling is not None and audio_path2 == audio_path1:
+            audio2_embed = audio1_embed
+        else:
+            audio2_embed = self.encode_audio([audio_path2], audio_resample, segment_pooling, top_k, max_segments)
+        return self.generate_multi_from_audio_embeddings(audio1_embed, audio2_embed, prompts, max_len, top_p, temperature, stop_token)
+
+    def generate_multi_from_audio_embeddings(self, audio1_embed, audio2_embed, prompts, max_len, top_p, temperature, stop_token='<|endoftext|>'):
+        r"""generate_multi for a single pair of audio embeddings (batch 1) from encode_audio"""
+        decoder = self.model.caption_decoder
+        text_embed = self.preprocess_text(prompts)
+        with torch.no_grad():
+            audio_prefix = decoder.generate_audio_prefix(audio1_embed, audio2_embed)
+            past_key_values = decoder.lm(inputs_embeds=audio_prefix, use_cache=True).past_key_values
+            past_key_values = self._repeat_cache(past_key_values, len(prompts))
+            dtext = decoder.embed_tokens(text_embed['input_ids'])
+            text_mask = text_embed['attention_mask'].to(dtext.device)
+            attention_mask = torch.cat((text_mask.new_ones((len(prompts), audio_prefix.shape[1])), text_mask), dim=1)
+            position_ids = self._position_ids(attention_mask)[:, audio_prefix.shape[1]:]
+            outputs = decoder.lm(inputs_embeds=dtext, past_key_values=past_key_values, use_cache=True,
+                                 attention_mask=attention_mask, position_ids=position_ids)
+        return self._generate_batch_cached(outputs, top_p=top_p, temperature=temperature, stop_token=stop_token, entry_length=max_len,
+                                           attention_mask=attention_mask)
@@ -4,13 +4,9 @@ LTUAS - Listen, Think, Understand Audio System
 Main entry point for audio analysis pipeline
 """
 
-import config  # Import FIRST to add Mellow to path
-
 import argparse
 from pathlib import Path
-from core.pipeline import LTUASPipeline
 from core.utils import find_audio_files, validate_audio_file
-from config.settings import Config
 
 def main():
     parser = argparse.ArgumentParser(
@@ -41,30 +37,52 @@ def main():
         action="store_true",
         help="Process all audio files in directory"
     )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Batch mode: reprocess files the manifest already lists as done"
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Batch mode: worker processes (0 = one per Config.SHARDED_CONFIG['threads_per_worker'] cores)"
+    )
     
     args = parser.parse_args()
     
-    # Initialize pipeline
-    pipeline = LTUASPipeline()
-    
-    # Process based on mode
+    # Validate input before any model is imported or loaded
     audio_path = Path(args.audio)
+    batch = args.batch or audio_path.is_dir()
     
-    if args.batch or audio_path.is_dir():
-        # Batch mode
+    if batch:
         audio_files = find_audio_files(str(audio_path))
         if not audio_files:
             print(f"❌ No audio files found in {audio_path}")
             return
-        
+    elif not validate_audio_file(str(audio_path)):
+        return
+    
+    # torch, CLAP, MELLOW and Groq are imported here, not at startup
+    from core.pipeline import LTUASPipeline
+    
+    # Initialize pipeline
+    pipeline = LTUASPipeline()
+    
+    # Process based on mode
+    if batch:
+        # Batch mode
         print(f"Found {len(audio_files)} audio files")
-        pipeline.process_batch(audio_files, args.prompt)
+        if args.workers != 1:
+            from core.sharded import process_batch_sharded
+            process_batch_sharded(audio_files, args.prompt, workers=args.workers or None,
+                                  resume=not args.no_resume, pipeline=pipeline)
+        else:
+            pipeline.process_batch(audio_files, args.prompt, resume=not args.no_resume)
         
     else:
         # Single file mode
-        if not validate_audio_file(str(audio_path)):
-            return
-        
         pipeline.process_audio(
             str(audio_path),
             args.prompt,
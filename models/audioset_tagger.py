@@ -0,0 +1,84 @@
+import json
+import numpy as np
+from typing import Dict, List
+from config.settings import Config
+
+
+class AudioSetTagger:
+    """Maps MELLOW's HTSAT AudioSet clipwise scores onto CLAP_SOUND_CATEGORIES (replaces CLAP in the single_encoder profile)"""
+
+    def __init__(self):
+        with open(Config.AUDIOSET_TAGGER_CONFIG["labels_file"], "r", encoding="utf-8") as f:
+            self.labels = json.load(f)  # AudioSet class name -> index
+        self.category_indices = {
+            category: self._category_indices(category) for category in Config.CLAP_SOUND_CATEGORIES
+        }
+        for category, indices in self.category_indices.items():
+            if not indices:
+                print(f"⚠ No AudioSet class matches sound category '{category}', it will score 0")
+        print("✓ AudioSet tagger initialized (MELLOW HTSAT scores)")
+
+    def _category_indices(self, category: str) -> List[int]:
+        """AudioSet class indices that make up one sound category"""
+        names = Config.AUDIOSET_TAGGER_CONFIG["category_labels"].get(category)
+        if names is None:
+            names = [name for name in self.labels if category.lower() in name.lower()]
+        return [self.labels[name] for name in names if name in self.labels]
+
+    def process(self, clipwise) -> Dict:
+        """
+        Score sound categories from HTSAT clipwise output (1, 527) or (527,), already sigmoided.
+        Returns the same fields as CLAPProcessor.process.
+        """
+        try:
+            if hasattr(clipwise, "detach"):
+                clipwise = clipwise.detach().float().cpu().numpy()
+            clipwise = np.asarray(clipwise).reshape(-1)
+
+            raw = np.array([
+                clipwise[indices].max() if indices else 0.0
+                for indices in self.category_indices.values()
+            ])
+            # same normalization as CLAP so soft prompt percentages read the same way
+            probs = raw / (raw.sum() + 1e-8)
+
+            ranked = sorted(
+                zip(Config.CLAP_SOUND_CATEGORIES, probs, raw),
+                key=lambda x: x[1],
+                reverse=True
+            )
+
+            return {
+                "dominant_sound": ranked[0][0],
+                "dominant_confidence": float(ranked[0][1]),
+                "top_sounds": [
+                    {"sound": s, "confidence": float(p)} for s, p, _ in ranked[:5]
+                ],
+                "all_scores": {s: float(p) for s, p, _ in ranked},
+                "raw_scores": {s: float(r) for s, _, r in ranked},
+                "context_weights": None,
+                "source": "mellow_htsat",
+            }
+
+        except Exception as e:
+            print(f"❌ AudioSet tagging error: {e}")
+            return {
+                "error": str(e),
+                "dominant_sound": "unknown",
+                "top_sounds": []
+            }
+
+    def generate_soft_prompt(self, tag_result: Dict) -> str:
+        """Generate the same soft prompt CLAPProcessor does"""
+        if "error" in tag_result:
+            return "Audio classification unavailable"
+
+        top = tag_result["top_sounds"][:3]
+        desc = ", ".join(f"{i['sound']} ({i['confidence']:.1%})" for i in top)
+
+        prompt = f"Non-speech audio detected: {desc}"
+
+        if tag_result["dominant_confidence"] > 0.7:
+            prompt += f". Dominant category: {tag_result['dominant_sound']}."
+
+        return prompt
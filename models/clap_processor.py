@@ -1,7 +1,13 @@
+from config.paths import add_model_paths
+add_model_paths()  # vendored CLAP, before importing it
+
 import torch
+import librosa
+from pathlib import Path
 import laion_clap
 import numpy as np
-from typing import List, Tuple, Dict
+from laion_clap.training.data import int16_to_float32, float32_to_int16
+from typing import List, Tuple, Dict, Optional
 from config.settings import Config
 
 
@@ -11,6 +17,8 @@ class CLAPProcessor:
     def __init__(self):
         self.device = "cuda" if Config.USE_CUDA and torch.cuda.is_available() else "cpu"
         self.model = None
+        # "hit" (saved trace loaded) / "miss" (exported now) with the torchscript backend, else None
+        self.torchscript_cache = None
         self._load_model()
 
     def _load_model(self):
@@ -21,6 +29,43 @@ class CLAPProcessor:
         )
         self.model.load_ckpt()
         print(f"✓ CLAP model loaded on {self.device}")
+        if Config.CLAP_CONFIG["backend"] == "torchscript":
+            self._load_torchscript_encoder()
+
+    def _load_torchscript_encoder(self):
+        """
+        Switch audio embeddings to the traced audio encoder, exporting it on first use (eager on failure).
+        A saved trace from other encoder code or another torch version is exported again.
+        """
+        # the trace holds the checkpoint weights and device, so both are part of the file name
+        checkpoint = Path(Config.CLAP_CONFIG["model_name"]).stem
+        path = Path(Config.CLAP_CONFIG["export_dir"]) / f"clap_audio_{checkpoint}_{self.device}.ts"
+        try:
+            if path.exists():
+                try:
+                    self.model.load_audio_encoder(str(path))
+                    self.torchscript_cache = "hit"
+                except Exception as e:
+                    print(f"⚠ {e}")
+                    path.unlink()
+            if not path.exists():
+                print(f"Exporting CLAP audio encoder to {path}...")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.model.export_audio_encoder(str(path))
+                self.model.load_audio_encoder(str(path))
+                self.torchscript_cache = "miss"
+            print(f"✓ CLAP audio backend: TorchScript ({path.name})")
+        except Exception as e:
+            print(f"⚠ TorchScript CLAP audio encoder unavailable, using eager: {e}")
+            self.model.audio_encoder = None
+
+    def load_waveform(self, audio_path: str) -> np.ndarray:
+        """
+        Decode audio exactly as CLAP_Module.get_audio_embedding_from_filelist does
+        (48 kHz mono, int16 quantization round-trip) so it can be shared with other stages.
+        """
+        waveform, _ = librosa.load(audio_path, sr=Config.CLAP_CONFIG["sample_rate"])
+        return int16_to_float32(float32_to_int16(waveform))
 
     # -------------------------------------------------------
     # NEW: Dynamic contextual weighting from first script
@@ -73,16 +118,23 @@ class CLAPProcessor:
     # -------------------------------------------------------
     # MAIN PROCESS FUNCTION (IMPROVED)
     # -------------------------------------------------------
-    def process(self, audio_path: str, soft_prompt: str = None) -> Dict:
+    def process(self, audio_path: str, soft_prompt: str = None, waveform: Optional[np.ndarray] = None) -> Dict:
         """
         Process audio file and return sound classifications with optional contextual boost.
+        If `waveform` (from load_waveform) is given, the file is not decoded again.
         """
         try:
             # Audio embedding
-            audio_embed = self.model.get_audio_embedding_from_filelist(
-                x=[audio_path],
-                use_tensor=True
-            )
+            if waveform is not None:
+                audio_embed = self.model.get_audio_embedding_from_data(
+                    x=torch.from_numpy(waveform).float().unsqueeze(0),
+                    use_tensor=True
+                )
+            else:
+                audio_embed = self.model.get_audio_embedding_from_filelist(
+                    x=[audio_path],
+                    use_tensor=True
+                )
 
             # Category text embeddings
             text_embed = self.model.get_text_embedding(
@@ -1,5 +1,5 @@
-from groq import Groq
-from typing import Dict
+from groq import AsyncGroq, Groq
+from typing import Dict, List, Tuple
 from typing import Optional
 from config.settings import Config
 
@@ -8,7 +8,52 @@ class LLMLayer:
     
     def __init__(self):
         self.client = Groq(api_key=Config.GROQ_API_KEY)
+        # token usage reported by the API for the last convert_to_soft_prompt call, and its error if it failed
+        self.last_usage = None
+        self.last_error = None
+        self._async_client = None
         print("✓ LLM layer initialized")
+
+    @property
+    def async_client(self) -> AsyncGroq:
+        """Created on first use, so sync-only callers (and forked shard workers) never hold one"""
+        if self._async_client is None:
+            self._async_client = AsyncGroq(api_key=self.client.api_key)
+        return self._async_client
+
+    def _messages(self, clap_prompt: str, whisper_prompt: str, user_prompt: Optional[str]) -> List[Dict]:
+        from prompts.templates import LLM_CONVERSION_PROMPT
+        
+        # Build context
+        context = f"""
+CLAP Analysis (Non-Speech): {clap_prompt}
+
+Whisper Analysis (Speech): {whisper_prompt}
+"""
+        if user_prompt:
+            context += f"\nUser Guidance: {user_prompt}"
+        
+        return [
+            {"role": "system", "content": LLM_CONVERSION_PROMPT},
+            {"role": "user", "content": context}
+        ]
+
+    def _request_options(self) -> Dict:
+        return {
+            "model": Config.LLM_CONFIG["model"],
+            "temperature": Config.LLM_CONFIG["temperature"],
+            "max_tokens": Config.LLM_CONFIG["max_tokens"],
+            "stream": False,  # Use streaming=False for simplicity
+        }
+
+    def _completion_result(self, completion) -> Tuple[str, Optional[Dict]]:
+        soft_prompt = completion.choices[0].message.content.strip()
+        usage = getattr(completion, "usage", None)
+        usage = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        } if usage is not None else None
+        return soft_prompt, usage
     
     def convert_to_soft_prompt(
         self, 
@@ -27,38 +72,47 @@ class LLMLayer:
         Returns:
             Unified soft prompt for MELLOW
         """
-        from prompts.templates import LLM_CONVERSION_PROMPT
-        
-        # Build context
-        context = f"""
-CLAP Analysis (Non-Speech): {clap_prompt}
-
-Whisper Analysis (Speech): {whisper_prompt}
-"""
-        if user_prompt:
-            context += f"\nUser Guidance: {user_prompt}"
-        
         # Generate unified prompt
+        self.last_usage, self.last_error = None, None
         try:
             completion = self.client.chat.completions.create(
-                model=Config.LLM_CONFIG["model"],
-                messages=[
-                    {"role": "system", "content": LLM_CONVERSION_PROMPT},
-                    {"role": "user", "content": context}
-                ],
-                temperature=Config.LLM_CONFIG["temperature"],
-                max_tokens=Config.LLM_CONFIG["max_tokens"],
-                stream=False,  # Use streaming=False for simplicity
+                messages=self._messages(clap_prompt, whisper_prompt, user_prompt),
+                **self._request_options()
             )
-            
-            soft_prompt = completion.choices[0].message.content.strip()
+            soft_prompt, self.last_usage = self._completion_result(completion)
             return soft_prompt
             
         except Exception as e:
             print(f"❌ LLM layer error: {e}")
+            self.last_error = str(e)
             # Fallback: simple concatenation
             return f"{clap_prompt}. {whisper_prompt}"
     
+    async def convert_to_soft_prompt_async(
+        self,
+        clap_prompt: str,
+        whisper_prompt: str,
+        user_prompt: Optional[str] = None
+    ) -> Tuple[str, Optional[Dict], Optional[str]]:
+        """
+        convert_to_soft_prompt for asyncio callers, awaited on AsyncGroq
+        
+        Returns:
+            Unified soft prompt, the token usage and the error if the request failed
+            (returned rather than kept in last_usage / last_error, since concurrent runs share this layer)
+        """
+        try:
+            completion = await self.async_client.chat.completions.create(
+                messages=self._messages(clap_prompt, whisper_prompt, user_prompt),
+                **self._request_options()
+            )
+            return (*self._completion_result(completion), None)
+            
+        except Exception as e:
+            print(f"❌ LLM layer error: {e}")
+            # Fallback: simple concatenation
+            return f"{clap_prompt}. {whisper_prompt}", None, str(e)
+    
     def convert_streaming(
         self, 
         clap_prompt: str, 
@@ -1,5 +1,6 @@
 # models/mellow_processor.py
-import config  # Import first to add Mellow to path
+from config.paths import add_model_paths
+add_model_paths()  # vendored Mellow, before importing it
 
 import torch
 from pathlib import Path
@@ -34,6 +35,7 @@ class MELLOWProcessor:
                 model=Config.MELLOW_CONFIG["model"],
                 device=self.device,
                 use_cuda=Config.USE_CUDA and torch.cuda.is_available(),
+                seed=Config.MELLOW_CONFIG["seed"],
             )
 
             print(f"[OK] MELLOW model loaded successfully")
@@ -48,12 +50,64 @@ class MELLOWProcessor:
             raise e
 
 
+    def encode_audio(self, audio_path: str, reference_audio: Optional[str] = None) -> Optional[Dict]:
+        """
+        Encode the audio inputs ahead of the prompt (runs in parallel with CLAP/Whisper/LLM).
+        Returns embeddings to pass to process(), plus the HTSAT AudioSet scores of audio_path
+        under "clipwise" (used for sound tags when CLAP is not loaded), or None on failure
+        so process() encodes itself.
+        """
+        try:
+            audio2_path = reference_audio or audio_path
+            kwargs = dict(
+                segment_pooling=Config.MELLOW_CONFIG["segment_pooling"],
+                top_k=Config.MELLOW_CONFIG["top_k_segments"],
+                max_segments=Config.MELLOW_CONFIG["max_segments"],
+            )
+            audio1_embed, clipwise = self.model.encode_audio([audio_path], return_clipwise=True, **kwargs)
+            if audio2_path == audio_path and Config.MELLOW_CONFIG["segment_pooling"] is not None:
+                audio2_embed = audio1_embed
+            else:
+                audio2_embed = self.model.encode_audio([audio2_path], **kwargs)
+            print("[DEBUG] MELLOW audio encoded ahead of prompt")
+            return {"audio1": audio1_embed, "audio2": audio2_embed, "clipwise": clipwise}
+
+        except Exception as e:
+            print("[X] MELLOW audio encoding error:", str(e))
+            return None
+
+    def score_options(self, audio_path: str, question: str, options: List[str]) -> Dict:
+        """
+        Answer a yes/no or multiple-choice question by scoring each option's likelihood
+        instead of generating free text. Returns probabilities per option and the best one.
+        """
+        try:
+            result = self.model.score_options(
+                audio_path,
+                question,
+                options,
+                segment_pooling=Config.MELLOW_CONFIG["segment_pooling"],
+                top_k=Config.MELLOW_CONFIG["top_k_segments"],
+                max_segments=Config.MELLOW_CONFIG["max_segments"],
+            )
+            result["success"] = True
+            return result
+
+        except Exception as e:
+            print("[X] MELLOW option scoring error:", str(e))
+            return {"error": str(e), "options": options, "best": None, "success": False}
+
     def process(
         self, 
         audio_path: str, 
         soft_prompt: str,
-        reference_audio: Optional[str] = None
+        reference_audio: Optional[str] = None,
+        audio_embeds: Optional[Dict] = None,
+        step_span=None
     ) -> Dict:
+        """
+        step_span: optional step index -> context manager entered around each decode step (instrumentation)
+        """
 
         print("\n================= MELLOW PROCESS START =================")
         print("[DEBUG] Received arguments:")
@@ -91,13 +145,34 @@ class MELLOWProcessor:
             print(f"        top_p       = {Config.MELLOW_CONFIG['top_p']}")
             print(f"        temperature = {Config.MELLOW_CONFIG['temperature']}")
             print(f"        device      = {self.device}")
-
-            response = self.model.generate(
-                examples=examples,
-                max_len=Config.MELLOW_CONFIG["max_len"],
-                top_p=Config.MELLOW_CONFIG["top_p"],
-                temperature=Config.MELLOW_CONFIG["temperature"],
-            )
+            print(f"        segment_pooling = {Config.MELLOW_CONFIG['segment_pooling']}")
+
+            if audio_embeds is not None:
+                print("[DEBUG] Using pre-encoded audio, running prompt + decode only")
+                response, decode_stats = self.model.generate_from_audio_embeddings(
+                    audio_embeds["audio1"],
+                    audio_embeds["audio2"],
+                    [soft_prompt],
+                    max_len=Config.MELLOW_CONFIG["max_len"],
+                    top_p=Config.MELLOW_CONFIG["top_p"],
+                    temperature=Config.MELLOW_CONFIG["temperature"],
+                    prompt_lookup=Config.MELLOW_CONFIG["prompt_lookup"],
+                    step_span=step_span,
+                    return_stats=True,
+                )
+            else:
+                response, decode_stats = self.model.generate(
+                    examples=examples,
+                    max_len=Config.MELLOW_CONFIG["max_len"],
+                    top_p=Config.MELLOW_CONFIG["top_p"],
+                    temperature=Config.MELLOW_CONFIG["temperature"],
+                    segment_pooling=Config.MELLOW_CONFIG["segment_pooling"],
+                    top_k=Config.MELLOW_CONFIG["top_k_segments"],
+                    max_segments=Config.MELLOW_CONFIG["max_segments"],
+                    prompt_lookup=Config.MELLOW_CONFIG["prompt_lookup"],
+                    step_span=step_span,
+                    return_stats=True,
+                )
 
             print("\n[DEBUG] Raw model response received:")
             print("--------------------------------------------------------")
@@ -110,6 +185,7 @@ class MELLOWProcessor:
                 "inference": response,
                 "soft_prompt_used": soft_prompt,
                 "examples_used": examples,
+                "decode_stats": decode_stats,
                 "success": True
             }
 
@@ -0,0 +1,141 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from config.settings import Config
+
+
+class VADProcessor:
+    """Lightweight in-process voice-activity detection on an already decoded waveform"""
+
+    def __init__(self):
+        self.cfg = Config.VAD_CONFIG
+        print("✓ VAD processor initialized")
+
+    # -------------------------------------------------------
+    # FRAME FEATURES
+    # -------------------------------------------------------
+    def _frame_features(self, waveform: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compute per-frame energy (dB), spectral flatness and speech-band energy ratio.
+        Frames are non-overlapping and processed in blocks to bound FFT memory on long files.
+        """
+        frame_len = int(sample_rate * self.cfg["frame_ms"] / 1000)
+        n_frames = len(waveform) // frame_len
+        if n_frames == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty, empty
+
+        frames = waveform[:n_frames * frame_len].reshape(n_frames, frame_len)
+        window = np.hanning(frame_len).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame_len, d=1.0 / sample_rate)
+        low, high = self.cfg["speech_band_hz"]
+        band = (freqs >= low) & (freqs <= high)
+
+        energy_db = np.empty(n_frames, dtype=np.float32)
+        flatness = np.empty(n_frames, dtype=np.float32)
+        band_ratio = np.empty(n_frames, dtype=np.float32)
+
+        block = self.cfg["block_frames"]
+        for start in range(0, n_frames, block):
+            chunk = frames[start:start + block]
+            rms = np.sqrt(np.mean(chunk ** 2, axis=1))
+            energy_db[start:start + block] = 20 * np.log10(rms + 1e-10)
+
+            power = np.abs(np.fft.rfft(chunk * window, axis=1)) ** 2 + 1e-12
+            flatness[start:start + block] = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+            band_ratio[start:start + block] = power[:, band].sum(axis=1) / power.sum(axis=1)
+
+        return energy_db, flatness, band_ratio
+
+    # -------------------------------------------------------
+    # FRAME MASK -> SEGMENTS
+    # -------------------------------------------------------
+    def _mask_to_segments(self, mask: np.ndarray, duration: float) -> List[Tuple[float, float]]:
+        """Drop blips, merge short gaps, drop short bursts and pad the voiced frame mask into (start, end) seconds"""
+        frame_s = self.cfg["frame_ms"] / 1000
+        edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) * frame_s
+        ends = np.flatnonzero(edges == -1) * frame_s
+        # a frame or two that look voiced are noise fluctuations (wind, room tone), not syllables;
+        # dropped before the gap merge, which would otherwise join them into long "speech"
+        keep = ends - starts >= self.cfg["min_voiced_run_ms"] / 1000 - 1e-9
+        starts, ends = starts[keep], ends[keep]
+
+        merged = []
+        for s, e in zip(starts, ends):
+            if merged and s - merged[-1][1] < self.cfg["min_silence_ms"] / 1000:
+                merged[-1][1] = e
+            else:
+                merged.append([s, e])
+
+        pad = self.cfg["padding_ms"] / 1000
+        segments = []
+        for s, e in merged:
+            if e - s < self.cfg["min_speech_ms"] / 1000:
+                continue
+            s, e = max(0.0, s - pad), min(duration, e + pad)
+            if segments and s <= segments[-1][1]:
+                segments[-1] = (segments[-1][0], e)
+            else:
+                segments.append((s, e))
+
+        return [(round(float(s), 3), round(float(e), 3)) for s, e in segments]
+
+    # -------------------------------------------------------
+    # MAIN PROCESS FUNCTION
+    # -------------------------------------------------------
+    def process(self, waveform: np.ndarray, sample_rate: int) -> Dict:
+        """
+        Mark speech regions in a mono waveform
+
+        Args:
+            waveform: Mono float waveform (the one decoded for CLAP)
+            sample_rate: Sample rate of the waveform
+
+        Returns:
+            Dict with speech segments (seconds) and speech ratio
+        """
+        duration = len(waveform) / sample_rate if sample_rate else 0.0
+
+        try:
+            energy_db, flatness, band_ratio = self._frame_features(
+                np.asarray(waveform, dtype=np.float32), sample_rate
+            )
+            if len(energy_db) == 0:
+                return {"has_speech": False, "segments": [], "speech_ratio": 0.0, "duration": duration}
+
+            # Adaptive threshold: noise floor from the quietest frames plus margin. The floor is capped,
+            # so speech with few pauses (where even the low percentile is voiced) can't raise it above itself
+            p_low, p_high = np.percentile(energy_db, [self.cfg["noise_percentile"], 90])
+            noise_floor = min(p_low, self.cfg["max_noise_floor_db"])
+            threshold = max(self.cfg["min_energy_db"], noise_floor + self.cfg["energy_margin_db"])
+
+            if p_high - p_low < self.cfg["min_spread_db"] and p_high > self.cfg["min_energy_db"]:
+                # Flat, non-silent energy: no quiet frames to tell a floor from, so only the spectrum
+                # can separate continuous speech from steady ambience
+                threshold = self.cfg["min_energy_db"]
+            mask = (
+                (energy_db > threshold)
+                & (flatness < self.cfg["max_flatness"])
+                & (band_ratio > self.cfg["min_band_ratio"])
+            )
+            segments = self._mask_to_segments(mask, duration)
+            voiced = sum(e - s for s, e in segments)
+
+            return {
+                "has_speech": len(segments) > 0,
+                "segments": segments,
+                "speech_ratio": round(voiced / duration, 3) if duration else 0.0,
+                "duration": round(duration, 3),
+                "threshold_db": round(float(threshold), 2),
+            }
+
+        except Exception as e:
+            # Fail open: treat the whole file as speech so Whisper still runs
+            print(f"❌ VAD processing error: {e}")
+            return {
+                "error": str(e),
+                "has_speech": True,
+                "segments": [(0.0, round(duration, 3))],
+                "speech_ratio": 1.0,
+                "duration": round(duration, 3),
+            }
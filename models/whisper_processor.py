@@ -1,6 +1,8 @@
+import io
 import os
-from groq import Groq
-from typing import Dict, Optional
+import numpy as np
+from groq import AsyncGroq, Groq
+from typing import Dict, List, Optional, Tuple
 from config.settings import Config
 
 class WhisperProcessor:
@@ -8,46 +10,182 @@ class WhisperProcessor:
     
     def __init__(self):
         self.client = Groq(api_key=Config.GROQ_API_KEY)
+        self._async_client = None
         print("✓ Whisper processor initialized")
+
+    @property
+    def async_client(self) -> AsyncGroq:
+        """Created on first use, so sync-only callers (and forked shard workers) never hold one"""
+        if self._async_client is None:
+            self._async_client = AsyncGroq(api_key=self.client.api_key)
+        return self._async_client
     
-    def process(self, audio_path: str) -> Dict:
+    def _encode_voiced(
+        self,
+        waveform: np.ndarray,
+        sample_rate: int,
+        segments: List[Tuple[float, float]]
+    ) -> Tuple[bytes, List[Tuple[float, float]]]:
+        """
+        Concatenate voiced segments into a 16-bit mono WAV at the Whisper rate
+
+        Returns:
+            WAV bytes and an offset map of (start in upload, start in original) per segment
+        """
+        import librosa
+        import soundfile as sf
+
+        target_sr = Config.VAD_CONFIG["whisper_sample_rate"]
+        pieces = []
+        offsets = []
+        cursor = 0.0
+        for start, end in segments:
+            piece = waveform[int(start * sample_rate):int(end * sample_rate)]
+            pieces.append(piece)
+            offsets.append((cursor, start))
+            cursor += len(piece) / sample_rate
+
+        voiced = np.concatenate(pieces)
+        if sample_rate != target_sr:
+            voiced = librosa.resample(voiced, orig_sr=sample_rate, target_sr=target_sr)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, voiced, target_sr, format="WAV", subtype="PCM_16")
+        return buffer.getvalue(), offsets
+
+    def _remap_segments(self, segments: List, offsets: List[Tuple[float, float]]) -> List:
+        """Shift Whisper segment timestamps from the voiced upload back to the original timeline"""
+        remapped = []
+        for seg in segments:
+            if not isinstance(seg, dict) or "start" not in seg:
+                remapped.append(seg)
+                continue
+            # Last voiced piece that starts at or before this segment
+            shift = 0.0
+            for upload_start, original_start in offsets:
+                if upload_start <= seg["start"]:
+                    shift = original_start - upload_start
+            seg = dict(seg)
+            seg["end"] = seg.get("end", seg["start"]) + shift
+            seg["start"] = seg["start"] + shift
+            remapped.append(seg)
+        return remapped
+
+    def process(
+        self,
+        audio_path: str,
+        vad_result: Optional[Dict] = None,
+        waveform: Optional[np.ndarray] = None,
+        sample_rate: Optional[int] = None
+    ) -> Dict:
         """
         Transcribe audio file using Whisper
         
         Args:
             audio_path: Path to audio file
+            vad_result: Optional VADProcessor output; no speech skips the API call
+            waveform: Optional decoded waveform used to upload only voiced segments
+            sample_rate: Sample rate of `waveform`
             
         Returns:
             Dict with transcription and metadata
         """
+        prepared = self.prepare_upload(audio_path, vad_result, waveform, sample_rate)
+        if "result" in prepared:
+            return prepared["result"]
         try:
-            with open(audio_path, "rb") as audio_file:
-                transcription = self.client.audio.transcriptions.create(
-                    file=(os.path.basename(audio_path), audio_file.read()),
-                    model=Config.WHISPER_CONFIG["model"],
-                    temperature=Config.WHISPER_CONFIG["temperature"],
-                    response_format=Config.WHISPER_CONFIG["response_format"],
-                )
-            
-            # Extract relevant fields from verbose_json
-            result = {
-                "text": transcription.text,
-                "language": getattr(transcription, 'language', 'unknown'),
-                "duration": getattr(transcription, 'duration', 0),
-                "segments": getattr(transcription, 'segments', []),
-                "has_speech": len(transcription.text.strip()) > 0,
-            }
-            
-            return result
-            
+            transcription = self.client.audio.transcriptions.create(file=prepared["upload"], **self._request_options())
+            return self._transcription_result(transcription, prepared)
         except Exception as e:
-            print(f"❌ Whisper processing error: {e}")
-            return {
-                "error": str(e),
+            return self._error(e)
+
+    async def transcribe_async(self, prepared: Dict) -> Dict:
+        """process() for asyncio callers: the request is awaited on AsyncGroq; `prepared` comes from prepare_upload"""
+        if "result" in prepared:
+            return prepared["result"]
+        try:
+            transcription = await self.async_client.audio.transcriptions.create(
+                file=prepared["upload"], **self._request_options())
+            return self._transcription_result(transcription, prepared)
+        except Exception as e:
+            return self._error(e)
+
+    def prepare_upload(
+        self,
+        audio_path: str,
+        vad_result: Optional[Dict] = None,
+        waveform: Optional[np.ndarray] = None,
+        sample_rate: Optional[int] = None
+    ) -> Dict:
+        """
+        The CPU/disk half of process(): the upload (voiced segments only when VAD allows) and its
+        offset map, or {"result": ...} when no request is needed (no speech) or preparing failed
+        """
+        if vad_result is not None and not vad_result["has_speech"]:
+            return {"result": {
                 "text": "",
+                "language": "unknown",
+                "duration": vad_result.get("duration", 0),
+                "segments": [],
                 "has_speech": False,
-                "language": "unknown"
+                "skipped": "vad",
+            }}
+
+        try:
+            offsets = None
+            partial = (
+                vad_result is not None
+                and waveform is not None
+                and vad_result.get("speech_ratio", 1.0) < Config.VAD_CONFIG["full_file_ratio"]
+            )
+
+            if partial:
+                audio_bytes, offsets = self._encode_voiced(waveform, sample_rate, vad_result["segments"])
+                upload = (f"{os.path.splitext(os.path.basename(audio_path))[0]}_voiced.wav", audio_bytes)
+            else:
+                with open(audio_path, "rb") as audio_file:
+                    upload = (os.path.basename(audio_path), audio_file.read())
+
+            return {
+                "upload": upload,
+                "offsets": offsets,
+                "partial": partial,
+                "duration": vad_result["duration"] if partial else None,
             }
+        except Exception as e:
+            return {"result": self._error(e)}
+
+    def _request_options(self) -> Dict:
+        return {
+            "model": Config.WHISPER_CONFIG["model"],
+            "temperature": Config.WHISPER_CONFIG["temperature"],
+            "response_format": Config.WHISPER_CONFIG["response_format"],
+        }
+
+    def _transcription_result(self, transcription, prepared: Dict) -> Dict:
+        """Extract relevant fields from verbose_json"""
+        segments = getattr(transcription, 'segments', []) or []
+        offsets = prepared["offsets"]
+        result = {
+            "text": transcription.text,
+            "language": getattr(transcription, 'language', 'unknown'),
+            "duration": prepared["duration"] if prepared["partial"] else getattr(transcription, 'duration', 0),
+            "segments": self._remap_segments(segments, offsets) if offsets else segments,
+            "has_speech": len(transcription.text.strip()) > 0,
+        }
+        if prepared["partial"]:
+            result["uploaded_bytes"] = len(prepared["upload"][1])
+        
+        return result
+
+    def _error(self, e: Exception) -> Dict:
+        print(f"❌ Whisper processing error: {e}")
+        return {
+            "error": str(e),
+            "text": "",
+            "has_speech": False,
+            "language": "unknown"
+        }
     
     def generate_soft_prompt(self, whisper_result: Dict) -> str:
         """Convert Whisper results to natural language soft prompt"""
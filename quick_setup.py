@@ -6,27 +6,12 @@ print("="*60)
 print("LTUAS Quick Setup")
 print("="*60)
 
-# Step 1: Create config/__init__.py
-print("\n1. Creating config/__init__.py...")
-config_init = Path("config/__init__.py")
-config_init.parent.mkdir(exist_ok=True)
+# Step 1: Check the vendored model sources (config.paths.add_model_paths() puts them on sys.path)
+print("\n1. Checking model sources...")
+from config.paths import CLAP_PATH, MELLOW_PATH, add_model_paths
 
-config_init_content = '''# config/__init__.py
-import sys
-from pathlib import Path
-
-# Get base directory
-BASE_DIR = Path(__file__).parent.parent
-
-# Add Mellow to Python path
-MELLOW_PATH = BASE_DIR / "external_models" / "mellow"
-if MELLOW_PATH.exists() and str(MELLOW_PATH) not in sys.path:
-    sys.path.insert(0, str(MELLOW_PATH))
-    print(f"[Config] Added Mellow to path: {MELLOW_PATH}")
-'''
-
-config_init.write_text(config_init_content)
-print("   [OK] Created config/__init__.py")
+for name, path in (("CLAP", CLAP_PATH), ("Mellow", MELLOW_PATH)):
+    print(f"   {'[OK]' if path.exists() else '[X]'} {name}: {path}")
 
 # Step 2: Create .env.example
 print("\n2. Creating .env.example...")
@@ -49,8 +34,8 @@ else:
 
 # Step 4: Test imports
 print("\n4. Testing imports...")
+add_model_paths()
 try:
-    import config  # This adds Mellow to path
     from mellow import MellowWrapper
     print("   [OK] Mellow can now be imported!")
 except ImportError as e:
@@ -72,6 +57,6 @@ print("\n" + "="*60)
 print("Setup complete!")
 print("Next steps:")
 print("1. Edit .env and add your GROQ_API_KEY")
-print("2. Run: python diagnose.py (to verify)")
+print("2. Run: python diagnosis.py (to verify)")
 print("3. Run: python main.py path/to/audio.wav")
 print("="*60)
@@ -1,16 +1,26 @@
+import asyncio
+import os
 import uuid
 import shutil
 import tempfile
 import subprocess
 import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, Dict, Any
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import json
 
+from config.settings import Config
+from core.executor import QueueFull, StageExecutor
+from core.instrumentation import EventLog, peak_rss_mb
+from core.metrics import MetricsRegistry
+
 
 # ---------------------------------------------------------
 # GLOBAL STATE (same as Node.js Map)
@@ -19,7 +29,90 @@ runs: Dict[str, Dict[str, Any]] = {}
 
 AUDIO_EXT = {".wav", ".mp3", ".m4a", ".flac", ".ogg"}
 
-app = FastAPI(title="LTUAS API", version="1.0.0")
+# Bounded run pool: Config.EXECUTOR_CONFIG["server_runs"] pipelines at once, a bounded
+# queue behind them, /run answers 503 beyond that
+RUN_POOL = StageExecutor({"pipeline": Config.EXECUTOR_CONFIG["server_runs"]}, name="server")
+run_futures: Dict[str, Future] = {}
+run_processes: Dict[str, subprocess.Popen] = {}
+
+# In-process mode (LTUAS_SERVER_MODE=inprocess): one pipeline loaded at startup,
+# each run is a process_audio_async task on the event loop
+SERVER_MODE = Config.EXECUTOR_CONFIG["server_runs"]["mode"]
+pipeline = None
+run_tasks: Dict[str, asyncio.Task] = {}
+
+# ---------------------------------------------------------
+# METRICS (served at /metrics)
+# ---------------------------------------------------------
+metrics = MetricsRegistry()
+RUNS_TOTAL = metrics.counter("ltuas_runs_total", "Finished pipeline runs by outcome", ["status"])
+RUN_SECONDS = metrics.histogram("ltuas_run_duration_seconds", "Wall time of a run, upload to result")
+QUEUE_DEPTH = metrics.gauge("ltuas_runs_in_progress", "Runs accepted and not finished yet")
+QUEUE_DEPTH.set_function(lambda: sum(r["status"] == "running" for r in list(runs.values())))
+STAGE_SECONDS = metrics.histogram(
+    "ltuas_stage_duration_seconds",
+    "Wall time of each pipeline stage span (every MELLOW decode step is its own mellow_decode_step span)",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+STAGE_CPU_SECONDS = metrics.counter(
+    "ltuas_stage_cpu_seconds_total",
+    "CPU time of the thread running each stage (stages that only await other threads or the network are not counted)",
+    ["stage"],
+)
+STAGE_TOKENS = metrics.counter("ltuas_stage_tokens_total", "Tokens generated per stage (LLM, MELLOW decode)", ["stage"])
+GROQ_REQUESTS = metrics.counter("ltuas_groq_requests_total", "Requests sent to the Groq API", ["api"])
+GROQ_ERRORS = metrics.counter("ltuas_groq_errors_total", "Groq API requests that failed", ["api"])
+CACHE_LOOKUPS = metrics.counter("ltuas_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"])
+PIPELINE_PEAK_RSS = metrics.gauge("ltuas_pipeline_peak_rss_bytes", "Peak RSS of the last pipeline process, loaded models included")
+SERVER_PEAK_RSS = metrics.gauge("ltuas_server_peak_rss_bytes", "Peak RSS of the API server process")
+SERVER_PEAK_RSS.set_function(lambda: (peak_rss_mb() or 0) * 2 ** 20)
+RUNS_QUEUED = metrics.gauge("ltuas_runs_queued", "Accepted runs waiting for a free pipeline slot")
+RUNS_QUEUED.set_function(lambda: RUN_POOL.stats()["pipeline"]["queued"])
+
+
+def observe_event(event: Dict[str, Any]):
+    """
+    Update the metrics from one pipeline stage event (core.instrumentation.StageRecorder):
+    in-process runs call it as a pipeline listener, main.py runs report their events through
+    LTUAS_STAGE_EVENTS and are observed when the process exits
+    """
+    kind = event.get("event")
+    if kind == "span":
+        stage = event["stage"]
+        STAGE_SECONDS.labels(stage).observe(event["wall_ms"] / 1000)
+        if event.get("cpu_ms") is not None:
+            STAGE_CPU_SECONDS.labels(stage).inc(event["cpu_ms"] / 1000)
+        if event.get("tokens"):
+            STAGE_TOKENS.labels(stage).inc(event["tokens"])
+        if event.get("api"):
+            GROQ_REQUESTS.labels(event["api"]).inc()
+            if event.get("error"):
+                GROQ_ERRORS.labels(event["api"]).inc()
+    elif kind == "cache":
+        CACHE_LOOKUPS.labels(event["cache"], event["result"]).inc()
+    elif kind == "run" and event.get("peak_rss_mb") is not None:
+        PIPELINE_PEAK_RSS.set(event["peak_rss_mb"] * 2 ** 20)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global pipeline
+    if SERVER_MODE == "inprocess":
+        from core.pipeline import LTUASPipeline
+        pipeline = await asyncio.to_thread(LTUASPipeline, [observe_event])
+    yield
+    # graceful shutdown: running pipelines finish, queued runs are cancelled
+    # (in-process runs stop at their next stage boundary)
+    for task in list(run_tasks.values()):
+        task.cancel()
+    if run_tasks:
+        await asyncio.gather(*run_tasks.values(), return_exceptions=True)
+    RUN_POOL.shutdown(wait=True, cancel_pending=True)
+    if pipeline is not None:
+        pipeline.close()
+
+
+app = FastAPI(title="LTUAS API", version="1.0.0", lifespan=lifespan)
 
 # ---------------------------------------------------------
 # CORS
@@ -38,21 +131,11 @@ app.add_middleware(
 
 
 # ---------------------------------------------------------
-# Load latest result JSON from outputs/results
+# Load the result JSON a run saved
 # ---------------------------------------------------------
-def load_latest_result_json():
-    results_dir = Path("outputs/results")
-    if not results_dir.exists():
-        return None
-
-    json_files = list(results_dir.glob("*.json"))
-    if not json_files:
-        return None
-
-    latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
-
+def load_result_json(output_file: str):
     try:
-        with latest_file.open("r", encoding="utf-8") as f:
+        with open(output_file, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception as e:
         return {"error": f"Could not load JSON: {e}"}
@@ -112,6 +195,12 @@ def add_log(run_id, message):
 # Pipeline Worker (Background thread)
 # ---------------------------------------------------------
 def python_pipeline_worker(run_id: str, audio_path: str, prompt: Optional[str]):
+    if runs.get(run_id, {}).get("status") != "running":
+        return  # cancelled (and counted) by /cancel just as it left the queue
+
+    start = time.perf_counter()
+    # the run's stage events (core.instrumentation.EventLog), read back for the metrics and its result
+    events_file = Path(tempfile.gettempdir()) / f"ltuas_{run_id}.events.jsonl"
     try:
         add_log(run_id, "Pipeline started")
         update_node(run_id, "clap", "running")
@@ -126,14 +215,24 @@ def python_pipeline_worker(run_id: str, audio_path: str, prompt: Optional[str]):
         print(f"\n===== RUN {run_id}: EXECUTING SUBPROCESS =====")
         print(" ".join(cmd), "\n")
 
+        # Thread budget: this run shares the cores with every run in progress
+        env = dict(os.environ)
+        in_progress = RUN_POOL.stats()["pipeline"]["running"]
+        env["LTUAS_CONCURRENCY"] = str(max(in_progress, int(os.environ.get("LTUAS_CONCURRENCY", "1"))))
+        env["LTUAS_STAGE_EVENTS"] = str(events_file)
+
         # Popen with realtime streaming
         process = subprocess.Popen(
             cmd,
+            env=env,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             bufsize=1,
             universal_newlines=True,
         )
+        run_processes[run_id] = process
+        if runs[run_id]["status"] == "cancelled":
+            process.kill()  # /cancel came in before the process was registered
 
         # ----- STREAM STDOUT -----
         for line in process.stdout:
@@ -179,32 +278,95 @@ def python_pipeline_worker(run_id: str, audio_path: str, prompt: Optional[str]):
         code = process.wait()
         print(f"\n===== SUBPROCESS EXITED (code {code}) =====\n")
 
+        events = EventLog.read(events_file)
+        for event in events:
+            observe_event(event)
+
+        if runs[run_id]["status"] == "cancelled":
+            # /cancel already recorded it
+            add_log(run_id, f"Pipeline process stopped (exit code {code})")
+            return
+
         if code != 0:
             update_run(run_id, {"status": "error", "error": f"Exited with {code}"})
             add_log(run_id, f"Pipeline failed with exit code {code}")
+            RUNS_TOTAL.labels("error").inc()
             return
 
-        # SUCCESS → load JSON
-        final_json = load_latest_result_json()
-        if final_json:
-            runs[run_id]["result"] = final_json
+        # SUCCESS → load this run's JSON
+        finished = [e for e in events if e.get("event") == "run"]
+        if finished:
+            runs[run_id]["result"] = load_result_json(finished[-1]["output_file"])
             add_log(run_id, "Final JSON loaded")
 
         update_node(run_id, "json-output", "success")
         update_run(run_id, {"status": "success"})
         add_log(run_id, "Pipeline complete")
+        RUNS_TOTAL.labels("success").inc()
 
     except Exception as e:
         update_run(run_id, {"status": "error", "error": str(e)})
         add_log(run_id, f"Pipeline crashed: {e}")
         print(f"[pipeline error] {e}")
+        RUNS_TOTAL.labels("error").inc()
+
+    finally:
+        run_processes.pop(run_id, None)
+        events_file.unlink(missing_ok=True)
+        RUN_SECONDS.observe(time.perf_counter() - start)
+
+async def run_in_process(run_id: str, audio_path: str, prompt: Optional[str]):
+    start = time.perf_counter()
+    try:
+        add_log(run_id, "Pipeline started (in-process)")
+        update_node(run_id, "clap", "running")
+        update_node(run_id, "whisper", "running")
+
+        result = await pipeline.process_audio_async(audio_path, prompt)
+        if runs[run_id]["status"] == "cancelled":
+            return  # finished just as /cancel came in; it counted the run already
+
+        runs[run_id]["result"] = result
+        for node in ("clap", "whisper", "llm-layer", "mellow", "json-output"):
+            update_node(run_id, node, "success")
+
+        update_run(run_id, {"status": "success"})
+        add_log(run_id, "Pipeline complete")
+        RUNS_TOTAL.labels("success").inc()
+
+    except asyncio.CancelledError:
+        # /cancel already recorded it; otherwise the server is shutting down
+        if runs.get(run_id, {}).get("status") == "running":
+            update_run(run_id, {"status": "cancelled"})
+            add_log(run_id, "Pipeline cancelled")
+            RUNS_TOTAL.labels("cancelled").inc()
+        raise
+
+    except Exception as e:
+        update_run(run_id, {"status": "error", "error": str(e)})
+        add_log(run_id, f"Pipeline crashed: {e}")
+        print(f"[pipeline error] {e}")
+        RUNS_TOTAL.labels("error").inc()
+
+    finally:
+        RUN_SECONDS.observe(time.perf_counter() - start)
+        run_tasks.pop(run_id, None)
 
 # ---------------------------------------------------------
 # /run endpoint
 # ---------------------------------------------------------
+def on_run_done(run_id: str, future: Future):
+    run_futures.pop(run_id, None)
+    run = runs.get(run_id)
+    if future.cancelled() and run and run["status"] == "running":
+        # still queued at shutdown
+        update_run(run_id, {"status": "cancelled"})
+        add_log(run_id, "Cancelled before it started")
+        RUNS_TOTAL.labels("cancelled").inc()
+
+
 @app.post("/run")
 async def start_pipeline(
-    background: BackgroundTasks,
     file: UploadFile = File(...),
     prompt: Optional[str] = Form(None),
 ):
@@ -214,6 +376,7 @@ async def start_pipeline(
 
     tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
     shutil.copyfileobj(file.file, tmp)
+    tmp.close()
     audio_path = tmp.name
 
     run = create_run(audio_path, prompt)
@@ -226,7 +389,24 @@ async def start_pipeline(
 
     update_run(run["runId"], {"status": "running"})
 
-    background.add_task(python_pipeline_worker, run["runId"], audio_path, prompt)
+    if pipeline is not None:
+        if len(run_tasks) >= Config.EXECUTOR_CONFIG["server_runs"]["max_in_flight"]:
+            runs.pop(run["runId"], None)
+            os.unlink(audio_path)
+            RUNS_TOTAL.labels("rejected").inc()
+            raise HTTPException(status_code=503, detail="Server busy: too many runs in flight")
+        run_tasks[run["runId"]] = asyncio.create_task(run_in_process(run["runId"], audio_path, prompt))
+        return {"runId": run["runId"], "status": "running"}
+
+    try:
+        future = RUN_POOL.submit("pipeline", python_pipeline_worker, run["runId"], audio_path, prompt, timeout=0)
+    except QueueFull:
+        runs.pop(run["runId"], None)
+        os.unlink(audio_path)
+        RUNS_TOTAL.labels("rejected").inc()
+        raise HTTPException(status_code=503, detail="Server busy: too many runs queued")
+    run_futures[run["runId"]] = future
+    future.add_done_callback(lambda f, run_id=run["runId"]: on_run_done(run_id, f))
 
     return {"runId": run["runId"], "status": "running"}
 
@@ -276,6 +456,17 @@ async def cancel_run(run_id: str):
 
     update_run(run_id, {"status": "cancelled"})
     add_log(run_id, "Pipeline cancelled")
+    future = run_futures.get(run_id)
+    if future is not None and future.cancel():
+        add_log(run_id, "Removed from the queue")
+    task = run_tasks.get(run_id)
+    if task is not None:
+        task.cancel()  # stops at the next stage boundary
+    process = run_processes.get(run_id)
+    if process is not None:
+        process.kill()
+        add_log(run_id, "Pipeline process killed")
+    RUNS_TOTAL.labels("cancelled").inc()
 
     for node, st in run["nodes"].items():
         if st == "running":
@@ -284,6 +475,14 @@ async def cancel_run(run_id: str):
     return {"message": "Cancelled", "runId": run_id}
 
 
+# ---------------------------------------------------------
+# /metrics (Prometheus text format)
+# ---------------------------------------------------------
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+
 # ---------------------------------------------------------
 # /clear old runs
 # ---------------------------------------------------------
@@ -0,0 +1,65 @@
+"""Parity of the traced CLAP audio encoder (CLAP_CONFIG["backend"] = "torchscript") with eager CLAP"""
+import sys
+
+import pytest
+
+import config.paths
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchlibrosa")
+# clap_module directly: the laion_clap package fetches three tokenizers from the hub on import
+sys.path.insert(0, str(config.paths.CLAP_PATH / "laion_clap"))
+from clap_module.htsat import HTSAT_Swin_Transformer
+from clap_module.model import (CLAPAudioCfp, AudioEncoderForExport, trace_audio_encoder, audio_encoder_fingerprint,
+                               save_audio_encoder, load_audio_encoder)
+
+AUDIO_LENGTH = 16000
+
+
+def random_audio_side():
+    """A tiny random-weight HTSAT (same code path as HTSAT-tiny, 64x64 spectrogram) + audio_projection"""
+    torch.manual_seed(0)
+    cfg = CLAPAudioCfp(audio_length=1024, clip_samples=AUDIO_LENGTH, mel_bins=16, sample_rate=16000, window_size=256,
+                       hop_size=160, fmin=50, fmax=8000, class_num=10, model_type="HTSAT", model_name="tiny")
+    model = torch.nn.Module()
+    model.audio_branch = HTSAT_Swin_Transformer(spec_size=64, num_classes=cfg.class_num, embed_dim=16, depths=[1, 1, 1],
+                                                num_heads=[1, 2, 4], window_size=4, config=cfg)
+    model.audio_projection = torch.nn.Sequential(
+        torch.nn.Linear(model.audio_branch.num_features, 32),
+        torch.nn.ReLU(),
+        torch.nn.Linear(32, 32),
+    )
+    return model.eval()
+
+
+def test_traced_audio_encoder_matches_eager(tmp_path):
+    model = random_audio_side()
+    eager = AudioEncoderForExport(model).eval()
+
+    path = tmp_path / "clap_audio.ts"
+    save_audio_encoder(trace_audio_encoder(model, batch_size=2, audio_length=AUDIO_LENGTH), str(path), model)
+    traced = load_audio_encoder(str(path), model)
+
+    # batch sizes other than the traced one must work too
+    for batch_size in (1, 3):
+        waveform = torch.randn(batch_size, AUDIO_LENGTH) * 0.1
+        with torch.no_grad():
+            expected = eager(waveform)
+            actual = traced(waveform)
+        assert actual.shape == (batch_size, 32)
+        assert torch.allclose(actual, expected, atol=1e-5)
+
+
+def test_stale_export_is_rejected(tmp_path):
+    model = random_audio_side()
+    traced = trace_audio_encoder(model, batch_size=1, audio_length=AUDIO_LENGTH)
+    assert audio_encoder_fingerprint(model) == audio_encoder_fingerprint(random_audio_side())
+    assert audio_encoder_fingerprint(model).startswith(f"torch-{torch.__version__}-")
+
+    # traced before the export was fingerprinted, or by other encoder code / torch
+    unstamped, other = tmp_path / "unstamped.ts", tmp_path / "other.ts"
+    torch.jit.save(traced, str(unstamped))
+    torch.jit.save(traced, str(other), _extra_files={"fingerprint": "torch-1.0-0123456789abcdef"})
+    for path in (unstamped, other):
+        with pytest.raises(ValueError, match="stale"):
+            load_audio_encoder(str(path), model)
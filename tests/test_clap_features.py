@@ -0,0 +1,56 @@
+"""CLAP input features: get_audio_features_batch must build the same model input as per-clip get_audio_features"""
+import os
+import sys
+
+import pytest
+
+import config.paths
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+pytest.importorskip("torchvision")
+sys.path.insert(0, str(config.paths.CLAP_PATH / "laion_clap"))
+# training.data loads three tokenizers at import: use the local hub cache, never the network
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+try:
+    from training.data import get_audio_features, get_audio_features_batch
+except (ImportError, OSError) as e:
+    pytest.skip(f"laion_clap training.data unavailable: {e}", allow_module_level=True)
+
+MAX_LEN = 4800
+AUDIO_CFG = dict(sample_rate=16000, window_size=256, hop_size=160, mel_bins=16, fmin=50, fmax=8000)
+LENGTHS = {"short": 1100, "exact": MAX_LEN, "long": 7000}
+
+
+def clips():
+    g = torch.Generator().manual_seed(0)
+    return {name: torch.rand(n, generator=g) * 2 - 1 for name, n in LENGTHS.items()}
+
+
+def assert_is_crop(waveform, clip):
+    """waveform is a max_len window of clip (the samples are random, so the first one locates it)"""
+    start = int((clip == waveform[0]).nonzero()[0])
+    assert torch.equal(waveform, clip[start:start + MAX_LEN])
+
+
+@pytest.mark.parametrize("data_truncating", ["rand_trunc", "fusion"])
+@pytest.mark.parametrize("data_filling", ["repeatpad", "pad", "repeat"])
+def test_batch_features_match_per_clip(data_filling, data_truncating):
+    audio = clips()
+    np.random.seed(0)  # fusion chunk choice for the long clip, drawn by the same get_audio_features call
+    batch = get_audio_features_batch(list(audio.values()), MAX_LEN, data_truncating, data_filling, AUDIO_CFG)
+
+    assert batch["waveform"].shape == (len(audio), MAX_LEN)
+    assert batch["longer"].shape == (len(audio), 1)
+    for i, (name, clip) in enumerate(audio.items()):
+        np.random.seed(0)
+        single = get_audio_features({}, clip, MAX_LEN, data_truncating, data_filling, AUDIO_CFG)
+        assert bool(batch["longer"][i]) == bool(single["longer"]), name
+        if name == "long":
+            # both crop at random, with different generators
+            assert_is_crop(batch["waveform"][i], clip)
+        else:
+            assert torch.equal(batch["waveform"][i], single["waveform"]), name
+        if data_truncating == "fusion":
+            assert torch.allclose(batch["mel_fusion"][i], single["mel_fusion"], atol=1e-4), name
@@ -0,0 +1,102 @@
+"""StageExecutor: bounded queues push back on submit, shutdown drains, a forked child gets working threads"""
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from core.executor import QueueFull, StageExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = StageExecutor({"work": {"workers": 1, "queue": 1}}, name="test")
+    yield executor
+    executor.shutdown(cancel_pending=True)
+
+
+def occupy(executor):
+    """Park the single worker on a task and fill the one queue slot; returns (event freeing the worker, running, queued)"""
+    started, release = threading.Event(), threading.Event()
+    running = executor.submit("work", lambda: (started.set(), release.wait(5))[1])
+    assert started.wait(5)
+    queued = executor.submit("work", lambda: "queued", timeout=0)
+    return release, running, queued
+
+
+def test_full_queue_raises_queue_full(executor):
+    release, _, _ = occupy(executor)
+    with pytest.raises(QueueFull):
+        executor.submit("work", lambda: None, timeout=0)
+
+    start = time.perf_counter()
+    with pytest.raises(QueueFull):
+        executor.submit("work", lambda: None, timeout=0.2)
+    assert time.perf_counter() - start >= 0.2
+    release.set()
+
+
+def test_full_queue_blocks_submit_until_there_is_room(executor):
+    release, _, _ = occupy(executor)
+    submitted = threading.Event()
+    futures = []
+
+    def submit():
+        futures.append(executor.submit("work", lambda: "late"))
+        submitted.set()
+
+    threading.Thread(target=submit, daemon=True).start()
+    assert not submitted.wait(0.2)  # blocked behind the full queue
+
+    release.set()
+    assert submitted.wait(5)
+    assert futures[0].result(5) == "late"
+
+
+def test_shutdown_drains_queued_and_running_work():
+    executor = StageExecutor({"work": {"workers": 2, "queue": 0}}, name="test")
+    futures = [executor.submit("work", lambda i=i: (time.sleep(0.01), i)[1]) for i in range(20)]
+    executor.shutdown(wait=True)
+
+    assert [f.result(0) for f in futures] == list(range(20))
+    assert executor.stats()["work"]["completed"] == 20
+    with pytest.raises(RuntimeError):
+        executor.submit("work", lambda: None)
+
+
+def test_shutdown_cancel_pending_finishes_running_work(executor):
+    release, running, queued = occupy(executor)
+    threading.Timer(0.1, release.set).start()
+    executor.shutdown(wait=True, cancel_pending=True)
+
+    assert running.result(0) is True
+    assert queued.cancelled()
+    assert executor.stats()["work"] == {"workers": 1, "queued": 0, "running": 0, "completed": 1}
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_reusable_in_forked_child(executor):
+    assert executor.submit("work", os.getpid).result(5) == os.getpid()  # parent threads are running
+
+    pid = os.fork()
+    if pid == 0:
+        # the child inherits the executor but none of its threads
+        code = 1
+        try:
+            futures = [executor.submit("work", os.getpid) for _ in range(2)]
+            if all(f.result(5) == os.getpid() for f in futures) and executor.stats()["work"]["completed"] == 2:
+                code = 0
+        finally:
+            os._exit(code)
+    deadline = time.monotonic() + 15
+    while (done := os.waitpid(pid, os.WNOHANG))[0] == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    status = done[1]
+    if done[0] == 0:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        pytest.fail("executor hung in the forked child")
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+    assert executor.submit("work", os.getpid).result(5) == os.getpid()  # the parent's copy is untouched
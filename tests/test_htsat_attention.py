@@ -0,0 +1,42 @@
+"""HTSAT WindowAttention: the fused SDPA path (need_weights=False) matches the explicit attention map, MELLOW and CLAP"""
+import sys
+
+import pytest
+
+import config.paths
+
+config.paths.add_model_paths()  # external_models/Mellow
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchlibrosa")
+sys.path.insert(0, str(config.paths.CLAP_PATH / "laion_clap"))  # clap_module without the laion_clap package import
+from clap_module.htsat import WindowAttention as ClapWindowAttention
+from mellow.model.htsat import WindowAttention as MellowWindowAttention
+
+WINDOW = (4, 4)
+N = WINDOW[0] * WINDOW[1]
+
+
+def shift_mask(windows: int) -> torch.Tensor:
+    """(nW, N, N) 0/-100 mask like the shifted-window mask: blocks of tokens that may not attend to each other"""
+    g = torch.Generator().manual_seed(2)
+    groups = torch.randint(0, 2, (windows, N), generator=g)
+    return torch.where(groups.unsqueeze(2) == groups.unsqueeze(1), 0.0, -100.0)
+
+
+@pytest.mark.parametrize("attention", [MellowWindowAttention, ClapWindowAttention], ids=["mellow", "clap"])
+@pytest.mark.parametrize("qk_scale", [None, 0.1])
+@pytest.mark.parametrize("windows", [None, 3])
+def test_fused_attention_matches_explicit(attention, qk_scale, windows):
+    torch.manual_seed(0)
+    layer = attention(dim=32, window_size=WINDOW, num_heads=4, qk_scale=qk_scale).eval()
+    with torch.no_grad():
+        layer.relative_position_bias_table.normal_(std=0.5)  # a bias that matters
+    x = torch.randn(2 * (windows or 1), N, 32)
+    mask = shift_mask(windows) if windows else None
+
+    with torch.no_grad():
+        explicit, attn = layer(x, mask, need_weights=True)
+        fused, none = layer(x, mask, need_weights=False)
+
+    assert attn is not None and none is None
+    torch.testing.assert_close(fused, explicit, rtol=1e-5, atol=5e-6)
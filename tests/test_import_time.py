@@ -0,0 +1,42 @@
+"""Import-time budget: CLI entry points must not pull in models or touch anything on import (python -X importtime)"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# cumulative import time of each entry module, measured in a fresh interpreter
+IMPORT_BUDGET_US = 300_000
+HEAVY_MODULES = ["torch", "transformers", "laion_clap", "mellow", "groq", "librosa", "numpy"]
+
+
+def import_profile(module: str):
+    """(cumulative microseconds of `module`, modules loaded, stdout) from `python -X importtime -c "import module"`"""
+    code = f"import sys, {module}; print('\\n'.join(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name == module:  # top-level entry, not indented
+            cumulative = int(cumulative_us)
+    return cumulative, set(proc.stdout.split()), proc.stdout
+
+
+@pytest.mark.parametrize("module", ["main", "config", "config.settings", "core.utils"])
+def test_entry_module_import_budget(module):
+    cumulative, loaded, _ = import_profile(module)
+    assert cumulative is not None, f"{module} not found in -X importtime output"
+    assert cumulative < IMPORT_BUDGET_US, f"import {module} took {cumulative / 1000:.0f} ms (budget {IMPORT_BUDGET_US / 1000:.0f} ms)"
+    heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+    assert not heavy, f"import {module} loads {heavy}"
+
+
+def test_config_import_has_no_side_effects():
+    code = "import sys; before = list(sys.path); import config, config.paths, config.settings; assert sys.path == before"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout == ""
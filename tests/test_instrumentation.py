@@ -0,0 +1,35 @@
+"""StageRecorder spans: CPU time is the span thread's own, not the whole process's"""
+import threading
+import time
+
+from core.instrumentation import StageRecorder
+
+
+def spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_span_cpu_excludes_other_threads():
+    recorder, events = StageRecorder(listeners=[]), []
+    recorder.listeners.append(events.append)
+    busy = threading.Thread(target=spin, args=(0.4,))
+    busy.start()
+    with recorder.span("llm_request"):
+        time.sleep(0.3)  # waits while another thread burns CPU
+    busy.join()
+    recorder.wrap("clap_embed", spin)(0.2)
+
+    spans = {e["stage"]: e for e in events}
+    assert spans["llm_request"]["wall_ms"] >= 300
+    assert spans["llm_request"]["cpu_ms"] < 100
+    assert spans["clap_embed"]["cpu_ms"] > 100
+
+
+def test_span_without_cpu():
+    recorder = StageRecorder()
+    with recorder.span("whisper_request", cpu=False):
+        spin(0.05)
+    assert recorder.spans[0]["cpu_ms"] is None
+    assert recorder.summary()["whisper_request"]["cpu_ms"] is None
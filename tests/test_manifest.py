@@ -0,0 +1,134 @@
+"""Batch manifest: done files are skipped, config or content changes reprocess, a crash mid-write leaves no partial JSON"""
+import json
+import os
+
+import pytest
+
+from config.settings import Config
+from core.manifest import BatchManifest, config_version
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(b"RIFF" + bytes(64))
+    return path
+
+
+@pytest.fixture
+def manifest_path(tmp_path, monkeypatch):
+    path = tmp_path / "manifest.sqlite"
+    monkeypatch.setitem(Config.MANIFEST_CONFIG, "path", path)
+    monkeypatch.setitem(Config.MANIFEST_CONFIG, "enabled", True)
+    return path
+
+
+def mark_done(manifest, audio, tmp_path):
+    output_file = tmp_path / "clip_result.json"
+    output_file.write_text("{}", encoding="utf-8")
+    manifest.mark_running(audio)
+    manifest.mark_done(audio, output_file, 1.0)
+    return output_file
+
+
+def test_done_file_is_skipped(audio, tmp_path, manifest_path):
+    with BatchManifest(manifest_path, "v1") as manifest:
+        assert manifest.pending([str(audio)]) == [str(audio)]
+        output_file = mark_done(manifest, audio, tmp_path)
+
+    with BatchManifest(manifest_path, "v1") as manifest:
+        assert manifest.pending([str(audio)]) == []
+        assert manifest.completed(audio)["output_file"] == str(output_file)
+        assert manifest.summary()["done"] == 1
+
+        output_file.unlink()  # a result that is gone is not done
+        assert manifest.pending([str(audio)]) == [str(audio)]
+
+
+def test_config_change_reprocesses(audio, tmp_path, manifest_path, monkeypatch):
+    version = config_version()
+    with BatchManifest(manifest_path, version) as manifest:
+        mark_done(manifest, audio, tmp_path)
+
+    monkeypatch.setitem(Config.VAD_CONFIG, "min_spread_db", Config.VAD_CONFIG["min_spread_db"] + 1)
+    assert config_version() != version
+    assert config_version("another prompt") != config_version()
+    with BatchManifest(manifest_path, config_version()) as manifest:
+        assert manifest.pending([str(audio)]) == [str(audio)]
+
+
+def test_content_change_reprocesses(audio, tmp_path, manifest_path):
+    with BatchManifest(manifest_path, "v1") as manifest:
+        mark_done(manifest, audio, tmp_path)
+        audio.write_bytes(b"RIFF" + bytes(range(128)))
+        assert manifest.pending([str(audio)]) == [str(audio)]
+
+    audio.write_bytes(b"RIFF" + bytes(64))  # back to the recorded content
+    with BatchManifest(manifest_path, "v1") as manifest:
+        assert manifest.pending([str(audio)]) == []
+
+
+@pytest.fixture
+def pipeline_cls():
+    pipeline = pytest.importorskip("core.pipeline")
+
+    class FakePipeline(pipeline.LTUASPipeline):
+        """process_batch bookkeeping around a process_audio that only saves its output"""
+
+        def __init__(self):
+            self.processed = []
+
+        def process_audio(self, audio_path, user_prompt=None, output_dir=None):
+            self.processed.append(audio_path)
+            output_file = self._save_output({"audio": audio_path, "words": ["x"] * 1000}, audio_path, output_dir)
+            return {
+                "mellow_inf": {"success": True},
+                "metadata": {"output_file": str(output_file), "processing_time_seconds": 0.1},
+            }
+
+    return FakePipeline
+
+
+def test_batch_skips_done_files(audio, tmp_path, manifest_path, pipeline_cls):
+    out = str(tmp_path / "out")
+    first = pipeline_cls()
+    first.process_batch([str(audio)], output_dir=out)
+    assert first.processed == [str(audio)]
+
+    second = pipeline_cls()
+    results = second.process_batch([str(audio)], output_dir=out)
+    assert second.processed == []
+    assert results[0]["audio"] == str(audio)  # the saved JSON comes back instead
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_process_killed_mid_write_leaves_no_partial_json(audio, tmp_path, manifest_path, pipeline_cls):
+    out = tmp_path / "out"
+    pid = os.fork()
+    if pid == 0:
+        # child: the process dies halfway through writing the result
+        def dump_and_die(obj, f, **kwargs):
+            f.write(json.dumps(obj)[:100])
+            f.flush()
+            os._exit(1)
+
+        json.dump = dump_and_die
+        try:
+            pipeline_cls().process_batch([str(audio)], output_dir=str(out))
+        finally:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 1
+
+    assert list(out.glob("*.json")) == []  # only the abandoned temp file
+    assert len(list(out.glob("*.json.tmp"))) == 1
+    with BatchManifest(manifest_path, config_version()) as manifest:
+        assert manifest.lookup(audio)["status"] == "running"
+        assert manifest.pending([str(audio)]) == [str(audio)]
+
+    rerun = pipeline_cls()
+    rerun.process_batch([str(audio)], output_dir=str(out))
+    assert rerun.processed == [str(audio)]
+    saved = list(out.glob("*.json"))
+    assert len(saved) == 1
+    assert json.load(open(saved[0], encoding="utf-8"))["audio"] == str(audio)
@@ -0,0 +1,220 @@
+"""MELLOW decoding on a tiny random Llama: prompt lookup, padded and multi-prompt batches, option scoring"""
+from types import SimpleNamespace
+
+import pytest
+
+import config.paths
+
+config.paths.add_model_paths()  # external_models/Mellow
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("torchaudio")
+from mellow.model.decoder import DecoderModel
+from mellow.wrapper import MellowWrapper
+
+VOCAB = 64
+MAX_LEN = 40
+GREEDY = dict(top_p=0.7, temperature=0.6)  # top-p filtering then argmax: deterministic
+
+
+def tiny_mellow(stop_id: int = VOCAB - 1) -> MellowWrapper:
+    """MellowWrapper around a 2-layer random-weight Llama decoder (SmolLM2 family), no checkpoint or tokenizer"""
+    torch.manual_seed(0)
+    cfg = transformers.LlamaConfig(vocab_size=VOCAB, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                   num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256,
+                                   initializer_range=0.2)  # sharp enough attention that positions and masks matter
+    decoder = DecoderModel.__new__(DecoderModel)
+    torch.nn.Module.__init__(decoder)
+    decoder.text_decoder = "smollm2"
+    decoder.prefix_length = 0
+    decoder.lm = transformers.LlamaForCausalLM(cfg).eval()
+
+    def encode(text):
+        """'<|endoftext|>' is the stop token, any other text is space-separated token ids ("5 6 7")"""
+        return [stop_id] if text == "<|endoftext|>" else [int(t) for t in text.split()]
+
+    def preprocess_text(prompts, padding=None):
+        """The "longest" layout: prompts left-padded to the longest one, pads masked"""
+        ids = [encode(p) for p in prompts]
+        longest = max(len(i) for i in ids)
+        return {
+            "input_ids": torch.tensor([[0] * (longest - len(i)) + i for i in ids]),
+            "attention_mask": torch.tensor([[0] * (longest - len(i)) + [1] * len(i) for i in ids]),
+        }
+
+    mellow = MellowWrapper.__new__(MellowWrapper)
+    mellow.model = SimpleNamespace(caption_decoder=decoder, eval=lambda: None,
+                                   generate_prefix_from_embeddings=decoder.generate_prefix_inference)
+    mellow.tokenizer = SimpleNamespace(encode=encode, pad_token_id=0)
+    mellow.preprocess_text = preprocess_text
+    mellow._decode_tokens = lambda tokens: tokens.tolist() if torch.is_tensor(tokens) else tokens
+    return mellow
+
+
+def audio_embed(seed: int, frames: int = 16) -> torch.Tensor:
+    """encode_audio-shaped output (1, 1 + frames, d); the decoder pools the frames by 8"""
+    return torch.randn(1, 1 + frames, 32, generator=torch.Generator().manual_seed(seed))
+
+
+def prefix(mellow, prompt_ids, audio_len=12, seed=1):
+    """[random "audio" embeddings, prompt token embeddings] as one (1, L, d) prefix"""
+    g = torch.Generator().manual_seed(seed)
+    audio = torch.randn(1, audio_len, 32, generator=g)
+    with torch.no_grad():
+        text = mellow.model.caption_decoder.embed_tokens(torch.tensor([prompt_ids]))
+    return torch.cat((audio, text), dim=1)
+
+
+def plain(mellow, embed, attention_mask=None):
+    return mellow._generate_batch(embed=embed, entry_length=MAX_LEN, attention_mask=attention_mask, **GREEDY)
+
+
+def speculative(mellow, embed, prompt_ids):
+    return mellow._generate_lookup(embed, prompt_ids, entry_length=MAX_LEN, **GREEDY)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lookup_matches_plain_greedy(seed):
+    mellow = tiny_mellow()
+    prompt_ids = torch.randint(0, VOCAB - 1, (20,), generator=torch.Generator().manual_seed(seed)).tolist()
+    embed = prefix(mellow, prompt_ids, seed=seed)
+
+    expected = plain(mellow, embed)[0]
+    tokens, _ = speculative(mellow, embed, prompt_ids)
+    assert tokens == expected
+
+
+def test_lookup_accepts_drafts_and_stays_identical():
+    mellow = tiny_mellow()
+    prompt_ids = list(range(20))
+    embed = prefix(mellow, prompt_ids)
+    expected = plain(mellow, embed)[0]
+
+    # the answer is in the prompt: drafts are accepted, fewer passes than tokens
+    embed = prefix(mellow, prompt_ids + expected)
+    expected = plain(mellow, embed)[0]
+    tokens, forward_passes = speculative(mellow, embed, prompt_ids + expected)
+    assert tokens == expected
+    assert forward_passes < len(tokens)
+
+
+def test_lookup_stops_inside_an_accepted_draft():
+    mellow = tiny_mellow()
+    prompt_ids = list(range(20))
+    free_run = plain(mellow, prefix(mellow, prompt_ids))[0]
+    context = prompt_ids + free_run
+    continuation = plain(mellow, prefix(mellow, context))[0]
+    stop_id = continuation[len(continuation) // 2]
+
+    mellow = tiny_mellow(stop_id=stop_id)
+    embed = prefix(mellow, context)
+    expected = plain(mellow, embed)[0]
+    tokens, forward_passes = speculative(mellow, embed, context)
+    assert tokens == expected[:expected.index(stop_id) + 1]
+    assert forward_passes < len(tokens)
+
+
+def test_padded_batch_rows_match_unpadded_lookup():
+    """Left-padded batch decoding (preallocated buffers + mask) gives each row the tokens it gets alone"""
+    mellow = tiny_mellow()
+    prompts = [list(range(5, 25)), list(range(30, 38))]
+    embeds = [prefix(mellow, ids, seed=i) for i, ids in enumerate(prompts)]
+    longest = max(e.shape[1] for e in embeds)
+    batch = torch.cat([torch.nn.functional.pad(e, (0, 0, longest - e.shape[1], 0)) for e in embeds])
+    mask = torch.stack([torch.arange(longest) >= longest - e.shape[1] for e in embeds]).long()
+
+    rows = plain(mellow, batch, attention_mask=mask)
+    for row, embed, ids in zip(rows, embeds, prompts):
+        tokens, _ = speculative(mellow, embed, ids)
+        assert row == tokens
+
+
+def test_decode_stats_are_returned_per_call():
+    mellow = tiny_mellow()
+    audio, prompt = audio_embed(0), " ".join(str(t) for t in range(20))
+    decode = lambda **kwargs: mellow.generate_from_audio_embeddings(audio, audio, [prompt], max_len=MAX_LEN, return_stats=True,
+                                                                   **GREEDY, **kwargs)
+
+    preds, stats = decode()
+    lookup_preds, lookup_stats = decode(prompt_lookup=True)
+    assert lookup_preds == preds
+    assert stats == {"forward_passes": len(preds[0]), "tokens": len(preds[0])}
+    assert lookup_stats["tokens"] == stats["tokens"]
+    assert 1 <= lookup_stats["forward_passes"] <= stats["forward_passes"]
+    assert not hasattr(mellow, "last_decode_stats")  # nothing shared between concurrent decodes
+
+
+def alone(mellow, audio1, audio2, prompt):
+    """_generate_batch on one prompt's full prefix, no cache sharing"""
+    text = mellow.preprocess_text([prompt])
+    embed = mellow.model.generate_prefix_from_embeddings(audio1, audio2, text)
+    return plain(mellow, embed)[0]
+
+
+@pytest.mark.parametrize("lengths", [(6, 6, 6), (20, 4, 11)], ids=["same-length", "padded"])
+def test_multi_prompt_rows_match_each_prompt_alone(lengths):
+    """generate_multi: the shared audio prefix runs once, its KV cache is repeated per prompt (_repeat_cache)"""
+    mellow = tiny_mellow()
+    audio1, audio2 = audio_embed(1), audio_embed(2)
+    g = torch.Generator().manual_seed(sum(lengths))
+    prompts = [" ".join(str(t) for t in torch.randint(1, VOCAB - 1, (n,), generator=g).tolist()) for n in lengths]
+
+    rows = mellow.generate_multi_from_audio_embeddings(audio1, audio2, prompts, max_len=MAX_LEN, **GREEDY)
+    assert len(rows) == len(prompts)
+    for row, prompt in zip(rows, prompts):
+        expected = alone(mellow, audio1, audio2, prompt)
+        assert row[:len(expected)] == expected  # a row that stopped early keeps decoding until the batch stops
+
+
+OPTIONS = ["3", "4 5 6 7", "8 9"]  # 2, 5 and 3 tokens with the stop token
+
+
+def scorer(mellow):
+    """score_options on fixed audio embeddings: "a.wav" and "b.wav" are two clips, calibration uses a third"""
+    clips = {"a.wav": audio_embed(1), "b.wav": audio_embed(2)}
+    mellow.encode_audio = lambda paths, *args: clips[paths[0]]
+    mellow._silence_embed = audio_embed(9)
+    return mellow
+
+
+def option_log_likelihood(mellow, audio1, audio2, prompt, option):
+    """Sum of log p(token) over the option and its stop token, one option at a time"""
+    decoder = mellow.model.caption_decoder
+    ids = mellow.tokenizer.encode(option) + mellow.tokenizer.encode("<|endoftext|>")
+    embed = decoder.generate_prefix_inference(audio1, audio2, mellow.preprocess_text([prompt]))
+    with torch.no_grad():
+        embed = torch.cat((embed, decoder.embed_tokens(torch.tensor([ids]))), dim=1)
+        logprobs = torch.log_softmax(decoder.lm(inputs_embeds=embed).logits[0, -len(ids) - 1:-1], dim=-1)
+    return logprobs[torch.arange(len(ids)), ids].sum().item()
+
+
+def test_score_options_probabilities():
+    mellow = scorer(tiny_mellow())
+    result = mellow.score_options("a.wav", "10 11 12", OPTIONS, audio2="b.wav", normalize=False, calibrate=False)
+    expected = [option_log_likelihood(mellow, audio_embed(1), audio_embed(2), "10 11 12", o) for o in OPTIONS]
+
+    assert result["log_likelihood"] == pytest.approx(expected, abs=1e-4)
+    assert sum(result["probabilities"]) == pytest.approx(1.0)
+    assert result["probabilities"] == pytest.approx(torch.softmax(torch.tensor(expected), 0).tolist(), abs=1e-5)
+    assert result["best"] == OPTIONS[max(range(len(OPTIONS)), key=result["probabilities"].__getitem__)]
+
+
+def test_score_options_normalizes_by_option_length():
+    """normalize=True ranks by mean per-token log-likelihood (stop token included), calibrate by the silence score"""
+    mellow = scorer(tiny_mellow())
+    lengths = torch.tensor([len(o.split()) + 1 for o in OPTIONS], dtype=torch.float)
+    audio = [option_log_likelihood(mellow, audio_embed(1), audio_embed(1), "10 11", o) for o in OPTIONS]
+    silence = [option_log_likelihood(mellow, audio_embed(9), audio_embed(9), "10 11", o) for o in OPTIONS]
+
+    normalized = mellow.score_options("a.wav", "10 11", OPTIONS, normalize=True, calibrate=False)
+    assert normalized["log_likelihood"] == pytest.approx(audio, abs=1e-4)
+    assert normalized["probabilities"] == pytest.approx(torch.softmax(torch.tensor(audio) / lengths, 0).tolist(),
+                                                        abs=1e-5)
+    summed = mellow.score_options("a.wav", "10 11", OPTIONS, normalize=False, calibrate=False)
+    assert summed["probabilities"] != pytest.approx(normalized["probabilities"], abs=1e-3)
+
+    calibrated = mellow.score_options("a.wav", "10 11", OPTIONS, normalize=True, calibrate=True)
+    scores = (torch.tensor(audio) - torch.tensor(silence)) / lengths
+    assert calibrated["log_likelihood"] == pytest.approx(audio, abs=1e-4)
+    assert calibrated["probabilities"] == pytest.approx(torch.softmax(scores, 0).tolist(), abs=1e-5)
+    assert calibrated["best"] == OPTIONS[int(scores.argmax())]
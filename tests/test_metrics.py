@@ -0,0 +1,59 @@
+"""Prometheus text rendering and lock-free updates from many threads (core/metrics.py)"""
+import threading
+
+from core.metrics import MetricsRegistry
+
+
+def sample_lines(text: str):
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if not line.startswith("#")}
+
+
+def test_render_counter_and_histogram():
+    metrics = MetricsRegistry()
+    runs = metrics.counter("ltuas_runs_total", "Runs by outcome", ["status"])
+    seconds = metrics.histogram("ltuas_stage_seconds", "Stage wall time", ["stage"], buckets=[0.1, 1, 2.5])
+    runs.labels("success").inc()
+    runs.labels("success").inc(2)
+    runs.labels("error").inc()
+    for value in (0.05, 0.1, 0.7, 3.0):
+        seconds.labels("clap_embed").observe(value)
+
+    text = metrics.render()
+    assert "# HELP ltuas_runs_total Runs by outcome\n# TYPE ltuas_runs_total counter\n" in text
+    assert "# TYPE ltuas_stage_seconds histogram\n" in text
+    assert sample_lines(text) == {
+        'ltuas_runs_total{status="success"}': 3,
+        'ltuas_runs_total{status="error"}': 1,
+        'ltuas_stage_seconds_bucket{stage="clap_embed",le="0.1"}': 2,  # le is inclusive
+        'ltuas_stage_seconds_bucket{stage="clap_embed",le="1"}': 3,
+        'ltuas_stage_seconds_bucket{stage="clap_embed",le="2.5"}': 3,
+        'ltuas_stage_seconds_bucket{stage="clap_embed",le="+Inf"}': 4,
+        'ltuas_stage_seconds_count{stage="clap_embed"}': 4,
+        'ltuas_stage_seconds_sum{stage="clap_embed"}': 3.85,
+    }
+
+
+def test_updates_from_many_threads_are_all_counted():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("ltuas_events_total", "Events", ["kind"])
+    histogram = metrics.histogram("ltuas_latency_seconds", "Latency", buckets=[1])
+    start = threading.Barrier(8)
+
+    def work():
+        start.wait()
+        for i in range(5000):
+            counter.labels("span").inc()
+            histogram.observe(0.5 if i % 2 else 2.0)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = sample_lines(metrics.render())
+    assert samples['ltuas_events_total{kind="span"}'] == 40000
+    assert samples['ltuas_latency_seconds_bucket{le="1"}'] == 20000
+    assert samples['ltuas_latency_seconds_bucket{le="+Inf"}'] == 40000
+    assert samples["ltuas_latency_seconds_count"] == 40000
+    assert samples["ltuas_latency_seconds_sum"] == 50000
@@ -0,0 +1,101 @@
+"""process_audio_async cancellation: no stage after the cancelled one runs, nothing is saved, stage 1 tasks are reaped"""
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+# the processor modules import laion_clap, which loads tokenizers at import: local hub cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+from config.settings import Config
+from core.executor import StageExecutor
+from core.instrumentation import StageHistogram
+from core.pipeline import LTUASPipeline
+
+
+class StubPipeline:
+    """LTUASPipeline without models; stages listed in `hang` never answer: the "whisper" and "llm" requests,
+    "clap" in its thread until the run is over"""
+
+    def __init__(self, hang):
+        self.events, self.closed = [], []
+        self.entered = asyncio.Event()  # a hanging request has started
+        self.release = threading.Event()  # set after the run: MELLOW encoding is still busy when it is cancelled
+        self.hang = hang
+
+        pipeline = object.__new__(LTUASPipeline)
+        pipeline.profile = "default"
+        pipeline.listeners = [self.events.append]
+        pipeline.stage_histogram = StageHistogram(window=16)
+        pipeline.executor = StageExecutor(Config.EXECUTOR_CONFIG["stages"], name="test")
+        pipeline.vad = None
+        pipeline.clap = pipeline.sound_tagger = SimpleNamespace(process=self.clap_process,
+                                                                generate_soft_prompt=lambda result: "rain")
+        pipeline.whisper = SimpleNamespace(prepare_upload=lambda *args: None, transcribe_async=self.transcribe_async,
+                                           generate_soft_prompt=lambda result: "")
+        pipeline.llm = SimpleNamespace(convert_to_soft_prompt_async=self.convert_to_soft_prompt_async)
+        pipeline.mellow = SimpleNamespace(encode_audio=self.encode_audio, process=pytest.fail)
+        self.pipeline = pipeline
+
+    async def request(self, name, response):
+        if name not in self.hang:
+            return response
+        self.entered.set()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await asyncio.sleep(0)  # the HTTP client closes its connection
+            self.closed.append(name)
+
+    async def transcribe_async(self, prepared):
+        return await self.request("whisper", {"has_speech": False, "skipped": True})
+
+    async def convert_to_soft_prompt_async(self, *prompts):
+        return await self.request("llm", ("rain", None, None))
+
+    def clap_process(self, *args):
+        if "clap" in self.hang:
+            self.release.wait(5)
+        return {"dominant_sound": "rain", "dominant_confidence": 0.9, "top_sounds": []}
+
+    def encode_audio(self, audio_path, reference_audio):
+        self.release.wait(5)
+        return {"clipwise": None}
+
+
+def cancel_run(stub, tmp_path):
+    """Start a run, cancel it once a hanging request has started, return the span stages it recorded"""
+    async def main():
+        audio_path = str(tmp_path / "clip.wav")
+        run = asyncio.ensure_future(stub.pipeline.process_audio_async(audio_path, output_dir=str(tmp_path)))
+        await stub.entered.wait()
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        # stage 1 tasks were cancelled and awaited before the run returned
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        assert stub.closed == sorted(stub.hang & {"whisper", "llm"})
+
+    try:
+        asyncio.run(main())
+    finally:
+        stub.release.set()
+        stub.pipeline.close()
+    return [e["stage"] for e in stub.events if e["event"] == "span"]
+
+
+def test_cancel_during_llm_request_skips_decode_and_save(tmp_path):
+    stages = cancel_run(StubPipeline(hang={"llm"}), tmp_path)
+    assert "llm_request" in stages
+    assert "mellow_decode" not in stages and "json_write" not in stages
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cancel_during_stage_1_reaps_whisper_request(tmp_path):
+    # the run waits on CLAP while the Whisper request is in flight
+    stages = cancel_run(StubPipeline(hang={"clap", "whisper"}), tmp_path)
+    assert "whisper_request" in stages
+    assert "llm_request" not in stages and "mellow_decode" not in stages
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,88 @@
+"""VADProcessor speech/silence decisions and the Whisper timestamp remap for voiced-only uploads"""
+import numpy as np
+import pytest
+
+from models.vad_processor import VADProcessor
+
+SR = 16000
+
+
+def voiced(seconds: float, level: float = 0.3, seed: int = 0) -> np.ndarray:
+    """Harmonic 150 Hz source with a slow amplitude wobble: speech-band energy, peaky spectrum"""
+    t = np.arange(int(seconds * SR)) / SR
+    wave = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 12))
+    wobble = 0.75 + 0.25 * np.sin(2 * np.pi * 3 * t)
+    return (level * wobble * wave / np.abs(wave).max()).astype(np.float32)
+
+
+def noise_floor(seconds: float, db: float = -60.0, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (10 ** (db / 20) * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def vad():
+    return VADProcessor()
+
+
+def test_digital_silence_has_no_speech(vad):
+    result = vad.process(np.zeros(5 * SR, dtype=np.float32), SR)
+    assert not result["has_speech"]
+    assert result["segments"] == []
+
+
+def test_noise_floor_only_has_no_speech(vad):
+    result = vad.process(noise_floor(5), SR)
+    assert not result["has_speech"]
+
+
+def test_steady_white_noise_has_no_speech(vad):
+    # -30 dB: above min_energy_db and flat over time, so only the spectral checks can reject it
+    result = vad.process(noise_floor(5, db=-30.0), SR)
+    assert not result["has_speech"]
+    assert result["speech_ratio"] == 0.0
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_ambience_is_mostly_not_speech(vad, seed):
+    from benchmarks.audio import SAMPLE_RATE, ambience
+
+    result = vad.process(ambience(8, np.random.default_rng([seed, 0])), SAMPLE_RATE)
+    assert result["speech_ratio"] < 0.1
+
+
+def test_continuous_speech_is_speech(vad):
+    # speech from start to finish: the low percentile is voiced too
+    result = vad.process(voiced(8) + noise_floor(8), SR)
+    assert result["has_speech"]
+    assert result["speech_ratio"] > 0.9
+
+
+def test_speech_between_pauses_is_segmented(vad):
+    audio = np.concatenate([noise_floor(2, seed=1), voiced(2) + noise_floor(2), noise_floor(2, seed=2)])
+    result = vad.process(audio, SR)
+    assert result["has_speech"]
+    assert len(result["segments"]) == 1
+    start, end = result["segments"][0]
+    pad = vad.cfg["padding_ms"] / 1000
+    assert abs(start - (2.0 - pad)) < 0.1
+    assert abs(end - (4.0 + pad)) < 0.1
+
+
+def test_whisper_segments_are_remapped_to_the_original_timeline():
+    pytest.importorskip("groq")
+    from models.whisper_processor import WhisperProcessor
+
+    whisper = object.__new__(WhisperProcessor)  # no API client needed for the remap
+    # voiced pieces 2-4 s and 10-13 s of the original were uploaded back to back
+    offsets = [(0.0, 2.0), (2.0, 10.0)]
+    segments = [
+        {"start": 0.5, "end": 1.5, "text": "a"},
+        {"start": 2.0, "end": 3.0, "text": "b"},
+        {"start": 4.0, "text": "c"},
+        "raw",
+    ]
+    remapped = whisper._remap_segments(segments, offsets)
+    assert [(s["start"], s["end"]) for s in remapped[:3]] == [(2.5, 3.5), (10.0, 11.0), (12.0, 12.0)]
+    assert remapped[3] == "raw"
+    assert segments[0]["start"] == 0.5  # input left untouched